@@ -4,13 +4,31 @@ from flask_migrate import Migrate
 from flasgger import Swagger
 from dotenv import load_dotenv
 from db import db  # Import db from db.py
+from query_budget import init_query_budget
+from json_provider import init_json_provider
+from services.table_version_service import init_table_versions
+from commands import register_commands
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
+init_json_provider(app)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Connection pool of each worker process; keep workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below Postgres' max_connections
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),  # drop dead connections before use
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),  # seconds before a connection is reopened
+}
+if not (app.config['SQLALCHEMY_DATABASE_URI'] or '').startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),  # seconds to wait for a free connection
+    })
+# Maximum SQL statements per GET request; unset disables the check (see query_budget.py)
+app.config['QUERY_BUDGET'] = int(os.getenv('QUERY_BUDGET', 0)) or None
 
 db.init_app(app)  # Initialize db with the Flask app
 migrate = Migrate(app, db)
@@ -24,6 +42,10 @@ from controllers import all_blueprints
 for bp in all_blueprints:
     app.register_blueprint(bp)
 
+init_query_budget(app)
+init_table_versions(app)
+register_commands(app)
+
 # Function to run flask in debug mode
 def run_flask_app_debug():
     app.run(debug=True)
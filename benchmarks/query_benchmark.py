@@ -0,0 +1,184 @@
+"""
+Benchmark the hot lookup paths with and without their indexes.
+
+Seeds a database with realistic volumes, then for every lookup prints the query plan and the
+median timing, first with the indexes declared on the models dropped and then with them created.
+
+    python benchmarks/query_benchmark.py                                  # in-memory SQLite
+    python benchmarks/query_benchmark.py --database-url postgresql://...  # a scratch Postgres database
+
+The target database is emptied and recreated: never point it at a real one.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite://', help='Scratch database to seed (default: in-memory SQLite)')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--months', type=int, default=12, help='Months of payments and attendance to seed')
+    parser.add_argument('--visits', type=int, default=8, help='Attendances per user and month')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per lookup')
+    return parser.parse_args()
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url
+
+from sqlalchemy import event, insert
+from app import app
+from db import db
+from models import Attendance, Coach, Language, LocationUsers, Locations, Payment, PaymentMethods, Plans, User
+from models.users import UserType
+from services import language_service, payment_service
+
+INDEXED_TABLES = [Payment.__table__, Attendance.__table__, LocationUsers.__table__, Language.__table__]
+
+def seed(users, months, visits):
+    """Insert `users` members with a membership, a language, a monthly payment and `visits` attendances a month."""
+    random.seed(42)
+    locations = [Locations(location=f'Sede {i}', address=f'Calle {i}') for i in range(5)]
+    methods = [PaymentMethods(method=name) for name in ('Zelle', 'Pago Móvil', 'Efectivo', 'Transferencia')]
+    plans = [Plans(name=f'Plan {i}', price=20 + 10 * i) for i in range(3)]
+    db.session.add_all(locations + methods + plans)
+    db.session.flush()
+    coaches = [Coach(cedula=str(9000 + i), names=f'Coach {i}', location_id=locations[i % 5].id) for i in range(15)]
+    db.session.add_all(coaches)
+    db.session.flush()
+
+    db.session.execute(insert(User), [
+        {'name': f'Nombre{i}', 'lastname': f'Apellido{i}', 'cedula': 10_000_000 + i, 'email': f'user{i}@example.com',
+         'date_of_birth': date(1990, 1, 1), 'phone': 4140000000 + i, 'type': UserType.cliente,
+         'telegram_id': 100_000 + i, 'creation_date': datetime(2024, 1, 1)}
+        for i in range(users)
+    ])
+    user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+
+    db.session.execute(insert(LocationUsers), [
+        {'user_id': user_id, 'location_id': random.choice(locations).id, 'plan_id': random.choice(plans).id,
+         'creation_date': datetime(2024, 1, 1)}
+        for user_id in user_ids
+    ])
+    db.session.execute(insert(Language), [
+        {'id_telegram': 100_000 + i, 'Language': random.choice(['es', 'en']), 'creation_date': datetime(2024, 1, 1)}
+        for i in range(users)
+    ])
+
+    start = date(2024, 1, 1)
+    for month in range(months):
+        year, month_number = 2024 + month // 12, month % 12 + 1
+        db.session.execute(insert(Payment), [
+            {'user_id': user_id, 'date': date(year, month_number, random.randint(1, 28)), 'amount': 30.0,
+             'reference': str(random.randint(100000, 999999)), 'payment_method_id': random.choice(methods).id,
+             'creation_date': datetime(year, month_number, 1), 'year': year, 'month': month_number}
+            for user_id in user_ids
+        ])
+        rows = []
+        for user_id in user_ids:
+            for _ in range(visits):
+                coach = random.choice(coaches)
+                visit = datetime(year, month_number, random.randint(1, 28), random.randint(6, 21))
+                rows.append({'coach_id': coach.id, 'location_id': coach.location_id, 'user_id': user_id,
+                             'date': visit, 'creation_date': visit})
+        db.session.execute(insert(Attendance), rows)
+    db.session.commit()
+    return user_ids, [location.id for location in locations], [coach.id for coach in coaches], start
+
+def lookups(user_ids, location_ids, coach_ids, start):
+    """Return (name, callable) pairs exercising each hot lookup, through the services where they exist."""
+    user_id = user_ids[len(user_ids) // 2]
+    month_start, month_end = datetime(start.year, 6, 1), datetime(start.year, 7, 1)
+    return [
+        ('payment_service.get_payments_by_year_and_month', lambda: payment_service.get_payments_by_year_and_month(start.year, 6)),
+        ('payment_service.has_payments_for_year_and_month', lambda: payment_service.has_payments_for_year_and_month(start.year, 6)),
+        ('payments by user', lambda: Payment.query.filter_by(user_id=user_id).all()),
+        ('language_service.get_language_by_telegram_id', lambda: language_service.get_language_by_telegram_id(100_000 + len(user_ids) // 2)),
+        ('attendance by user and month', lambda: Attendance.query.filter(
+            Attendance.user_id == user_id, Attendance.date >= month_start, Attendance.date < month_end).all()),
+        ('attendance by location and day', lambda: Attendance.query.filter(
+            Attendance.location_id == location_ids[0], Attendance.date >= month_start,
+            Attendance.date < month_start + timedelta(days=1)).all()),
+        ('attendance by coach and month', lambda: Attendance.query.filter(
+            Attendance.coach_id == coach_ids[0], Attendance.date >= month_start, Attendance.date < month_end).all()),
+        ('attendance by day', lambda: Attendance.query.filter(
+            Attendance.date >= month_start, Attendance.date < month_start + timedelta(days=1)).all()),
+        ('location users by user', lambda: LocationUsers.query.filter_by(user_id=user_id).all()),
+        ('location users by location', lambda: LocationUsers.query.filter_by(location_id=location_ids[0]).all()),
+    ]
+
+def first_statement(run):
+    """Run a lookup once and return the first SQL statement it executed, with its parameters."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    db.session.rollback()
+    return captured[0]
+
+def explain(statement, parameters):
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN ANALYZE '
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(prefix + statement, parameters).fetchall()
+    # SQLite returns (id, parent, notused, detail); Postgres one text column per line
+    return [row[-1] for row in rows]
+
+def median_ms(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.expunge_all()
+    return statistics.median(timings)
+
+def set_indexes(create):
+    for table in INDEXED_TABLES:
+        for index in table.indexes:
+            if create:
+                index.create(bind=db.engine, checkfirst=True)
+            else:
+                index.drop(bind=db.engine, checkfirst=True)
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('ANALYZE')
+
+def main():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        seeded = seed(args.users, args.months, args.visits)
+        print(f"Seeded {db.session.query(Attendance).count()} attendances, {db.session.query(Payment).count()} payments "
+              f"and {args.users} users in {time.perf_counter() - started:.1f}s on {db.engine.dialect.name}\n")
+
+        results = {}
+        for label, create in (('without indexes', False), ('with indexes', True)):
+            set_indexes(create)
+            print(f"=== {label} ===")
+            for name, run in lookups(*seeded):
+                statement, parameters = first_statement(run)
+                timing = median_ms(run, args.repeat)
+                results.setdefault(name, []).append(timing)
+                print(f"{name}: {timing:.2f} ms")
+                for line in explain(statement, parameters):
+                    print(f"    {line}")
+            print()
+
+        print("=== summary (median ms) ===")
+        for name, (before, after) in results.items():
+            print(f"{name:50} {before:9.2f} {after:9.2f}  x{before / after if after else float('inf'):.1f}")
+
+if __name__ == '__main__':
+    main()
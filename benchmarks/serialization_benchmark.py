@@ -0,0 +1,122 @@
+"""
+Compare the two ways of serializing a large list response.
+
+    orm:  ORM objects with joinedload -> to_dict() -> Flask's default JSON provider (the old path)
+    rows: column rows from one SELECT -> serialize_row -> default provider
+    rows + orjson: column rows -> dict(row._mapping) -> OrjsonProvider (the path used when orjson is installed)
+
+Timings are split into fetching (query and object building) and serializing, for 10k and 100k
+attendances by default:
+
+    python benchmarks/serialization_benchmark.py
+    python benchmarks/serialization_benchmark.py --rows 10000 --rows 100000 --database-url postgresql://...
+
+The target database is emptied and recreated: never point it at a real one.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite://', help='Scratch database to seed (default: in-memory SQLite)')
+    parser.add_argument('--rows', type=int, action='append', help='Attendances to list (repeatable; default 10000 and 100000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path')
+    return parser.parse_args()
+
+args = parse_args()
+os.environ['DATABASE_URL'] = args.database_url
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+from app import app
+from db import db
+from json_provider import OrjsonProvider, orjson
+from models import Attendance, Coach, Locations, User
+from models.users import UserType
+from services.attendance_service import AttendanceService
+from services.pagination import serialize_row
+
+def seed(rows):
+    """Insert `rows` attendances spread over 500 users, 10 coaches and 5 locations."""
+    Attendance.query.delete()
+    User.query.delete()
+    Coach.query.delete()
+    Locations.query.delete()
+    locations = [Locations(location=f'Sede {i}', address=f'Calle {i}') for i in range(5)]
+    db.session.add_all(locations)
+    db.session.flush()
+    coaches = [Coach(cedula=str(9000 + i), names=f'Coach {i}', location_id=locations[i % 5].id) for i in range(10)]
+    db.session.add_all(coaches)
+    db.session.execute(insert(User), [
+        {'name': f'Nombre{i}', 'lastname': f'Apellido{i}', 'cedula': 10_000_000 + i, 'email': f'user{i}@example.com',
+         'date_of_birth': date(1990, 1, 1), 'phone': 4140000000 + i, 'type': UserType.cliente,
+         'telegram_id': 100_000 + i, 'creation_date': datetime(2024, 1, 1)}
+        for i in range(500)
+    ])
+    db.session.flush()
+    user_ids = [row[0] for row in db.session.query(User.id)]
+    start = datetime(2024, 1, 1, 6)
+    db.session.execute(insert(Attendance), [
+        {'coach_id': coaches[i % 10].id, 'location_id': coaches[i % 10].location_id, 'user_id': user_ids[i % len(user_ids)],
+         'date': start + timedelta(minutes=17 * i), 'creation_date': start + timedelta(minutes=17 * i)}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+def orm_path(provider):
+    attendances = Attendance.query.options(
+        joinedload(Attendance.coach), joinedload(Attendance.location), joinedload(Attendance.user)
+    ).order_by(Attendance.id).all()
+    fetched = time.perf_counter()
+    provider.dumps([attendance.to_dict() for attendance in attendances])
+    return fetched
+
+def rows_path(provider):
+    rows = AttendanceService.list_all_attendances()
+    fetched = time.perf_counter()
+    provider.dumps([serialize_row(row) for row in rows])
+    return fetched
+
+def rows_orjson_path(provider):
+    rows = AttendanceService.list_all_attendances()
+    fetched = time.perf_counter()
+    provider.dumps([dict(row._mapping) for row in rows])
+    return fetched
+
+def measure(path, provider, repeat):
+    fetch, serialize = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fetched = path(provider)
+        finished = time.perf_counter()
+        fetch.append((fetched - started) * 1000)
+        serialize.append((finished - fetched) * 1000)
+        db.session.expunge_all()
+    return statistics.median(fetch), statistics.median(serialize)
+
+def main():
+    paths = [('orm', orm_path, DefaultJSONProvider(app)), ('rows', rows_path, DefaultJSONProvider(app))]
+    if orjson is not None:
+        paths.append(('rows + orjson', rows_orjson_path, OrjsonProvider(app)))
+    else:
+        print("orjson is not installed: skipping the orjson path (pip install orjson)\n")
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        print(f"{'rows':>8} {'path':15} {'fetch ms':>10} {'serialize ms':>13} {'total ms':>10}")
+        for rows in args.rows or [10_000, 100_000]:
+            seed(rows)
+            for name, path, provider in paths:
+                fetch, serialize = measure(path, provider, args.repeat)
+                print(f"{rows:8} {name:15} {fetch:10.1f} {serialize:13.1f} {fetch + serialize:10.1f}")
+
+if __name__ == '__main__':
+    main()
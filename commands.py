@@ -0,0 +1,75 @@
+# commands.py
+import time
+import click
+from flask.cli import AppGroup
+
+attendance_cli = AppGroup('attendance', help='Attendance maintenance commands.')
+
+@attendance_cli.command('rebuild-rollup')
+@click.option('--from', 'date_from', type=click.DateTime(formats=['%Y-%m-%d']), help='First day to rebuild (YYYY-MM-DD).')
+@click.option('--to', 'date_to', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day to rebuild (YYYY-MM-DD).')
+def rebuild_attendance_rollup(date_from, date_to):
+    """Recompute the attendance rollup from the attendance table (all days by default)."""
+    from services.attendance_rollup_service import rebuild_rollup
+    started = time.perf_counter()
+    rows = rebuild_rollup(date_from.date() if date_from else None, date_to.date() if date_to else None)
+    click.echo(f"Attendance rollup rebuilt: {rows} rows in {time.perf_counter() - started:.2f}s")
+
+users_cli = AppGroup('users', help='User maintenance commands.')
+
+@users_cli.command('evaluate-delinquency')
+@click.option('--year', type=int, help='Year of the period (defaults to the current one).')
+@click.option('--month', type=click.IntRange(1, 12), help='Month of the period (defaults to the current one).')
+@click.option('--dry-run', is_flag=True, help='Only count, without changing any status.')
+def evaluate_delinquency_command(year, month, dry_run):
+    """Set members who have not paid their plan for the period to moroso, and those who have back to activo."""
+    from services.delinquency_service import evaluate_delinquency
+    result = evaluate_delinquency(year, month, dry_run)
+    click.echo(
+        f"{result['year']}-{result['month']:02d}: {result['evaluated']} members evaluated, "
+        f"{result['delinquent']} behind; {result['marked_moroso']} set to moroso, "
+        f"{result['restored_activo']} back to activo{' (dry run)' if dry_run else ''} "
+        f"in {result['elapsed_ms']:.0f} ms"
+    )
+
+schedules_cli = AppGroup('schedules', help='Schedule maintenance commands.')
+
+@schedules_cli.command('rebuild-slots')
+def rebuild_schedule_slots():
+    """Parse the days and start times of every schedule into the schedule_slot table."""
+    from services.schedule_slot_service import rebuild_slots
+    started = time.perf_counter()
+    written, errors = rebuild_slots()
+    for schedule_id, error in errors:
+        click.echo(f"Schedule {schedule_id} skipped: {error}", err=True)
+    click.echo(f"Schedule slots rebuilt: {written} slots, {len(errors)} schedules skipped in {time.perf_counter() - started:.2f}s")
+
+payments_cli = AppGroup('payments', help='Payment maintenance commands.')
+
+@payments_cli.command('import-proofs')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+def import_payment_proofs(directory):
+    """Move the proofs the bot saved in DIRECTORY (e.g. telegram_bot/uploads) into the configured proof storage."""
+    from services.payment_service import import_legacy_proofs
+    started = time.perf_counter()
+    result = import_legacy_proofs(directory)
+    click.echo(
+        f"Payment proofs imported: {result['imported']} files linked to {result['linked']} payments, "
+        f"{result['unmatched']} files without a payment in {time.perf_counter() - started:.2f}s"
+    )
+
+@payments_cli.command('process-proofs')
+@click.option('--limit', type=int, help='Process at most this many proofs.')
+def process_payment_proofs(limit):
+    """Make the thumbnails and compressed archives of the linked proofs not processed yet (or that failed)."""
+    from services.proof_pipeline import process_pending_proofs
+    started = time.perf_counter()
+    done, failed = process_pending_proofs(limit)
+    click.echo(f"Payment proofs processed: {done} done, {failed} failed in {time.perf_counter() - started:.2f}s")
+
+def register_commands(app):
+    """Register the maintenance commands on the `flask` CLI."""
+    app.cli.add_command(attendance_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(schedules_cli)
+    app.cli.add_command(payments_cli)
@@ -8,6 +8,7 @@ from .location_user_controller import location_user_bp
 from .language_controller import language_bp
 from .coaches_controller import coach_bp
 from .attendance_controller import attendance_bp
+from .cache_controller import cache_bp
 
 # Add all blueprints to this list
-all_blueprints = [user_bp, schedule_bp, plan_bp, payment_method_bp, payment_bp, location_bp, location_user_bp, language_bp, coach_bp, attendance_bp]
\ No newline at end of file
+all_blueprints = [user_bp, schedule_bp, plan_bp, payment_method_bp, payment_bp, location_bp, location_user_bp, language_bp, coach_bp, attendance_bp, cache_bp]
\ No newline at end of file
@@ -1,6 +1,9 @@
+from datetime import date
 from flask import Blueprint, request, jsonify
 from flasgger import swag_from
 from services.attendance_service import AttendanceService
+from services.attendance_rollup_service import get_attendance_stats, GROUP_BY_OPTIONS
+from controllers.pagination import PAGINATION_PARAMETERS, parse_list_args, list_response, wants_ndjson
 
 # Create a Blueprint for attendance
 attendance_bp = Blueprint('attendance', __name__)
@@ -56,6 +59,56 @@ def create_attendance():
         return jsonify({"error": "Error creating attendance"}), 400
 
 
+@attendance_bp.route('/attendances/bulk', methods=['POST'])
+@swag_from({
+    'tags': ['Attendance'],
+    'summary': 'Check in several users at once',
+    'description': 'Creates one attendance record per user for the same coach, location and date, in a single transaction. Either every record is created or none is.',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'coach_id': {'type': 'integer'},
+                    'location_id': {'type': 'integer'},
+                    'user_ids': {'type': 'array', 'items': {'type': 'integer'}},
+                    'date': {'type': 'string', 'example': '2024-06-01 18:30', 'description': 'Defaults to now'}
+                },
+                'required': ['coach_id', 'location_id', 'user_ids']
+            }
+        }
+    ],
+    'responses': {
+        201: {
+            'description': 'Attendances created successfully',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'created': {'type': 'integer'},
+                    'ids': {'type': 'array', 'items': {'type': 'integer'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid payload or unknown coach, location or users; nothing was created'
+        }
+    }
+})
+def create_attendances_bulk():
+    data = request.get_json(silent=True) or {}
+    try:
+        ids = AttendanceService.create_attendances_bulk(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error creating attendances: {e}")
+        return jsonify({'error': 'Error creating attendances'}), 400
+    return jsonify({'created': len(ids), 'ids': ids}), 201
+
+
 @attendance_bp.route('/attendances/<int:attendance_id>', methods=['GET'])
 @swag_from({
     'tags': ['Attendance'],
@@ -99,7 +152,8 @@ def get_attendance(attendance_id):
 @swag_from({
     'tags': ['Attendance'],
     'summary': 'List all attendance records',
-    'description': 'Retrieve a list of all attendance records.',
+    'description': 'Retrieve a list of all attendance records, optionally paginated by ID and projected to selected fields.',
+    'parameters': PAGINATION_PARAMETERS,
     'responses': {
         200: {
             'description': 'List of attendance records retrieved successfully',
@@ -121,8 +175,76 @@ def get_attendance(attendance_id):
 })
 def list_attendances():
     """Retrieve a list of all attendance records."""
-    attendances = AttendanceService.list_all_attendances()
-    return jsonify([attendance.to_dict() for attendance in attendances])
+    try:
+        limit, after, fields = parse_list_args()
+        attendances = AttendanceService.list_all_attendances(limit=limit, after=after, fields=fields, stream=wants_ndjson())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(attendances, limit)
+
+
+@attendance_bp.route('/attendances/stats', methods=['GET'])
+@swag_from({
+    'tags': ['Attendance'],
+    'summary': 'Attendance totals',
+    'description': 'Number of attendances grouped by location, coach, day or week (starting Monday), read from the daily attendance rollup.',
+    'parameters': [
+        {
+            'name': 'group_by',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(GROUP_BY_OPTIONS),
+            'required': True,
+            'description': 'Grouping of the totals'
+        },
+        {
+            'name': 'from',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': 'First day included (YYYY-MM-DD)'
+        },
+        {
+            'name': 'to',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date',
+            'required': False,
+            'description': 'Last day included (YYYY-MM-DD)'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Totals per group',
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'location_id': {'type': 'integer'},
+                        'location_name': {'type': 'string'},
+                        'coach_id': {'type': 'integer'},
+                        'coach_name': {'type': 'string'},
+                        'day': {'type': 'string', 'format': 'date'},
+                        'week': {'type': 'string', 'format': 'date'},
+                        'count': {'type': 'integer'}
+                    }
+                }
+            }
+        },
+        400: {'description': 'Invalid grouping or dates'}
+    }
+})
+def attendance_stats():
+    """Return attendance totals from the rollup."""
+    try:
+        date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        stats = get_attendance_stats(request.args.get('group_by', ''), date_from, date_to)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(stats)
 
 
 @attendance_bp.route('/attendances/<int:attendance_id>', methods=['PUT'])
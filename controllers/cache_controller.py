@@ -0,0 +1,39 @@
+from flask import Blueprint, jsonify
+from flasgger import swag_from
+from services.cache import reference_cache
+
+cache_bp = Blueprint('cache', __name__)
+
+@cache_bp.route('/cache/stats', methods=['GET'])
+@swag_from({
+    'tags': ['Cache'],
+    'summary': 'Reference data cache counters',
+    'description': 'Hit, miss and invalidation counters of the reference data cache of the worker process that answers.',
+    'responses': {
+        200: {
+            'description': 'Cache counters',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'bus': {'type': 'string'},
+                    'ttl': {'type': 'integer'},
+                    'pid': {'type': 'integer'},
+                    'namespaces': {
+                        'type': 'object',
+                        'additionalProperties': {
+                            'type': 'object',
+                            'properties': {
+                                'hits': {'type': 'integer'},
+                                'misses': {'type': 'integer'},
+                                'invalidations': {'type': 'integer'},
+                                'cached': {'type': 'boolean'}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+})
+def get_cache_stats():
+    return jsonify(reference_cache.stats())
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from services.coaches_service import CoachesService
 from flasgger import swag_from
+from controllers.http_cache import etag_cached
+from controllers.pagination import PAGINATION_PARAMETERS, parse_list_args, list_response, wants_ndjson
 
 coach_bp = Blueprint('coach', __name__)
 
@@ -79,6 +81,7 @@ def get_coach(coach_id):
 
 @coach_bp.route('/coaches', methods=['GET'])
 @swag_from({
+    'parameters': PAGINATION_PARAMETERS,
     'responses': {
         200: {
             'description': 'List all coaches',
@@ -98,9 +101,14 @@ def get_coach(coach_id):
         }
     }
 })
+@etag_cached('coach', 'locations')
 def get_all_coaches():
-    coaches = CoachesService.get_all_coaches()
-    return jsonify([coach.to_dict() for coach in coaches])
+    try:
+        limit, after, fields = parse_list_args()
+        coaches = CoachesService.get_all_coaches(limit=limit, after=after, fields=fields, stream=wants_ndjson())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(coaches, limit)
 
 @coach_bp.route('/coaches/<int:coach_id>', methods=['PUT'])
 @swag_from({
@@ -0,0 +1,48 @@
+# controllers/http_cache.py
+import hashlib
+from functools import wraps
+from flask import request, make_response
+from services.table_version_service import VERSIONED_TABLES, MONTHLY_TABLES, month_key, get_versions
+
+def current_etag(tables):
+    """Strong ETag of the response to the current request, given the versions of the tables it reads."""
+    versions = get_versions(tables)
+    # The Accept header selects JSON or NDJSON, two representations with different ETags
+    key = '|'.join([request.full_path, request.headers.get('Accept', '')] + [f"{table}={versions[table]}" for table in sorted(versions)])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def etag_cached(*tables):
+    """
+    Answer GET requests with an ETag built from the versions of `tables`, and with an empty
+    304 Not Modified when the client's If-None-Match still matches, without running the view.
+
+    A monthly table (MONTHLY_TABLES) is versioned by the month of the view's `year` and
+    `month` arguments, e.g. @etag_cached('payment') on /payments/<int:year>/<int:month>/export.
+    Place it below @swag_from so the documentation is kept on the wrapped view.
+    """
+    unknown = set(tables) - VERSIONED_TABLES - MONTHLY_TABLES
+    if unknown:
+        raise ValueError(f"Tables without a version counter: {', '.join(sorted(unknown))}")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Computed before the view runs: a concurrent write can only make the ETag older than
+            # the body, which costs the client a refetch, never a stale 304. Cached lists served by
+            # the view are keyed on the same versions (see ReferenceCache), so they are never older
+            etag = current_etag([
+                month_key(table, kwargs['year'], kwargs['month']) if table in MONTHLY_TABLES else table
+                for table in tables
+            ])
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'  # clients may store it but must revalidate
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
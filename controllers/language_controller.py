@@ -1,7 +1,7 @@
 # controllers/language_controller.py
 from flask import Blueprint, request, jsonify
 from flasgger import swag_from
-from services.language_service import get_all_languages, get_language_by_telegram_id, create_language, update_language
+from services.language_service import get_all_languages, get_language_by_telegram_id, create_language, update_language, delete_language
 
 language_bp = Blueprint('language', __name__)
 
@@ -100,7 +100,7 @@ def get_language(id_telegram):
         }
     }
 })
-def create_language():
+def create_language_controller():
     data = request.get_json()
     new_language = create_language(data)
     return jsonify(new_language.to_dict()), 201
@@ -186,6 +186,6 @@ def update_language_controller(id_telegram):
         }
     }
 })
-def delete_language(id_telegram):
+def delete_language_controller(id_telegram):
     deleted_language = delete_language(id_telegram)
     return jsonify(deleted_language.to_dict()) if deleted_language else ('', 404)
\ No newline at end of file
@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flasgger import swag_from
+from controllers.http_cache import etag_cached
+from services.pagination import serialize_row
+from controllers.pagination import PAGINATION_PARAMETERS, parse_list_args, list_response
 from services.location_service import get_all_locations, get_location_by_id, create_location, update_location, delete_location
 
 location_bp = Blueprint('location', __name__)
 
 @location_bp.route('/locations', methods=['GET'])
 @swag_from({
+    'parameters': PAGINATION_PARAMETERS,
     'responses': {
         200: {
             'description': 'List all locations',
@@ -24,6 +28,7 @@ location_bp = Blueprint('location', __name__)
         }
     }
 })
+@etag_cached('locations')
 def get_locations():
     """
     Get all locations
@@ -31,8 +36,12 @@ def get_locations():
     tags:
       - Locations
     """
-    locations = get_all_locations()
-    return jsonify([location.to_dict() for location in locations])
+    try:
+        limit, after, fields = parse_list_args()
+        locations = get_all_locations(limit=limit, after=after, fields=fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(locations, limit, serialize_row if fields else lambda location: location.to_dict())
 
 @location_bp.route('/locations/<int:location_id>', methods=['GET'])
 @swag_from({
@@ -61,6 +70,7 @@ def get_locations():
         404: {'description': 'Location not found'}
     }
 })
+@etag_cached('locations')
 def get_location(location_id):
     """
     Get a location by ID
@@ -1,13 +1,18 @@
 # controllers/location_user_controller.py
 from flask import Blueprint, request, jsonify
 from services.location_user_service import get_all_location_users, get_location_user_by_id, create_location_user, update_location_user, delete_location_user
+from controllers.pagination import parse_list_args, list_response, wants_ndjson
 
 location_user_bp = Blueprint('location_user', __name__)
 
 @location_user_bp.route('/location_users', methods=['GET'])
 def get_location_users():
-    location_users = get_all_location_users()
-    return jsonify([location_user.__dict__ for location_user in location_users])
+    try:
+        limit, after, fields = parse_list_args()
+        location_users = get_all_location_users(limit=limit, after=after, fields=fields, stream=wants_ndjson())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(location_users, limit)
 
 @location_user_bp.route('/location_users/<int:location_user_id>', methods=['GET'])
 def get_location_user(location_user_id):
@@ -0,0 +1,111 @@
+# controllers/pagination.py
+from flask import current_app, request, jsonify, Response, stream_with_context
+from services.pagination import MAX_PAGE_SIZE, serialize_row
+
+# Swagger parameters shared by every paginated list endpoint
+PAGINATION_PARAMETERS = [
+    {
+        'name': 'limit',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'description': f'Maximum number of records to return (at most {MAX_PAGE_SIZE}). Omit to list every record.'
+    },
+    {
+        'name': 'after',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'description': 'Cursor: only return records with an ID greater than this value (use the X-Next-Cursor header of the previous page).'
+    },
+    {
+        'name': 'fields',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'description': 'Comma-separated list of columns to return, e.g. "id,name". The ID is always included.'
+    },
+    {
+        'name': 'Accept',
+        'in': 'header',
+        'type': 'string',
+        'required': False,
+        'description': 'application/x-ndjson streams one JSON object per line from a server-side cursor, for exports of whole tables.'
+    }
+]
+
+def _parse_positive_int(name):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"'{name}' must be a positive integer")
+    return int(value)
+
+def parse_list_args():
+    """
+    Read the `limit`, `after` and `fields` query parameters of a list endpoint.
+
+    :return: A tuple (limit, after, fields).
+    :raises ValueError: If a parameter is malformed.
+    """
+    limit = _parse_positive_int('limit')
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_SIZE)
+    after = _parse_positive_int('after')
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    return limit, after, fields or None
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Lines sent per chunk of a streamed response
+NDJSON_CHUNK_ROWS = 500
+
+def wants_ndjson():
+    """Whether the client asked for newline-delimited JSON (Accept: application/x-ndjson)."""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(items, serializer):
+    """
+    Stream records as newline-delimited JSON, one object per line, sent in chunks as they are read.
+
+    Meant for the iterator of fetch_rows(..., stream=True): the worker holds at most one batch
+    of rows and one chunk of text at a time, whatever the size of the table.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        lines = []
+        for item in items:
+            lines.append(dumps(serializer(item)))
+            if len(lines) >= NDJSON_CHUNK_ROWS:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def _row_mapping(row):
+    return dict(row._mapping)
+
+def list_response(items, limit, serializer=None):
+    """
+    Serialize a page of records and attach the cursor of the next page.
+
+    :param items: The records of the current page.
+    :param limit: The page size that was requested, or None when listing everything.
+    :param serializer: Function converting one record into a dictionary; by default the records
+                       are result rows, passed as they are to a JSON provider that handles dates
+                       and enums itself (json_provider.OrjsonProvider) or converted with serialize_row.
+    :return: A JSON response; the `X-Next-Cursor` header is set when more records may follow. When
+             the client accepts application/x-ndjson the records are streamed instead (see
+             ndjson_response) and, as the last ID is only known at the end, the header is not set.
+    """
+    if serializer is None:
+        serializer = _row_mapping if getattr(current_app.json, 'native_types', False) else serialize_row
+    if wants_ndjson():
+        return ndjson_response(items, serializer)
+    response = jsonify([serializer(item) for item in items])
+    if limit is not None and len(items) == limit:
+        response.headers['X-Next-Cursor'] = str(items[-1].id)
+    return response
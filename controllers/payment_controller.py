@@ -1,9 +1,19 @@
 # controllers/payment_controller.py
-from flask import Blueprint, jsonify, request
+import tempfile
+from flask import Blueprint, jsonify, redirect, request, Response, send_file, stream_with_context
 from flasgger import swag_from
+from controllers.http_cache import etag_cached
 from models.payment import Payment
 from db import db
-from services.payment_service import get_all_payments, get_payment_by_id, create_payment, update_payment, delete_payment, get_payments_by_year_and_month
+from services.payment_service import get_all_payments, get_payment_by_id, create_payment, update_payment, delete_payment
+from services.payment_service import EXPORT_COLUMNS, has_payments_for_year_and_month, iter_payments_for_export
+from services.payment_service import save_payment_proof, get_payment_proof, get_payment_proof_thumbnail, open_payment_proof
+from services.payment_service import MIN_ARCHIVE_PART_SIZE, iter_month_proof_archive
+from services.proof_pipeline import get_month_thumbnails
+from storage import CONTENT_TYPES, ProofTooLarge
+from services.export_service import iter_csv, write_xlsx
+from services.payment_summary_service import get_payment_summary
+from controllers.pagination import PAGINATION_PARAMETERS, parse_list_args, list_response, wants_ndjson
 
 payment_bp = Blueprint('payment_bp', __name__)
 
@@ -11,7 +21,8 @@ payment_bp = Blueprint('payment_bp', __name__)
 @swag_from({
     'tags': ['Payments'],
     'summary': 'Get all payments',
-    'description': 'Retrieve a list of all payments.',
+    'description': 'Retrieve a list of all payments, optionally paginated by ID and projected to selected fields.',
+    'parameters': PAGINATION_PARAMETERS,
     'responses': {
         200: {
             'description': 'A list of payments',
@@ -36,8 +47,84 @@ payment_bp = Blueprint('payment_bp', __name__)
     }
 })
 def get_payments():
-    payments = get_all_payments()
-    return jsonify([payment.to_dict() for payment in payments])
+    try:
+        limit, after, fields = parse_list_args()
+        payments = get_all_payments(limit=limit, after=after, fields=fields, stream=wants_ndjson())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(payments, limit)
+
+
+@payment_bp.route('/payments/summary', methods=['GET'])
+@swag_from({
+    'tags': ['Payments'],
+    'summary': 'Monthly revenue summary',
+    'description': 'Total amount and number of payments per month, broken down by payment method and by plan (the plan of the user\'s latest location membership). Closed months are cached.',
+    'parameters': [
+        {
+            'name': 'year',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Only summarize this year'
+        },
+        {
+            'name': 'month',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Only summarize this month (1-12); requires year'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'One summary per month with payments',
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'year': {'type': 'integer'},
+                        'month': {'type': 'integer'},
+                        'total': {'type': 'number'},
+                        'count': {'type': 'integer'},
+                        'by_method': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'payment_method_id': {'type': 'integer'},
+                                    'method': {'type': 'string'},
+                                    'total': {'type': 'number'},
+                                    'count': {'type': 'integer'}
+                                }
+                            }
+                        },
+                        'by_plan': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'plan_id': {'type': 'integer'},
+                                    'plan': {'type': 'string'},
+                                    'total': {'type': 'number'},
+                                    'count': {'type': 'integer'}
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        400: {'description': 'Invalid year or month'}
+    }
+})
+def get_payments_summary():
+    year = request.args.get('year', type=int)
+    month = request.args.get('month', type=int)
+    if month is not None and (year is None or not 1 <= month <= 12):
+        return jsonify({'error': "'month' must be between 1 and 12 and requires 'year'"}), 400
+    return jsonify(get_payment_summary(year, month))
 
 
 @payment_bp.route('/payments/<int:year>/<int:month>', methods=['GET'])
@@ -88,12 +175,291 @@ def get_payments():
     }
 })
 def get_payments_by_year_and_month_controller(year, month):
-    payments = get_payments_by_year_and_month(year, month)
+    # Report rows straight from a column query, in the shape of Payment.to_custom_dict()
+    payments = [dict(zip(EXPORT_COLUMNS, row)) for row in iter_payments_for_export(year, month)]
     if payments:
-        return jsonify([payment.to_custom_dict() for payment in payments])
+        return jsonify(payments)
     else:
         return jsonify({'message': 'No payments found for the specified year and month'}), 404
-        
+
+@payment_bp.route('/payments/<int:year>/<int:month>/export', methods=['GET'])
+@swag_from({
+    'tags': ['Payments'],
+    'summary': 'Export payments by year and month',
+    'description': 'Download the monthly payments report as an XLSX workbook or a streamed CSV file.',
+    'parameters': [
+        {
+            'name': 'year',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The year of the payments'
+        },
+        {
+            'name': 'month',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The month of the payments'
+        },
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['xlsx', 'csv'],
+            'default': 'xlsx',
+            'required': False,
+            'description': 'File format of the report'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'The payments report file'
+        },
+        400: {
+            'description': 'Unsupported format'
+        },
+        404: {
+            'description': 'No payments found for the specified year and month'
+        }
+    }
+})
+@etag_cached('payment', 'user', 'payment_methods')
+def export_payments_by_year_and_month(year, month):
+    export_format = request.args.get('format', 'xlsx').lower()
+    if export_format not in ('xlsx', 'csv'):
+        return jsonify({'error': "Unsupported format, use 'xlsx' or 'csv'"}), 400
+    if not has_payments_for_year_and_month(year, month):
+        return jsonify({'message': 'No payments found for the specified year and month'}), 404
+
+    file_name = f"payments_report_{year}_{month:02d}.{export_format}"
+    if export_format == 'csv':
+        rows = iter_csv(EXPORT_COLUMNS, iter_payments_for_export(year, month))
+        return Response(
+            stream_with_context(rows),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={file_name}'}
+        )
+
+    # XLSX is a zip container, so it is spooled to a temporary file and then streamed from disk
+    report_file = tempfile.TemporaryFile()
+    write_xlsx(EXPORT_COLUMNS, iter_payments_for_export(year, month), report_file, sheet_title='Pagos')
+    report_file.seek(0)
+    return send_file(
+        report_file,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=file_name
+    )
+
+@payment_bp.route('/payments/<int:year>/<int:month>/proofs.zip', methods=['GET'])
+@swag_from({
+    'tags': ['Payments'],
+    'summary': 'Download every proof of a month',
+    'description': 'Stream a ZIP archive with the proof of every payment of the month under proofs/ and a manifest.csv mapping each file to its payment id. The archive is built while it is sent. With max_size, the proofs are split into parts whose archives stay under that many bytes; X-Archive-Parts gives the number of parts.',
+    'parameters': [
+        {
+            'name': 'year',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The year of the payments'
+        },
+        {
+            'name': 'month',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The month of the payments'
+        },
+        {
+            'name': 'max_size',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Largest size of an archive part in bytes (e.g. 52428800 for Telegram)'
+        },
+        {
+            'name': 'part',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Part to download, from 1 (default 1)'
+        }
+    ],
+    'produces': ['application/zip'],
+    'responses': {
+        200: {'description': 'The ZIP archive, or the requested part of it'},
+        400: {'description': 'Invalid max_size or part'},
+        404: {'description': 'No payment of the month has a proof'}
+    }
+})
+def download_month_proofs(year, month):
+    max_size = request.args.get('max_size', type=int)
+    part = request.args.get('part', 1, type=int)
+    if max_size is not None and max_size < MIN_ARCHIVE_PART_SIZE:
+        return jsonify({'error': f"'max_size' must be at least {MIN_ARCHIVE_PART_SIZE}"}), 400
+    try:
+        archive = iter_month_proof_archive(year, month, max_size=max_size, part=part)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if archive is None:
+        return jsonify({'message': 'No payment proofs found for the specified year and month'}), 404
+    chunks, parts = archive
+    file_name = f"payment_proofs_{year}_{month:02d}" + (f"_part{part}of{parts}" if parts > 1 else '')
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename={file_name}.zip',
+            'X-Archive-Part': str(part),
+            'X-Archive-Parts': str(parts),
+        }
+    )
+
+@payment_bp.route('/payments/proofs', methods=['POST'])
+@swag_from({
+    'tags': ['Payments'],
+    'summary': 'Upload a payment proof',
+    'description': 'Store the raw body (an image or PDF) by its content hash and return its reference, to be sent as proof_ref when the payment is created. The same file uploaded twice is stored once.',
+    'consumes': list(CONTENT_TYPES),
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'description': 'The file content, with its Content-Type',
+            'schema': {'type': 'string', 'format': 'binary'}
+        }
+    ],
+    'responses': {
+        201: {
+            'description': 'Proof stored',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'proof_ref': {'type': 'string'},
+                    'size': {'type': 'integer'},
+                    'deduplicated': {'type': 'boolean'}
+                }
+            }
+        },
+        400: {'description': 'Unsupported content type or empty body'},
+        413: {'description': 'Proof too large'}
+    }
+})
+def upload_payment_proof():
+    try:
+        proof_ref, size, created = save_payment_proof(request.stream, request.content_type)
+    except ProofTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'proof_ref': proof_ref, 'size': size, 'deduplicated': not created}), 201
+
+@payment_bp.route('/payments/proof/<string:proof_ref>', methods=['GET'])
+@swag_from({
+    'tags': ['Payments'],
+    'summary': 'Download a payment proof',
+    'description': 'Serve the proof of a payment, found by its reference (the ImageRef column of the payment reports). With object storage the response redirects to a short-lived presigned URL of the file.',
+    'parameters': [
+        {
+            'name': 'proof_ref',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Reference returned when the proof was uploaded, or the legacy name of an imported proof'
+        }
+    ],
+    'responses': {
+        200: {'description': 'The proof file'},
+        302: {'description': 'Redirect to a presigned URL of the proof file'},
+        404: {'description': 'No payment has this proof'}
+    }
+})
+def download_payment_proof(proof_ref):
+    proof = get_payment_proof(proof_ref)
+    if not proof:
+        return jsonify({'error': 'Proof not found'}), 404
+    return _send_stored_file(*proof)
+
+@payment_bp.route('/payments/proof/<string:proof_ref>/thumbnail', methods=['GET'])
+@swag_from({
+    'tags': ['Payments'],
+    'summary': 'Download the thumbnail of a payment proof',
+    'description': 'Serve the small JPEG preview of a proof (the first page for PDFs), produced in the background after the payment is saved. With object storage the response redirects to a presigned URL.',
+    'parameters': [
+        {
+            'name': 'proof_ref',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Reference of the proof, as for the proof download'
+        }
+    ],
+    'responses': {
+        200: {'description': 'The thumbnail (image/jpeg)'},
+        302: {'description': 'Redirect to a presigned URL of the thumbnail'},
+        404: {'description': 'No payment has this proof, or it is not processed yet'}
+    }
+})
+def download_payment_proof_thumbnail(proof_ref):
+    thumbnail = get_payment_proof_thumbnail(proof_ref)
+    if not thumbnail:
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    return _send_stored_file(*thumbnail)
+
+def _send_stored_file(ref, content_type, url):
+    if url:
+        return redirect(url)
+    # Content-addressed: a ref always names the same bytes, so its hash is the ETag and clients may cache it for good
+    return send_file(open_payment_proof(ref), mimetype=content_type, download_name=ref, etag=ref.split('.')[0],
+                     conditional=True, max_age=31536000)
+
+@payment_bp.route('/payments/<int:year>/<int:month>/thumbnails', methods=['GET'])
+@swag_from({
+    'tags': ['Payments'],
+    'summary': 'Proof thumbnails of a month',
+    'description': 'List the payments of a month that have a proof, with the reference of its thumbnail (null while the proof is being processed).',
+    'parameters': [
+        {
+            'name': 'year',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'Year of the payments'
+        },
+        {
+            'name': 'month',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'Month of the payments (1-12)'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Payments with a proof, ordered by date',
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'payment_id': {'type': 'integer'},
+                        'user': {'type': 'string'},
+                        'amount': {'type': 'number'},
+                        'date': {'type': 'string', 'format': 'date'},
+                        'proof_ref': {'type': 'string'},
+                        'thumbnail_ref': {'type': 'string'}
+                    }
+                }
+            }
+        }
+    }
+})
+def get_month_proof_thumbnails(year, month):
+    return jsonify(get_month_thumbnails(year, month))
+
 @payment_bp.route('/payments/<int:payment_id>', methods=['GET'])
 @swag_from({
     'tags': ['Payments'],
@@ -122,7 +488,8 @@ def get_payments_by_year_and_month_controller(year, month):
                     'payment_method_id': {'type': 'integer'},
                     'creation_date': {'type': 'string', 'format': 'date-time'},
                     'year': {'type': 'integer'},
-                    'month': {'type': 'integer'}
+                    'month': {'type': 'integer'},
+                    'proof_ref': {'type': 'string'}
                 }
             }
         },
@@ -154,7 +521,8 @@ def get_payment(payment_id):
                     'reference': {'type': 'string'},
                     'payment_method_id': {'type': 'integer'},
                     'year': {'type': 'integer'},
-                    'month': {'type': 'integer'}
+                    'month': {'type': 'integer'},
+                    'proof_ref': {'type': 'string'}
                 }
             }
         }
@@ -173,7 +541,8 @@ def get_payment(payment_id):
                     'payment_method_id': {'type': 'integer'},
                     'creation_date': {'type': 'string', 'format': 'date-time'},
                     'year': {'type': 'integer'},
-                    'month': {'type': 'integer'}
+                    'month': {'type': 'integer'},
+                    'proof_ref': {'type': 'string'}
                 }
             }
         }
@@ -181,7 +550,10 @@ def get_payment(payment_id):
 })
 def add_payment():
     data = request.get_json()
-    new_payment = create_payment(data)
+    try:
+        new_payment = create_payment(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(new_payment.to_dict()), 201
 
 @payment_bp.route('/payments/<int:payment_id>', methods=['PUT'])
@@ -210,7 +582,8 @@ def add_payment():
                     'reference': {'type': 'string'},
                     'payment_method_id': {'type': 'integer'},
                     'year': {'type': 'integer'},
-                    'month': {'type': 'integer'}
+                    'month': {'type': 'integer'},
+                    'proof_ref': {'type': 'string'}
                 }
             }
         }
@@ -229,7 +602,8 @@ def add_payment():
                     'payment_method_id': {'type': 'integer'},
                     'creation_date': {'type': 'string', 'format': 'date-time'},
                     'year': {'type': 'integer'},
-                    'month': {'type': 'integer'}
+                    'month': {'type': 'integer'},
+                    'proof_ref': {'type': 'string'}
                 }
             }
         },
@@ -240,7 +614,10 @@ def add_payment():
 })
 def edit_payment(payment_id):
     data = request.get_json()
-    updated_payment = update_payment(payment_id, data)
+    try:
+        updated_payment = update_payment(payment_id, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(updated_payment.to_dict()) if updated_payment else ('', 404)
 
 @payment_bp.route('/payments/<int:payment_id>', methods=['DELETE'])
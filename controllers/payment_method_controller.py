@@ -1,8 +1,14 @@
 # controllers/payment_method_controller.py
 from flask import Blueprint, jsonify, request
 from flasgger import swag_from
-from models.payment_methods import PaymentMethods
-from db import db
+from controllers.http_cache import etag_cached
+from services.payment_method_service import (
+    get_all_payment_methods,
+    get_payment_method_by_id,
+    create_payment_method,
+    update_payment_method,
+    delete_payment_method as delete_payment_method_service
+)
 
 payment_method_bp = Blueprint('payment_method_bp', __name__)
 
@@ -28,8 +34,9 @@ payment_method_bp = Blueprint('payment_method_bp', __name__)
         }
     }
 })
+@etag_cached('payment_methods')
 def get_payment_methods():
-    payment_methods = PaymentMethods.query.all()
+    payment_methods = get_all_payment_methods()
     return jsonify([payment_method.to_dict() for payment_method in payment_methods])
 
 @payment_method_bp.route('/payment_methods/<int:payment_method_id>', methods=['GET'])
@@ -63,8 +70,9 @@ def get_payment_methods():
         }
     }
 })
+@etag_cached('payment_methods')
 def get_payment_method(payment_method_id):
-    payment_method = PaymentMethods.query.get(payment_method_id)
+    payment_method = get_payment_method_by_id(payment_method_id)
     return jsonify(payment_method.to_dict()) if payment_method else ('', 404)
 
 @payment_method_bp.route('/payment_methods', methods=['POST'])
@@ -101,9 +109,7 @@ def get_payment_method(payment_method_id):
 })
 def add_payment_method():
     data = request.get_json()
-    new_payment_method = PaymentMethods(method=data['method'])
-    db.session.add(new_payment_method)
-    db.session.commit()
+    new_payment_method = create_payment_method(data)
     return jsonify(new_payment_method.to_dict()), 201
 
 @payment_method_bp.route('/payment_methods/<int:payment_method_id>', methods=['PUT'])
@@ -150,10 +156,8 @@ def add_payment_method():
 })
 def edit_payment_method(payment_method_id):
     data = request.get_json()
-    payment_method = PaymentMethods.query.get(payment_method_id)
+    payment_method = update_payment_method(payment_method_id, data)
     if payment_method:
-        payment_method.method = data['method']
-        db.session.commit()
         return jsonify(payment_method.to_dict())
     else:
         return '', 404
@@ -182,10 +186,7 @@ def edit_payment_method(payment_method_id):
     }
 })
 def delete_payment_method(payment_method_id):
-    payment_method = PaymentMethods.query.get(payment_method_id)
-    if payment_method:
-        db.session.delete(payment_method)
-        db.session.commit()
+    if delete_payment_method_service(payment_method_id):
         return '', 204
     else:
         return '', 404
\ No newline at end of file
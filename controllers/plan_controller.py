@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flasgger import swag_from
-from models.plans import Plans
-from db import db
+from controllers.http_cache import etag_cached
+from services.plan_service import get_all_plans, create_plan as create_plan_service, update_plan, delete_plan
 
 plan_bp = Blueprint('plan', __name__)
 
@@ -25,8 +25,9 @@ plan_bp = Blueprint('plan', __name__)
         }
     }
 })
+@etag_cached('plans')
 def get_plans():
-    plans = Plans.query.all()
+    plans = get_all_plans()
     return jsonify([plan.to_dict() for plan in plans])
 
 @plan_bp.route('/plans', methods=['POST'])
@@ -65,9 +66,7 @@ def create_plan():
     if not data or 'name' not in data or 'price' not in data:
         return jsonify({"error": "Invalid input"}), 400
 
-    new_plan = Plans(name=data['name'], price=data['price'])
-    db.session.add(new_plan)
-    db.session.commit()
+    new_plan = create_plan_service(data)
     return jsonify(new_plan.to_dict()), 201
 
 @plan_bp.route('/plans/<int:plan_id>', methods=['PUT'])
@@ -114,15 +113,6 @@ def edit_plan(plan_id):
     updated_plan = update_plan(plan_id, data)
     return jsonify(updated_plan.to_dict()) if updated_plan else ('', 404)
 
-def update_plan(plan_id, data):
-    plan = Plans.query.get(plan_id)
-    if plan:
-        plan.name = data['name']
-        plan.price = data['price']
-        db.session.commit()
-        return plan
-    return None
-
 @plan_bp.route('/plans/<int:plan_id>', methods=['DELETE'])
 @swag_from({
     'tags': ['Plans'],
@@ -149,10 +139,3 @@ def remove_plan(plan_id):
     deleted_plan = delete_plan(plan_id)
     return jsonify(deleted_plan.to_dict()) if deleted_plan else ('', 404)
 
-def delete_plan(plan_id):
-    plan = Plans.query.get(plan_id)
-    if plan:
-        db.session.delete(plan)
-        db.session.commit()
-        return plan
-    return None
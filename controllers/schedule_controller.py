@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flasgger import swag_from
+from controllers.http_cache import etag_cached
+from services.pagination import serialize_row
+from controllers.pagination import PAGINATION_PARAMETERS, parse_list_args, list_response
+from services.schedule_slot_service import get_upcoming_classes, DEFAULT_WITHIN_MINUTES, MAX_WITHIN_MINUTES
 from services.schedule_service import get_all_schedules, get_schedule_by_id, create_schedule, update_schedule as update_schedule_controller , delete_schedule as delete_schedule_service
 
 # Create the Blueprint for schedules
@@ -8,6 +12,7 @@ schedule_bp = Blueprint('schedule', __name__)
 @schedule_bp.route('/schedules', methods=['GET'])
 @swag_from({
     'tags': ['Schedules'],
+    'parameters': PAGINATION_PARAMETERS,
     'responses': {
         200: {
             'description': 'A list of schedules',
@@ -27,12 +32,69 @@ schedule_bp = Blueprint('schedule', __name__)
         }
     }
 })
+@etag_cached('schedule', 'locations')
 def get_schedules():
     """
     Fetch all schedules.
     """
-    schedules = get_all_schedules()
-    return jsonify([schedule.to_dict() for schedule in schedules])
+    try:
+        limit, after, fields = parse_list_args()
+        schedules = get_all_schedules(limit=limit, after=after, fields=fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(schedules, limit, serialize_row if fields else lambda schedule: schedule.to_dict())
+
+@schedule_bp.route('/schedules/upcoming', methods=['GET'])
+@swag_from({
+    'tags': ['Schedules'],
+    'summary': 'Upcoming classes',
+    'description': 'Classes starting in the next minutes, in the gym\'s time zone, answered from the indexed schedule slots.',
+    'parameters': [
+        {
+            'name': 'location_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Only classes at this location'
+        },
+        {
+            'name': 'within',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': f'Minutes to look ahead (default {DEFAULT_WITHIN_MINUTES}, at most {MAX_WITHIN_MINUTES})'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'The upcoming classes, soonest first',
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'schedule_id': {'type': 'integer'},
+                        'location_id': {'type': 'integer'},
+                        'location_name': {'type': 'string'},
+                        'starts_at': {'type': 'string', 'format': 'date-time'},
+                        'minutes_until': {'type': 'integer'}
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid parameters'
+        }
+    }
+})
+def get_upcoming_schedules():
+    location_id = request.args.get('location_id', type=int)
+    within = request.args.get('within', DEFAULT_WITHIN_MINUTES, type=int)
+    try:
+        classes = get_upcoming_classes(location_id=location_id, within=within)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(classes)
 
 @schedule_bp.route('/schedules/<int:schedule_id>', methods=['GET'])
 @swag_from({
@@ -67,6 +129,7 @@ def get_schedules():
         }
     }
 })
+@etag_cached('schedule', 'locations')
 def get_schedule(schedule_id):
     """
     Fetch a specific schedule by its ID.
@@ -107,6 +170,9 @@ def get_schedule(schedule_id):
                     'creation_date': {'type': 'string', 'format': 'date-time'}
                 }
             }
+        },
+        400: {
+            'description': 'Days or start times that cannot be parsed'
         }
     }
 })
@@ -115,7 +181,10 @@ def add_schedule():
     Add a new schedule.
     """
     data = request.get_json()
-    new_schedule = create_schedule(data)
+    try:
+        new_schedule = create_schedule(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(new_schedule.to_dict()), 201
 
 @schedule_bp.route('/schedules/<int:schedule_id>', methods=['PUT'])
@@ -159,6 +228,9 @@ def add_schedule():
                 }
             }
         },
+        400: {
+            'description': 'Days or start times that cannot be parsed'
+        },
         404: {
             'description': 'Schedule not found'
         }
@@ -169,7 +241,10 @@ def edit_schedule(schedule_id):
     Update an existing schedule by its ID.
     """
     data = request.get_json()
-    updated_schedule = update_schedule_controller(schedule_id, data)
+    try:
+        updated_schedule = update_schedule_controller(schedule_id, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(updated_schedule.to_dict()) if updated_schedule else ('', 404)
 
 @schedule_bp.route('/schedules/<int:schedule_id>', methods=['DELETE'])
@@ -2,8 +2,11 @@
 
 from flask import Blueprint, request, jsonify
 from flasgger import swag_from
+from controllers.http_cache import etag_cached
 from services.user_service import (
     get_all_users,
+    search_users,
+    SEARCH_PAGE_SIZE,
     get_user_by_id,
     get_user_by_cedula,
     get_user_by_telegram_id,
@@ -11,7 +14,9 @@ from services.user_service import (
     create_user,
     update_user
 )
+from services.delinquency_service import evaluate_delinquency
 from models.users import UserType, Status
+from controllers.pagination import PAGINATION_PARAMETERS, parse_list_args, list_response, wants_ndjson
 
 user_bp = Blueprint('user', __name__)
 
@@ -19,7 +24,8 @@ user_bp = Blueprint('user', __name__)
 @swag_from({
     'tags': ['Users'],
     'summary': 'Get all users',
-    'description': 'Retrieve a list of all users.',
+    'description': 'Retrieve a list of all users, optionally paginated by ID and projected to selected fields.',
+    'parameters': PAGINATION_PARAMETERS,
     'responses': {
         200: {
             'description': 'A list of users',
@@ -46,9 +52,120 @@ user_bp = Blueprint('user', __name__)
         }
     }
 })
+@etag_cached('user')
 def get_users():
-    users = get_all_users()
-    return jsonify([user.to_dict() for user in users])
+    try:
+        limit, after, fields = parse_list_args()
+        users = get_all_users(limit=limit, after=after, fields=fields, stream=wants_ndjson())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(users, limit)
+
+@user_bp.route('/users/search', methods=['GET'])
+@swag_from({
+    'tags': ['Users'],
+    'summary': 'Search users',
+    'description': 'Find users whose name, last name or cedula starts with each word of the query. Results are paginated by ID (20 per page by default).',
+    'parameters': [
+        {
+            'name': 'q',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'Search text, e.g. "ana per" or the first digits of a cedula'
+        }
+    ] + PAGINATION_PARAMETERS,
+    'responses': {
+        200: {
+            'description': 'The matching users, ordered by ID',
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'id': {'type': 'integer'},
+                        'name': {'type': 'string'},
+                        'lastname': {'type': 'string'},
+                        'cedula': {'type': 'integer'},
+                        'telegram_id': {'type': 'integer'},
+                        'estatus': {'type': 'string'}
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Missing query or invalid parameters'
+        }
+    }
+})
+def search_users_controller():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': "'q' is required"}), 400
+    try:
+        limit, after, fields = parse_list_args()
+        users = search_users(q, limit=limit, after=after, fields=fields, stream=wants_ndjson())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(users, limit or SEARCH_PAGE_SIZE)
+
+@user_bp.route('/users/delinquency', methods=['POST'])
+@swag_from({
+    'tags': ['Users'],
+    'summary': 'Evaluate delinquency',
+    'description': 'Set to moroso every active member whose payments for the period add up to less than the price of their plan, and set members who have since paid back to activo. Defaults to the current month.',
+    'parameters': [
+        {
+            'name': 'year',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Year of the period'
+        },
+        {
+            'name': 'month',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Month of the period (1-12)'
+        },
+        {
+            'name': 'dry_run',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'description': 'Only count, without changing any status'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Counts of the evaluation',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'year': {'type': 'integer'},
+                    'month': {'type': 'integer'},
+                    'evaluated': {'type': 'integer'},
+                    'delinquent': {'type': 'integer'},
+                    'marked_moroso': {'type': 'integer'},
+                    'restored_activo': {'type': 'integer'},
+                    'dry_run': {'type': 'boolean'},
+                    'elapsed_ms': {'type': 'number'}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid month'
+        }
+    }
+})
+def evaluate_delinquency_controller():
+    year = request.args.get('year', type=int)
+    month = request.args.get('month', type=int)
+    if month is not None and not 1 <= month <= 12:
+        return jsonify({'error': "'month' must be between 1 and 12"}), 400
+    dry_run = request.args.get('dry_run', 'false').lower() in ('1', 'true', 'yes')
+    return jsonify(evaluate_delinquency(year, month, dry_run))
 
 @user_bp.route('/users/<int:id>', methods=['GET'])
 @swag_from({
@@ -1,3 +1,22 @@
-bind = "0.0.0.0:5000"
-workers = 3
-timeout = 120
\ No newline at end of file
+import os
+
+# Every setting can be overridden from the environment (see README.md)
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", 3))
+# sync: one request per worker; gthread: GUNICORN_THREADS requests per worker; gevent: cooperative, needs gevent and psycogreen
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))  # gevent only
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))  # recycle workers after this many requests; 0 disables
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+def post_fork(server, worker):
+    # psycopg2 blocks the gevent hub unless it is patched to cooperate
+    if worker_class == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen is not installed: database calls will block the gevent worker")
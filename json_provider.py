@@ -0,0 +1,41 @@
+# json_provider.py
+import os
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson, several times faster than the standard library on large lists.
+
+    orjson writes dates and datetimes as ISO 8601 and enums as their value, the same as the
+    models' to_dict(), so result rows can be returned without converting every value first
+    (see controllers.pagination.list_response). Other types fall back to Flask's defaults.
+    """
+    native_types = True
+
+    def _option(self):
+        return orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._option()), mimetype=self.mimetype
+        )
+
+def init_json_provider(app):
+    """
+    Use orjson for request and response bodies when it is installed, unless JSON_PROVIDER=default.
+    """
+    if orjson is not None and os.getenv('JSON_PROVIDER', 'orjson') == 'orjson':
+        app.json_provider_class = OrjsonProvider
+        app.json = OrjsonProvider(app)
@@ -8,6 +8,10 @@ from .plans import Plans
 from .language import Language
 from .coaches import Coach
 from .attendance import Attendance
+from .attendance_rollup import AttendanceRollup
+from .schedule_slot import ScheduleSlot
+from .table_version import TableVersion
+from .proof_rendition import ProofRendition
 
 # Add all models to this list if needed
-all_models = [User, Schedule, Locations, PaymentMethods, Payment, LocationUsers, Plans, Language, Coach, Attendance]
\ No newline at end of file
+all_models = [User, Schedule, Locations, PaymentMethods, Payment, LocationUsers, Plans, Language, Coach, Attendance, AttendanceRollup, ScheduleSlot, TableVersion, ProofRendition]
\ No newline at end of file
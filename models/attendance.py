@@ -17,6 +17,14 @@ class Attendance(db.Model):
     location = db.relationship('Locations', backref=db.backref('attendances', lazy=True))  # String reference
     user = db.relationship('User', backref=db.backref('attendances', lazy=True))  # String reference
 
+    # Attendance is looked up per user, location or coach over a date range, or by date alone
+    __table_args__ = (
+        db.Index('ix_attendance_user_id_date', 'user_id', 'date'),
+        db.Index('ix_attendance_location_id_date', 'location_id', 'date'),
+        db.Index('ix_attendance_coach_id_date', 'coach_id', 'date'),
+        db.Index('ix_attendance_date', 'date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -0,0 +1,27 @@
+# models/attendance_rollup.py
+from db import db  # Import db from db.py
+
+class AttendanceRollup(db.Model):
+    """
+    Number of attendances per day, location and coach.
+
+    Kept up to date by AttendanceService on every insert, update and delete, and rebuilt from
+    the attendance table with `flask attendance rebuild-rollup`.
+    """
+    __tablename__ = 'attendance_rollup'
+
+    day = db.Column(db.Date, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), primary_key=True)
+    coach_id = db.Column(db.Integer, db.ForeignKey('coach.id'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'location_id': self.location_id,
+            'coach_id': self.coach_id,
+            'count': self.count
+        }
+
+    def __repr__(self):
+        return f"<AttendanceRollup day={self.day}, location_id={self.location_id}, coach_id={self.coach_id}, count={self.count}>"
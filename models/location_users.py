@@ -29,6 +29,12 @@ class LocationUsers(db.Model):
     user = db.relationship('User', backref=db.backref('location_users', lazy=True))  # Correct the class name to 'User', not 'Users'
     location = db.relationship('Locations', backref=db.backref('location_users', lazy=True))
     plan = db.relationship('Plans', backref=db.backref('location_users', lazy=True))
+
+    # Memberships are looked up by user and by location
+    __table_args__ = (
+        db.Index('ix_location_users_user_id', 'user_id'),
+        db.Index('ix_location_users_location_id', 'location_id'),
+    )
     
     # __repr__ method to return a string representation of the object
     def __repr__(self):
@@ -15,10 +15,18 @@ class Payment(db.Model):
     creation_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     year = db.Column(db.Integer, nullable=False)
     month = db.Column(db.Integer, nullable=False)
+    proof_ref = db.Column(db.String(80), nullable=True)  # content-addressed proof in storage/, see storage.local
 
     user = db.relationship('User', backref=db.backref('payments', lazy=True))
     payment_method = db.relationship('PaymentMethods', backref=db.backref('payments', lazy=True))
 
+    # Monthly reports filter by (year, month); per-user lookups by user_id; proofs are found by ref
+    __table_args__ = (
+        db.Index('ix_payment_year_month', 'year', 'month'),
+        db.Index('ix_payment_user_id', 'user_id'),
+        db.Index('ix_payment_proof_ref', 'proof_ref'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -29,8 +37,9 @@ class Payment(db.Model):
             'payment_method_id': self.payment_method_id,
             'creation_date': self.creation_date.isoformat(),
             'year': self.year,
-                'month': self.month
-            }
+            'month': self.month,
+            'proof_ref': self.proof_ref
+        }
 
     def to_custom_dict(self):
         return OrderedDict([
@@ -42,7 +51,7 @@ class Payment(db.Model):
             ('Monto', self.amount),
             ('Año', self.year),
             ('Mes', self.month),
-            ('ImageRef', f"{self.user.telegram_id}_{self.date.strftime('%Y%m%d')}")
+            ('ImageRef', self.proof_ref or f"{self.user.telegram_id}_{self.date.strftime('%Y%m%d')}")
         ])     
 
     def __repr__(self):
@@ -0,0 +1,44 @@
+# models/proof_rendition.py
+from db import db  # Import db from db.py
+from datetime import datetime
+
+class ProofRendition(db.Model):
+    """
+    Derived files of an uploaded payment proof, produced in the background by services/proof_pipeline.py.
+
+    Every file is itself a content-addressed ref in the proof storage. `archive_ref` is the
+    recompressed image that replaces the upload when `replaced` is set (payments then link the
+    archive); PDFs keep their upload and only get a thumbnail of their first page.
+    """
+    __tablename__ = 'proof_rendition'
+
+    source_ref = db.Column(db.String(80), primary_key=True)
+    archive_ref = db.Column(db.String(80), nullable=True)
+    thumbnail_ref = db.Column(db.String(80), nullable=True)
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, done or failed
+    error = db.Column(db.String(255), nullable=True)
+    source_size = db.Column(db.Integer, nullable=True)
+    archive_size = db.Column(db.Integer, nullable=True)
+    replaced = db.Column(db.Boolean, nullable=False, default=False)
+    creation_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Payments link the archive once it replaced the upload, so thumbnails are also found by it
+    __table_args__ = (
+        db.Index('ix_proof_rendition_archive_ref', 'archive_ref'),
+    )
+
+    def to_dict(self):
+        return {
+            'source_ref': self.source_ref,
+            'archive_ref': self.archive_ref,
+            'thumbnail_ref': self.thumbnail_ref,
+            'status': self.status,
+            'error': self.error,
+            'source_size': self.source_size,
+            'archive_size': self.archive_size,
+            'replaced': self.replaced,
+            'creation_date': self.creation_date.isoformat()
+        }
+
+    def __repr__(self):
+        return f"<ProofRendition source_ref={self.source_ref}, status={self.status}>"
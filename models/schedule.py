@@ -1,6 +1,7 @@
 # models/schedule.py
 from db import db  # Import db from db.py
 import enum
+from sqlalchemy.orm.exc import DetachedInstanceError
 from models.locations import Locations
 from datetime import datetime
 
@@ -17,7 +18,7 @@ class Schedule(db.Model):
         """Convert the Schedule model instance to a dictionary."""
         try:
             location_name = self.location.location if self.location else None
-        except sqlalchemy.orm.exc.DetachedInstanceError:
+        except DetachedInstanceError:
             location_name = None
 
         return {
@@ -0,0 +1,38 @@
+# models/schedule_slot.py
+from db import db  # Import db from db.py
+from models.schedule import Schedule
+
+class ScheduleSlot(db.Model):
+    """
+    One class start of a schedule: a weekday (0 = Monday) and the minute of the day it starts.
+
+    Parsed from Schedule.days and Schedule.time_init by services.schedule_slot_service whenever a
+    schedule is written, and rebuilt for existing rows with `flask schedules rebuild-slots`.
+    """
+    __tablename__ = 'schedule_slot'
+
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedule.id', ondelete='CASCADE'), nullable=False)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
+    weekday = db.Column(db.SmallInteger, nullable=False)
+    minute_of_day = db.Column(db.SmallInteger, nullable=False)
+
+    schedule = db.relationship('Schedule', backref=db.backref('slots', lazy=True, cascade='all, delete-orphan'))
+
+    # Upcoming classes are looked up by location, weekday and a range of minutes
+    __table_args__ = (
+        db.Index('ix_schedule_slot_location_time', 'location_id', 'weekday', 'minute_of_day'),
+        db.Index('ix_schedule_slot_time', 'weekday', 'minute_of_day'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'schedule_id': self.schedule_id,
+            'location_id': self.location_id,
+            'weekday': self.weekday,
+            'time': f"{self.minute_of_day // 60:02d}:{self.minute_of_day % 60:02d}"
+        }
+
+    def __repr__(self):
+        return f"<ScheduleSlot schedule_id={self.schedule_id}, weekday={self.weekday}, minute_of_day={self.minute_of_day}>"
@@ -0,0 +1,16 @@
+# models/table_version.py
+from db import db  # Import db from db.py
+
+class TableVersion(db.Model):
+    """
+    Change counter of a reference table, bumped in the same transaction as every write to it.
+
+    Used to build the ETags of the reference data endpoints (see controllers/http_cache.py).
+    """
+    __tablename__ = 'table_version'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TableVersion table_name={self.table_name}, version={self.version}>"
@@ -28,6 +28,17 @@ class User(db.Model):
     telegram_id = db.Column(db.BigInteger, unique=True, nullable=False)
     estatus = db.Column(db.Enum(Status), unique=False, nullable=False, default=Status.activo)
 
+    # Prefix search (services.user_service.search_users) matches lower(name), lower(lastname) and the
+    # cedula as text; text_pattern_ops lets Postgres use these indexes for LIKE 'abc%' in any collation
+    __table_args__ = (
+        db.Index('ix_user_name_lower', db.func.lower(name).label('name_lower'),
+                 postgresql_ops={'name_lower': 'text_pattern_ops'}),
+        db.Index('ix_user_lastname_lower', db.func.lower(lastname).label('lastname_lower'),
+                 postgresql_ops={'lastname_lower': 'text_pattern_ops'}),
+        db.Index('ix_user_cedula_text', db.cast(cedula, db.Text).label('cedula_text'),
+                 postgresql_ops={'cedula_text': 'text_pattern_ops'}),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
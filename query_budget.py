@@ -0,0 +1,62 @@
+# query_budget.py
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from db import db  # Import db from db.py
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in testing mode when a GET request issues more SQL statements than allowed."""
+
+def _count_request_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+def init_query_budget(app):
+    """
+    Count the SQL statements issued by every request and enforce `QUERY_BUDGET` on GET requests.
+
+    The check is disabled unless `QUERY_BUDGET` is configured. When the app is in testing mode
+    a request over budget raises QueryBudgetExceeded, otherwise it is only reported, so N+1
+    regressions on list endpoints fail the tests instead of slowing down production.
+    """
+    budget = app.config.get('QUERY_BUDGET')
+    if not budget:
+        return
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _count_request_statement)
+
+    @app.before_request
+    def reset_query_count():
+        g.query_count = 0
+
+    @app.after_request
+    def check_query_budget(response):
+        count = g.get('query_count', 0)
+        if request.method == 'GET' and count > budget:
+            message = f"{request.method} {request.path} issued {count} SQL statements (budget: {budget})"
+            if app.testing:
+                raise QueryBudgetExceeded(message)
+            print(f"Query budget exceeded: {message}")
+        return response
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements executed inside the block.
+
+    Usage:
+        with count_queries() as counter:
+            client.get('/attendances')
+        assert counter['count'] <= 2
+    """
+    counter = {'count': 0}
+
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', _count_statement)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _count_statement)
@@ -0,0 +1,124 @@
+# services/attendance_rollup_service.py
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from models.attendance import Attendance
+from models.attendance_rollup import AttendanceRollup
+from models.coaches import Coach
+from models.locations import Locations
+from db import db  # Import db from db.py
+
+GROUP_BY_OPTIONS = ('location', 'coach', 'day', 'week')
+
+def attendance_day(value):
+    """Return the day of an attendance date, which may still be the 'YYYY-MM-DD HH:MM' string it was created with."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(value).date()
+
+def rollup_key(attendance):
+    return (attendance_day(attendance.date), attendance.location_id, attendance.coach_id)
+
+def apply_deltas(deltas):
+    """
+    Add counts to the rollup in the current transaction (the caller commits).
+
+    :param deltas: Iterable of ((day, location_id, coach_id), delta) pairs.
+    """
+    totals = Counter()
+    for key, delta in deltas:
+        totals[key] += delta
+
+    dialect = db.session.get_bind().dialect.name
+    for (day, location_id, coach_id), delta in totals.items():
+        if delta == 0:
+            continue
+        values = {'day': day, 'location_id': location_id, 'coach_id': coach_id, 'count': delta}
+        if dialect in ('postgresql', 'sqlite'):
+            insert = (postgresql if dialect == 'postgresql' else sqlite).insert(AttendanceRollup).values(**values)
+            db.session.execute(insert.on_conflict_do_update(
+                index_elements=['day', 'location_id', 'coach_id'],
+                set_={'count': AttendanceRollup.count + insert.excluded.count}
+            ))
+        else:
+            row = db.session.get(AttendanceRollup, (day, location_id, coach_id))
+            if row:
+                row.count += delta
+            else:
+                db.session.add(AttendanceRollup(**values))
+        if delta < 0:
+            # Emptied buckets are removed, as a rebuild would not create them
+            AttendanceRollup.query.filter_by(day=day, location_id=location_id, coach_id=coach_id) \
+                .filter(AttendanceRollup.count <= 0).delete(synchronize_session=False)
+
+def rebuild_rollup(date_from=None, date_to=None):
+    """
+    Recompute the rollup from the attendance table, for every day or for [date_from, date_to].
+
+    :return: The number of rollup rows written.
+    """
+    day = func.date(Attendance.date)
+    delete = AttendanceRollup.query
+    source = db.session.query(
+        day.label('day'), Attendance.location_id, Attendance.coach_id, func.count().label('count')
+    )
+    if date_from:
+        delete = delete.filter(AttendanceRollup.day >= date_from)
+        source = source.filter(Attendance.date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        delete = delete.filter(AttendanceRollup.day <= date_to)
+        source = source.filter(Attendance.date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+
+    rows = [
+        {'day': attendance_day(row.day), 'location_id': row.location_id, 'coach_id': row.coach_id, 'count': row.count}
+        for row in source.group_by(day, Attendance.location_id, Attendance.coach_id)
+    ]
+    delete.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(AttendanceRollup.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+def get_attendance_stats(group_by, date_from=None, date_to=None):
+    """
+    Attendance totals from the rollup, grouped by location, coach, day or week (starting Monday).
+
+    :param group_by: One of GROUP_BY_OPTIONS.
+    :param date_from: Optional first day included.
+    :param date_to: Optional last day included.
+    :return: A list of dictionaries with the group and its 'count'.
+    :raises ValueError: If group_by is not supported.
+    """
+    if group_by not in GROUP_BY_OPTIONS:
+        raise ValueError(f"'group_by' must be one of: {', '.join(GROUP_BY_OPTIONS)}")
+
+    total = func.sum(AttendanceRollup.count).label('count')
+    if group_by == 'location':
+        query = db.session.query(AttendanceRollup.location_id, Locations.location.label('location_name'), total) \
+            .join(Locations, Locations.id == AttendanceRollup.location_id) \
+            .group_by(AttendanceRollup.location_id, Locations.location).order_by(AttendanceRollup.location_id)
+    elif group_by == 'coach':
+        query = db.session.query(AttendanceRollup.coach_id, Coach.names.label('coach_name'), total) \
+            .join(Coach, Coach.id == AttendanceRollup.coach_id) \
+            .group_by(AttendanceRollup.coach_id, Coach.names).order_by(AttendanceRollup.coach_id)
+    else:
+        query = db.session.query(AttendanceRollup.day, total).group_by(AttendanceRollup.day).order_by(AttendanceRollup.day)
+
+    if date_from:
+        query = query.filter(AttendanceRollup.day >= date_from)
+    if date_to:
+        query = query.filter(AttendanceRollup.day <= date_to)
+
+    if group_by == 'week':
+        # At most one row per day, so weeks are summed here instead of with dialect-specific SQL
+        weeks = OrderedDict()
+        for row in query:
+            week = row.day - timedelta(days=row.day.weekday())
+            weeks[week] = weeks.get(week, 0) + row.count
+        return [{'week': week.isoformat(), 'count': count} for week, count in weeks.items()]
+    if group_by == 'day':
+        return [{'day': row.day.isoformat(), 'count': row.count} for row in query]
+    return [dict(row._mapping) for row in query]
@@ -1,10 +1,14 @@
 from datetime import datetime
 import pytz
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
 from models.attendance import Attendance
 from models.coaches import Coach
 from models.locations import Locations
 from models.users import User
 from db import db
+from services.pagination import keyset_query, fetch_rows
+from services.attendance_rollup_service import apply_deltas, rollup_key
 
 class AttendanceService:
 
@@ -37,6 +41,8 @@ class AttendanceService:
                 date=date_str
             )
             db.session.add(new_attendance)
+            db.session.flush()
+            apply_deltas([(rollup_key(new_attendance), 1)])
             db.session.commit()
             return new_attendance
         except Exception as e:
@@ -44,6 +50,62 @@ class AttendanceService:
             db.session.rollback()
             return None
 
+    # Most members accepted by one bulk check-in
+    MAX_BULK_SIZE = 200
+
+    @staticmethod
+    def create_attendances_bulk(data):
+        """
+        Check in several users for the same coach, location and date in one transaction.
+
+        All rows are written with a single multi-row INSERT and one commit; if any row fails
+        nothing is stored.
+
+        :param data: Dictionary containing 'coach_id', 'location_id', 'user_ids' and optionally 'date'
+                     ('YYYY-MM-DD HH:MM', now by default).
+        :return: The list of created attendance IDs.
+        :raises ValueError: If the payload is invalid or references unknown records.
+        """
+        coach_id = data.get('coach_id')
+        location_id = data.get('location_id')
+        user_ids = data.get('user_ids')
+        if not isinstance(coach_id, int) or not isinstance(location_id, int):
+            raise ValueError("'coach_id' and 'location_id' must be integers")
+        if not isinstance(user_ids, list) or not user_ids or not all(isinstance(user_id, int) for user_id in user_ids):
+            raise ValueError("'user_ids' must be a non-empty list of integers")
+        user_ids = list(dict.fromkeys(user_ids))  # ignore repeated check-ins in the same request
+        if len(user_ids) > AttendanceService.MAX_BULK_SIZE:
+            raise ValueError(f"At most {AttendanceService.MAX_BULK_SIZE} users per request")
+
+        date_str = data.get('date')
+        try:
+            date = datetime.fromisoformat(date_str) if date_str else datetime.utcnow()
+        except (TypeError, ValueError):
+            raise ValueError("'date' must have the format 'YYYY-MM-DD HH:MM'")
+
+        if not db.session.get(Coach, coach_id):
+            raise ValueError(f"Coach {coach_id} not found")
+        if not db.session.get(Locations, location_id):
+            raise ValueError(f"Location {location_id} not found")
+        found = {row.id for row in db.session.query(User.id).filter(User.id.in_(user_ids))}
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            raise ValueError(f"Users not found: {', '.join(map(str, missing))}")
+
+        now = datetime.utcnow()
+        rows = [
+            {'coach_id': coach_id, 'location_id': location_id, 'user_id': user_id, 'date': date, 'creation_date': now}
+            for user_id in user_ids
+        ]
+        try:
+            ids = db.session.scalars(insert(Attendance).returning(Attendance.id), rows).all()
+            apply_deltas([((date.date(), location_id, coach_id), len(ids))])
+            db.session.commit()
+            return ids
+        except Exception:
+            db.session.rollback()
+            raise
+
     @staticmethod
     def get_attendance_by_id(attendance_id):
         """
@@ -55,13 +117,31 @@ class AttendanceService:
         return Attendance.query.get(attendance_id)
 
     @staticmethod
-    def list_all_attendances():
+    def list_all_attendances(limit=None, after=None, fields=None, stream=False):
         """
-        List all attendance records.
+        List attendance records ordered by ID.
 
-        :return: A list of all Attendance objects.
+        :param limit: Maximum number of records to return, or None for all of them.
+        :param after: Only return records with an ID greater than this cursor.
+        :param fields: Optional list of columns to select; by default the fields of Attendance.to_dict().
+        :param stream: Return an iterator over a server-side cursor instead of a list.
+        :return: A list of result rows.
         """
-        return Attendance.query.all()
+        # The fields of to_dict(), with the coach, location and user names joined in, as plain rows
+        query = db.session.query(
+            Attendance.id,
+            Attendance.coach_id,
+            Coach.names.label('coach_name'),
+            Attendance.location_id,
+            Locations.location.label('location_name'),
+            Attendance.user_id,
+            User.name.label('user_name'),
+            Attendance.date,
+            Attendance.creation_date
+        ).outerjoin(Coach, Coach.id == Attendance.coach_id) \
+            .outerjoin(Locations, Locations.id == Attendance.location_id) \
+            .outerjoin(User, User.id == Attendance.user_id)
+        return fetch_rows(keyset_query(Attendance, query=query, limit=limit, after=after, fields=fields), stream)
 
     @staticmethod
     def update_attendance(attendance_id, data):
@@ -77,10 +157,12 @@ class AttendanceService:
             if not attendance:
                 return {"error": "Attendance not found"}, 404
 
-            # Update fields
+            # Update fields, moving the record between rollup buckets if needed
+            old_key = rollup_key(attendance)
             for key, value in data.items():
                 if hasattr(attendance, key):
                     setattr(attendance, key, value)
+            apply_deltas([(old_key, -1), (rollup_key(attendance), 1)])
 
             db.session.commit()
             return attendance
@@ -101,6 +183,7 @@ class AttendanceService:
             if not attendance:
                 return {"error": "Attendance not found"}, 404
 
+            apply_deltas([(rollup_key(attendance), -1)])
             db.session.delete(attendance)
             db.session.commit()
             return attendance
@@ -0,0 +1,176 @@
+# services/cache.py
+import os
+import select
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from services.table_version_service import get_versions
+from db import db  # Import db from db.py
+
+# Seconds a cached reference list is served before it is reloaded; 0 disables the cache
+CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', 300))
+# How invalidations reach the other gunicorn workers: 'postgres' (LISTEN/NOTIFY) or 'local' (this process only).
+# Defaults to 'postgres' when the database is Postgres.
+CACHE_BUS = os.getenv('REFERENCE_CACHE_BUS')
+NOTIFY_CHANNEL = 'rhino_reference_cache'
+
+class LocalBus:
+    """In-process stand-in for a pub/sub channel: messages reach the subscribers of this process only."""
+    name = 'local'
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def publish(self, namespace):
+        for callback in self._subscribers:
+            callback(namespace)
+
+class PostgresBus(LocalBus):
+    """
+    Invalidations broadcast with Postgres NOTIFY and received by a LISTEN thread in every worker process.
+
+    The thread is started lazily by the first cache read of each process, so it runs in the
+    gunicorn workers rather than in the master that forked them.
+    """
+    name = 'postgres'
+
+    def __init__(self, channel=NOTIFY_CHANNEL):
+        super().__init__()
+        self.channel = channel
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+
+    def publish(self, namespace):
+        with db.engine.connect() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :namespace)"), {'channel': self.channel, 'namespace': namespace})
+            connection.commit()
+
+    def start(self):
+        with self._start_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            thread = threading.Thread(target=self._listen, args=(db.engine,), name='reference-cache-listener', daemon=True)
+            thread.start()
+
+    def _listen(self, engine):
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        while True:
+            try:
+                connection = engine.dialect.loaded_dbapi.connect(*cargs, **cparams)
+                connection.autocommit = True
+                connection.cursor().execute(f'LISTEN "{self.channel}"')
+                # Messages sent while not listening are lost: start over from an empty cache
+                super().publish(None)
+                while True:
+                    if select.select([connection], [], [], 60) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        super().publish(connection.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Reference cache listener disconnected: {e}")
+                time.sleep(5)
+
+class ReferenceCache:
+    """
+    Per-process cache of small, read-mostly lists (plans, payment methods, locations, schedules).
+
+    Values are loaded in a private session that is closed right away, so the cached objects are
+    detached, fully loaded and never expired by the commits of a request. Each entry records the
+    table_version counters of the tables it was loaded from and is reloaded as soon as one of
+    them moves, so a lost or late invalidation never serves a list older than the versions (and
+    the ETags built from them). Entries also expire after `ttl` seconds and are dropped in every
+    process when a service writes to their table.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, bus=None):
+        self.ttl = ttl
+        self.bus = bus or LocalBus()
+        self.bus.subscribe(self._drop)
+        self._entries = {}
+        self._generations = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, namespace, loader, tables=()):
+        """
+        Return the cached value of `namespace`, or load it with `loader(session)` and cache it.
+
+        :param namespace: Name of the cached value, e.g. 'plans'.
+        :param loader: Callable receiving a SQLAlchemy session and returning the value.
+        :param tables: Versioned tables (VERSIONED_TABLES) the value is read from; the cached
+                       value is reloaded when any of their versions changes.
+        """
+        if not self.ttl:
+            return self._load(loader)
+        if isinstance(self.bus, PostgresBus):
+            self.bus.start()
+
+        # Read before loading: a write committed in between can only make the value newer than
+        # the versions it is cached under, which costs a reload, never a stale hit
+        versions = get_versions(tables) if tables else {}
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'invalidations': 0})
+            entry = self._entries.get(namespace)
+            if entry and entry[0] > time.monotonic() and entry[1] == versions:
+                stats['hits'] += 1
+                return entry[2]
+            stats['misses'] += 1
+            generation = self._generations.get(namespace, 0)
+
+        value = self._load(loader)
+        with self._lock:
+            # Not cached if a write invalidated the namespace while it was loading
+            if self._generations.get(namespace, 0) == generation:
+                self._entries[namespace] = (time.monotonic() + self.ttl, versions, value)
+        return value
+
+    def invalidate(self, *namespaces):
+        """Drop `namespaces` here and in every other process; call after the write is committed."""
+        for namespace in namespaces:
+            self._drop(namespace)
+            if self.bus.name != 'local':
+                try:
+                    self.bus.publish(namespace)
+                except Exception as e:
+                    # The other workers still refresh when the entry expires
+                    print(f"Error broadcasting cache invalidation of {namespace}: {e}")
+
+    def stats(self):
+        """Hit, miss and invalidation counters of this process, per namespace."""
+        with self._lock:
+            return {
+                'bus': self.bus.name,
+                'ttl': self.ttl,
+                'pid': os.getpid(),
+                'namespaces': {
+                    namespace: dict(stats, cached=namespace in self._entries)
+                    for namespace, stats in self._stats.items()
+                }
+            }
+
+    def _drop(self, namespace):
+        """Forget one namespace, or all of them when namespace is None."""
+        with self._lock:
+            namespaces = list(self._generations.keys() | self._entries.keys()) if namespace is None else [namespace]
+            for name in namespaces:
+                self._entries.pop(name, None)
+                self._generations[name] = self._generations.get(name, 0) + 1
+                self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'invalidations': 0})['invalidations'] += 1
+
+    @staticmethod
+    def _load(loader):
+        with Session(db.engine) as session:
+            return loader(session)
+
+def _default_bus():
+    bus = CACHE_BUS or ('postgres' if (os.getenv('DATABASE_URL') or '').startswith('postgres') else 'local')
+    return PostgresBus() if bus == 'postgres' else LocalBus()
+
+# Cache shared by the services of this process
+reference_cache = ReferenceCache(bus=_default_bus())
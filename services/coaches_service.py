@@ -1,6 +1,8 @@
 from models.coaches import Coach
+from models.locations import Locations
 from sqlalchemy.orm import joinedload
 from db import db
+from services.pagination import keyset_query, fetch_rows
 
 class CoachesService:
     @staticmethod
@@ -19,9 +21,14 @@ class CoachesService:
         return query.filter(Coach.id == coach_id).first()
 
     @staticmethod
-    def get_all_coaches():
-        """Retrieve all coaches."""
-        return Coach.query.all()
+    def get_all_coaches(limit=None, after=None, fields=None, stream=False):
+        """Retrieve all coaches as result rows, optionally paginated and projected to `fields`; streamed with `stream`."""
+        # The fields of to_dict(), with the location name joined in
+        query = db.session.query(
+            Coach.id, Coach.cedula, Coach.names, Coach.location_id,
+            Locations.location.label('location_name'), Coach.creation_date
+        ).outerjoin(Locations, Locations.id == Coach.location_id)
+        return fetch_rows(keyset_query(Coach, query=query, limit=limit, after=after, fields=fields), stream)
 
     @staticmethod
     def update_coach(coach_id, cedula=None, names=None, location_id=None):
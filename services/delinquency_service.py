@@ -0,0 +1,83 @@
+# services/delinquency_service.py
+import time
+from datetime import date
+from sqlalchemy import func, select, update
+from models.users import User, Status
+from models.payment import Payment
+from models.location_users import LocationUsers, Status as MembershipStatus
+from models.plans import Plans
+from services.table_version_service import bump_versions
+from db import db  # Import db from db.py
+
+def _balances(year, month):
+    """
+    One row per member with an active membership: the price of their latest active membership's plan
+    and what they paid in the period. Inactive users are left out, so the job never reactivates them.
+    """
+    latest = select(LocationUsers.user_id, func.max(LocationUsers.id).label('id')) \
+        .where(LocationUsers.status == MembershipStatus.activo) \
+        .group_by(LocationUsers.user_id).subquery()
+    paid = select(Payment.user_id, func.sum(Payment.amount).label('amount')) \
+        .where(Payment.year == year, Payment.month == month) \
+        .group_by(Payment.user_id).subquery()
+    return select(
+        latest.c.user_id,
+        Plans.price.label('due'),
+        func.coalesce(paid.c.amount, 0).label('paid')
+    ).join(LocationUsers, LocationUsers.id == latest.c.id) \
+        .join(Plans, Plans.id == LocationUsers.plan_id) \
+        .join(User, User.id == latest.c.user_id) \
+        .outerjoin(paid, paid.c.user_id == latest.c.user_id) \
+        .where(User.estatus != Status.inactivo).subquery()
+
+def evaluate_delinquency(year=None, month=None, dry_run=False):
+    """
+    Mark as moroso every active member whose payments for the period add up to less than the price
+    of their plan, and set members who have since paid back to activo.
+
+    Members and their balances come from a single join/aggregate query, and statuses change
+    with two bulk UPDATEs, so the cost does not grow with one query per user.
+
+    :param year: Year of the period (defaults to the current one).
+    :param month: Month of the period (defaults to the current one).
+    :param dry_run: Only count, without changing any status.
+    :return: A dictionary with the period, the counts and the elapsed milliseconds.
+    """
+    started = time.perf_counter()
+    today = date.today()
+    year = year or today.year
+    month = month or today.month
+
+    balances = _balances(year, month)
+    evaluated, delinquent = db.session.execute(select(
+        func.count(),
+        func.coalesce(func.sum(db.case((balances.c.paid < balances.c.due, 1), else_=0)), 0)
+    ).select_from(balances)).one()
+
+    marked = restored = 0
+    if not dry_run:
+        behind = select(balances.c.user_id).where(balances.c.paid < balances.c.due)
+        up_to_date = select(balances.c.user_id).where(balances.c.paid >= balances.c.due)
+        marked = db.session.execute(
+            update(User).where(User.estatus == Status.activo, User.id.in_(behind))
+            .values(estatus=Status.moroso).execution_options(synchronize_session=False)
+        ).rowcount
+        restored = db.session.execute(
+            update(User).where(User.estatus == Status.moroso, User.id.in_(up_to_date))
+            .values(estatus=Status.activo).execution_options(synchronize_session=False)
+        ).rowcount
+        if marked or restored:
+            # Bulk updates bypass the flush that versions the user table (see table_version_service)
+            bump_versions(db.session.connection(), {'user'})
+        db.session.commit()
+
+    return {
+        'year': year,
+        'month': month,
+        'evaluated': evaluated,
+        'delinquent': delinquent,
+        'marked_moroso': marked,
+        'restored_activo': restored,
+        'dry_run': dry_run,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
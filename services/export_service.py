@@ -0,0 +1,86 @@
+# services/export_service.py
+import csv
+import io
+import time
+import zipfile
+from openpyxl import Workbook
+
+def iter_csv(header, rows):
+    """
+    Stream rows as CSV text, one chunk per row, without building the document in memory.
+
+    :param header: List of column titles.
+    :param rows: Iterable of row sequences.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in _with_header(header, rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+def write_xlsx(header, rows, file, sheet_title='Reporte'):
+    """
+    Write rows into an XLSX workbook using openpyxl's write-only mode.
+
+    Write-only worksheets flush each row to disk as it is appended, so memory usage does not
+    grow with the number of rows.
+
+    :param header: List of column titles.
+    :param rows: Iterable of row sequences.
+    :param file: Path or binary file object the workbook is saved to.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_title)
+    for row in _with_header(header, rows):
+        worksheet.append(row)
+    workbook.save(file)
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable target of a ZipFile that hands the written bytes over as they come."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def iter_zip(entries):
+    """
+    Stream a ZIP archive, chunk by chunk, without building it in memory or on disk.
+
+    zipfile writes to a non-seekable target with data descriptors after each member, so every
+    member is compressed and yielded while its source is read. Members use ZIP64 so archives
+    over 4 GB stay valid.
+
+    :param entries: Iterable of (name, chunks, compress) tuples; chunks is an iterable of bytes,
+                    compress False stores already compressed files (images, PDFs) as they are.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for name, chunks, compress in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            with archive.open(info, 'w', force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    # The central directory is written when the archive is closed
+    yield sink.drain()
+
+def _with_header(header, rows):
+    yield header
+    yield from rows
@@ -1,10 +1,15 @@
 # services/location_service.py
 from models.locations import Locations
 from db import db
+from services.pagination import keyset_query
+from services.cache import reference_cache
 
-def get_all_locations():
-    """Retrieve all locations."""
-    return Locations.query.all()
+def get_all_locations(limit=None, after=None, fields=None):
+    """Retrieve all locations, optionally paginated and projected to `fields`; the full list is cached."""
+    if limit is None and after is None and not fields:
+        return reference_cache.get_or_load('locations', lambda session: session.query(Locations).order_by(Locations.id).all(),
+                                           tables=('locations',))
+    return keyset_query(Locations, limit=limit, after=after, fields=fields).all()
 
 def get_location_by_id(location_id):
     """Retrieve a location by its ID."""
@@ -18,6 +23,7 @@ def create_location(data):
     )
     db.session.add(new_location)
     db.session.commit()
+    reference_cache.invalidate('locations')
     return new_location
 
 def update_location(location_id, data):
@@ -29,6 +35,7 @@ def update_location(location_id, data):
     location.location = data.get('location', location.location)
     location.address = data.get('address', location.address)
     db.session.commit()
+    reference_cache.invalidate('locations', 'schedules')  # schedules show the location name
     return location
 
 def delete_location(location_id):
@@ -39,4 +46,5 @@ def delete_location(location_id):
 
     db.session.delete(location)
     db.session.commit()
+    reference_cache.invalidate('locations', 'schedules')
     return location
@@ -1,9 +1,11 @@
 # services/location_user_service.py
 from models.location_users import LocationUsers
 from db import db  # Import db from db.py
+from services.pagination import keyset_query, row_fields, fetch_rows
 
-def get_all_location_users():
-    return LocationUsers.query.all()
+def get_all_location_users(limit=None, after=None, fields=None, stream=False):
+    """List memberships as result rows of `fields` (every column by default), streamed with `stream`."""
+    return fetch_rows(keyset_query(LocationUsers, limit=limit, after=after, fields=fields or row_fields(LocationUsers)), stream)
 
 def get_location_user_by_id(location_user_id):
     return LocationUsers.query.get(location_user_id)
@@ -0,0 +1,83 @@
+# services/pagination.py
+import enum
+from datetime import date, datetime
+from db import db  # Import db from db.py
+
+# Upper bound for a single page, whatever the client asks for
+MAX_PAGE_SIZE = 500
+# Rows fetched at a time from the server-side cursor of a streamed list
+STREAM_BATCH_SIZE = 1000
+
+def resolve_fields(model, fields):
+    """
+    Map requested field names to the model's column attributes.
+
+    :param model: The SQLAlchemy model being listed.
+    :param fields: List of column names, or None/empty for the full row.
+    :return: A list of column attributes (always starting with 'id'), or None for the full row.
+    :raises ValueError: If a field is not a column of the model.
+    """
+    if not fields:
+        return None
+
+    available = model.__mapper__.column_attrs.keys()
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    # 'id' is the keyset cursor, so it is always selected
+    names = ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
+    return [getattr(model, name) for name in names]
+
+def row_fields(model):
+    """Names of every column of the model, to list full records as rows instead of ORM objects."""
+    return list(model.__mapper__.column_attrs.keys())
+
+def keyset_query(model, query=None, limit=None, after=None, fields=None, filters=None):
+    """
+    Build a list query paginated by keyset on the model's primary key.
+
+    :param model: The SQLAlchemy model being listed.
+    :param query: Optional base query (e.g. with loader options); defaults to `model.query`.
+    :param limit: Maximum number of rows to return (capped at MAX_PAGE_SIZE), or None for all rows.
+    :param after: Only return rows whose id is greater than this cursor.
+    :param fields: Optional list of column names; when given only those columns are selected.
+    :param filters: Optional list of criteria the rows must match.
+    :return: A query ordered by id.
+    """
+    columns = resolve_fields(model, fields)
+    if columns:
+        query = db.session.query(*columns)
+    elif query is None:
+        query = model.query
+
+    if filters:
+        query = query.filter(*filters)
+    if after is not None:
+        query = query.filter(model.id > after)
+    query = query.order_by(model.id)
+    if limit is not None:
+        query = query.limit(min(limit, MAX_PAGE_SIZE))
+    return query
+
+def fetch_rows(query, stream=False):
+    """
+    Run a list query.
+
+    :param query: The query, e.g. from keyset_query.
+    :param stream: Return an iterator over a server-side cursor that fetches STREAM_BATCH_SIZE
+                   rows at a time instead of a list, so memory does not grow with the table.
+    """
+    return query.yield_per(STREAM_BATCH_SIZE) if stream else query.all()
+
+def serialize_value(value):
+    """Convert a column value into something JSON serializable, the same way the models' to_dict() does."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+def serialize_row(row):
+    """Convert a projected result row into a dictionary."""
+    return {key: serialize_value(value) for key, value in row._mapping.items()}
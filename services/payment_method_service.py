@@ -1,30 +1,41 @@
 # services/payment_method_service.py
 from models.payment_methods import PaymentMethods
-from db import db  # Import db from db.py
+from db import db
+from services.cache import reference_cache
 
 def get_all_payment_methods():
-    return PaymentMethods.query.all()
+    """Retrieve all payment methods (cached, see services/cache.py)."""
+    return reference_cache.get_or_load(
+        'payment_methods', lambda session: session.query(PaymentMethods).order_by(PaymentMethods.id).all(),
+        tables=('payment_methods',)
+    )
 
 def get_payment_method_by_id(payment_method_id):
+    """Retrieve a payment method by its ID."""
     return PaymentMethods.query.get(payment_method_id)
 
 def create_payment_method(data):
-    new_payment_method = PaymentMethods(**data)
+    """Create a new payment method."""
+    new_payment_method = PaymentMethods(method=data['method'])
     db.session.add(new_payment_method)
     db.session.commit()
+    reference_cache.invalidate('payment_methods')
     return new_payment_method
 
 def update_payment_method(payment_method_id, data):
+    """Rename a payment method."""
     payment_method = PaymentMethods.query.get(payment_method_id)
     if payment_method:
-        for key, value in data.items():
-            setattr(payment_method, key, value)
+        payment_method.method = data['method']
         db.session.commit()
+        reference_cache.invalidate('payment_methods')
     return payment_method
 
 def delete_payment_method(payment_method_id):
+    """Delete a payment method."""
     payment_method = PaymentMethods.query.get(payment_method_id)
     if payment_method:
         db.session.delete(payment_method)
         db.session.commit()
-    return payment_method
\ No newline at end of file
+        reference_cache.invalidate('payment_methods')
+    return payment_method
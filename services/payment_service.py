@@ -1,30 +1,110 @@
 # services/payment_service.py
+import os
+import re
+from datetime import datetime
 from models.payment import Payment
+from models.payment_methods import PaymentMethods
+from models.users import User
+from models.proof_rendition import ProofRendition
 from db import db  # Import db from db.py
+from sqlalchemy import or_, select
+from sqlalchemy.orm import joinedload
+from services.pagination import keyset_query, row_fields, fetch_rows
+from services.proof_pipeline import enqueue_proof, link_proof_ref, resolve_uploaded_proof
+from services.export_service import iter_csv, iter_zip
+from storage import MAX_PROOF_SIZE, get_storage, content_type_of, is_valid_ref
 
-def get_all_payments():
-    return Payment.query.all()
+# Seconds a presigned proof download URL stays valid
+PROOF_URL_EXPIRES = int(os.getenv('PROOF_URL_EXPIRES', 300))
+
+# Proofs saved by the bot before the proof store was named "<telegram id>_<YYYYMMDD>.jpg|pdf"
+LEGACY_PROOF_NAME = re.compile(r'^(\d+)_(\d{8})$')
+LEGACY_CONTENT_TYPES = {'.jpg': 'image/jpeg', '.pdf': 'application/pdf'}
+
+def get_all_payments(limit=None, after=None, fields=None, stream=False):
+    """
+    List payments as result rows of `fields` (every column by default), without building Payment objects.
+    With `stream`, return an iterator over a server-side cursor instead of a list.
+    """
+    return fetch_rows(keyset_query(Payment, limit=limit, after=after, fields=fields or row_fields(Payment)), stream)
 
 def get_payments_by_year_and_month(year, month):
     """Retrieve payments by year and month."""
-    payments = Payment.query.filter_by(year=year, month=month).all()
-    return payments        
+    # to_custom_dict() reads the user and payment method of every payment
+    payments = Payment.query.options(
+        joinedload(Payment.user),
+        joinedload(Payment.payment_method)
+    ).filter_by(year=year, month=month).all()
+    return payments
+
+# Columns of the monthly payments report, in the same order as Payment.to_custom_dict()
+EXPORT_COLUMNS = ['Usuario', 'FechaCreación', 'Fecha', 'MétodoPago', 'Referencia', 'Monto', 'Año', 'Mes', 'ImageRef']
+
+def has_payments_for_year_and_month(year, month):
+    """Check whether any payment exists for the given year and month."""
+    return db.session.query(Payment.query.filter_by(year=year, month=month).exists()).scalar()
+
+def iter_payments_for_export(year, month, batch_size=1000):
+    """
+    Yield the monthly payments report rows (see EXPORT_COLUMNS) from a server-side cursor.
+
+    Only the needed columns are selected, joined with the user and payment method, and rows
+    are fetched `batch_size` at a time, so no ORM objects are built and memory stays flat.
+    """
+    statement = (
+        select(
+            User.name, User.lastname, User.telegram_id,
+            Payment.creation_date, Payment.date, PaymentMethods.method,
+            Payment.reference, Payment.amount, Payment.year, Payment.month, Payment.proof_ref
+        )
+        .join(User, Payment.user_id == User.id)
+        .join(PaymentMethods, Payment.payment_method_id == PaymentMethods.id)
+        .where(Payment.year == year, Payment.month == month)
+        .order_by(Payment.id)
+    )
+    result = db.session.execute(statement, execution_options={'yield_per': batch_size})
+    for row in result:
+        yield [
+            f"{row.name} {row.lastname}",
+            row.creation_date.isoformat(),
+            row.date.isoformat(),
+            row.method,
+            row.reference,
+            row.amount,
+            row.year,
+            row.month,
+            # Proofs uploaded before content-addressed storage are still named after the user and day
+            row.proof_ref or f"{row.telegram_id}_{row.date.strftime('%Y%m%d')}"
+        ]
 
 def get_payment_by_id(payment_id):
     return Payment.query.get(payment_id)
 
+def _check_proof_ref(data):
+    if data.get('proof_ref'):
+        # An upload replaced by its archive since it was uploaded is linked through the archive
+        data['proof_ref'] = link_proof_ref(data['proof_ref'])
+        if not get_storage().exists(data['proof_ref']):
+            raise ValueError(f"Unknown proof reference: {data['proof_ref']}")
+
 def create_payment(data):
+    """Create a payment; raises ValueError if its proof_ref was not uploaded first."""
+    _check_proof_ref(data)
     new_payment = Payment(**data)
     db.session.add(new_payment)
     db.session.commit()
+    enqueue_proof(new_payment.proof_ref)
     return new_payment
 
 def update_payment(payment_id, data):
+    _check_proof_ref(data)
     payment = Payment.query.get(payment_id)
     if payment:
         for key, value in data.items():
             setattr(payment, key, value)
         db.session.commit()
+        if 'proof_ref' in data:
+            enqueue_proof(payment.proof_ref)
     return payment
 
 def delete_payment(payment_id):
@@ -32,4 +112,194 @@ def delete_payment(payment_id):
     if payment:
         db.session.delete(payment)
         db.session.commit()
-    return payment
\ No newline at end of file
+    return payment
+
+def save_payment_proof(stream, content_type):
+    """
+    Store an uploaded payment proof, streamed in chunks and named by its content hash.
+
+    :return: A tuple (proof_ref, size, created); created is False for a proof already stored.
+             A proof whose earlier copy was replaced by its compressed archive returns the archive's ref.
+    :raises ValueError: For unsupported, empty or too large uploads.
+    """
+    proof_ref, size, created = get_storage().save(stream, content_type)
+    linked_ref = resolve_uploaded_proof(proof_ref)
+    return linked_ref, size, created and linked_ref == proof_ref
+
+def _legacy_proof_ref(name):
+    """Ref of a proof imported from a legacy "<telegram id>_<YYYYMMDD>" file name, or None."""
+    match = LEGACY_PROOF_NAME.match(name)
+    if not match:
+        return None
+    row = db.session.query(Payment.proof_ref).join(User, User.id == Payment.user_id).filter(
+        User.telegram_id == int(match.group(1)),
+        Payment.date == datetime.strptime(match.group(2), '%Y%m%d').date(),
+        Payment.proof_ref.isnot(None)
+    ).order_by(Payment.id.desc()).first()
+    return row.proof_ref if row else None
+
+def _is_linked(proof_ref):
+    return db.session.query(Payment.query.filter_by(proof_ref=proof_ref).exists()).scalar()
+
+def get_payment_proof(name):
+    """
+    Find a stored proof linked to a payment, through the index on Payment.proof_ref.
+
+    :param name: A proof ref, or the legacy ImageRef of a payment whose proof was imported.
+    :return: A tuple (proof_ref, content type, url); url is a direct (presigned) download URL,
+             or None when the proof has to be read with open_payment_proof. None if no payment
+             has this proof or the file is missing.
+    """
+    proof_ref = name if is_valid_ref(name) else _legacy_proof_ref(name)
+    if proof_ref and not _is_linked(proof_ref):
+        # Refs from reports made before the proof pipeline replaced an image by its archive
+        rendition = db.session.get(ProofRendition, proof_ref)
+        proof_ref = rendition.archive_ref if rendition and rendition.replaced else None
+    if not proof_ref or not _is_linked(proof_ref):
+        return None
+    storage = get_storage()
+    if not storage.exists(proof_ref):
+        return None
+    return proof_ref, content_type_of(proof_ref), storage.url(proof_ref, expires=PROOF_URL_EXPIRES)
+
+def get_payment_proof_thumbnail(name):
+    """
+    Find the thumbnail of a payment proof, produced by the proof pipeline.
+
+    :param name: Anything get_payment_proof accepts.
+    :return: A tuple (thumbnail_ref, content type, url) like get_payment_proof, or None if the
+             proof is unknown or not processed yet.
+    """
+    proof = get_payment_proof(name)
+    if not proof:
+        return None
+    rendition = ProofRendition.query.filter(
+        or_(ProofRendition.source_ref == proof[0], ProofRendition.archive_ref == proof[0]),
+        ProofRendition.thumbnail_ref.isnot(None)
+    ).first()
+    storage = get_storage()
+    if not rendition or not storage.exists(rendition.thumbnail_ref):
+        return None
+    return rendition.thumbnail_ref, 'image/jpeg', storage.url(rendition.thumbnail_ref, expires=PROOF_URL_EXPIRES)
+
+def open_payment_proof(proof_ref):
+    """Open a stored proof for reading in binary mode, from whichever backend holds it."""
+    return get_storage().open(proof_ref)
+
+PROOF_MANIFEST_COLUMNS = ['payment_id', 'file', 'status', 'user', 'cedula', 'date', 'amount', 'reference']
+
+def _read_chunks(file, chunk_size=64 * 1024):
+    with file:
+        yield from iter(lambda: file.read(chunk_size), b'')
+
+# Upper bound of the ZIP bytes added per member (headers, ZIP64 fields, data descriptor, directory
+# entry) and of the deflated manifest and end records of a part, used to split archives into parts
+ZIP_MEMBER_OVERHEAD = 1024
+ZIP_PART_RESERVE = 256 * 1024
+# Smallest part size accepted: room for the largest proof
+MIN_ARCHIVE_PART_SIZE = MAX_PROOF_SIZE + ZIP_MEMBER_OVERHEAD + ZIP_PART_RESERVE
+
+def _plan_proof_parts(rows, storage, max_size):
+    """
+    Split the proofs of `rows` into parts whose archives stay under `max_size` bytes.
+
+    :return: A tuple (status, parts): status maps each ref to 'ok' or 'missing', parts is a list
+             of lists of the refs stored in each part, in payment order (a single part if max_size is None).
+    """
+    status = {}
+    parts = [[]]
+    used = 0
+    for row in rows:
+        if row.proof_ref in status:
+            continue
+        status[row.proof_ref] = 'ok' if storage.exists(row.proof_ref) else 'missing'
+        if status[row.proof_ref] == 'missing':
+            continue
+        cost = storage.size(row.proof_ref) + ZIP_MEMBER_OVERHEAD if max_size else 0
+        if max_size and parts[-1] and used + cost > max_size - ZIP_PART_RESERVE:
+            parts.append([])
+            used = 0
+        parts[-1].append(row.proof_ref)
+        used += cost
+    return status, parts
+
+def iter_month_proof_archive(year, month, max_size=None, part=1):
+    """
+    Stream a ZIP of every proof of the payments of a month, plus a manifest.csv mapping each file to its payment.
+
+    Proofs are read from the storage one at a time while the archive is sent, and a proof
+    shared by several payments is included once. Proofs missing from the storage are listed
+    in the manifest with status "missing". With `max_size`, the proofs are split into parts
+    whose archives each stay under that many bytes, and only part `part` is streamed, with
+    the manifest of its own payments (missing proofs are listed in the first part).
+
+    :return: A tuple (chunks, parts) of an iterator of bytes and the number of parts, or None
+             if no payment of the month has a proof.
+    :raises ValueError: If part is not between 1 and the number of parts.
+    """
+    rows = db.session.query(
+        Payment.id, Payment.date, Payment.amount, Payment.reference, Payment.proof_ref,
+        User.name, User.lastname, User.cedula
+    ).join(User, User.id == Payment.user_id) \
+        .filter(Payment.year == year, Payment.month == month, Payment.proof_ref.isnot(None)) \
+        .order_by(Payment.date, Payment.id).all()
+    if not rows:
+        return None
+    storage = get_storage()
+    status, parts = _plan_proof_parts(rows, storage, max_size)
+    if not 1 <= part <= len(parts):
+        raise ValueError(f"'part' must be between 1 and {len(parts)}")
+    refs = set(parts[part - 1])
+
+    def entries():
+        manifest = []
+        sent = set()
+        for row in rows:
+            if row.proof_ref not in refs and not (part == 1 and status[row.proof_ref] == 'missing'):
+                continue
+            file_name = f"proofs/{row.proof_ref}"
+            if row.proof_ref in refs and row.proof_ref not in sent:
+                sent.add(row.proof_ref)
+                yield file_name, _read_chunks(storage.open(row.proof_ref)), False
+            manifest.append([
+                row.id, file_name if status[row.proof_ref] == 'ok' else '', status[row.proof_ref],
+                f"{row.name} {row.lastname}", row.cedula, row.date.isoformat(), row.amount, row.reference
+            ])
+        yield 'manifest.csv', (chunk.encode('utf-8') for chunk in iter_csv(PROOF_MANIFEST_COLUMNS, manifest)), True
+
+    return iter_zip(entries()), len(parts)
+
+def import_legacy_proofs(directory):
+    """
+    Move proofs saved by the bot as "<telegram id>_<YYYYMMDD>.jpg|pdf" into the proof store.
+
+    Each file is stored by content and linked to the payments of that user on that day that
+    have no proof yet. Files matching no payment are left out of the store.
+
+    :return: A dictionary with the number of files 'imported', payments 'linked' and files 'unmatched'.
+    """
+    storage = get_storage()
+    result = {'imported': 0, 'linked': 0, 'unmatched': 0}
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        name, extension = os.path.splitext(entry.name)
+        content_type = LEGACY_CONTENT_TYPES.get(extension.lower())
+        match = LEGACY_PROOF_NAME.match(name)
+        if not entry.is_file() or not content_type or not match:
+            continue
+        payments = Payment.query.join(User, User.id == Payment.user_id).filter(
+            User.telegram_id == int(match.group(1)),
+            Payment.date == datetime.strptime(match.group(2), '%Y%m%d').date(),
+            Payment.proof_ref.is_(None)
+        ).all()
+        if not payments:
+            result['unmatched'] += 1
+            continue
+        with open(entry.path, 'rb') as file:
+            proof_ref, size, created = storage.save(file, content_type)
+        for payment in payments:
+            payment.proof_ref = proof_ref
+        db.session.commit()
+        enqueue_proof(proof_ref)
+        result['imported'] += 1
+        result['linked'] += len(payments)
+    return result
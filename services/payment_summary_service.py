@@ -0,0 +1,109 @@
+# services/payment_summary_service.py
+import os
+import threading
+from datetime import date
+from sqlalchemy import func
+from models.payment import Payment
+from models.payment_methods import PaymentMethods
+from models.location_users import LocationUsers
+from models.plans import Plans
+from services.table_version_service import month_key, get_versions
+from db import db  # Import db from db.py
+
+# Closed months (before the current one) are cached per process; set PAYMENT_SUMMARY_CACHE=false to disable
+CACHE_ENABLED = os.getenv('PAYMENT_SUMMARY_CACHE', 'true').lower() in ('1', 'true', 'yes')
+# Besides its month's payments, a summary reads these tables (method and plan names, memberships)
+SUMMARY_TABLES = ('plans', 'payment_methods', 'location_users')
+
+# (year, month) -> (versions the summary was computed at, summary)
+_closed_months = {}
+_lock = threading.Lock()
+
+def is_closed_month(year, month, today=None):
+    today = today or date.today()
+    return (year, month) < (today.year, today.month)
+
+def _month_versions(year, months):
+    """Data version of the summary of each (year, month): its payment month and SUMMARY_TABLES."""
+    versions = get_versions([month_key('payment', year, month) for month in months] + list(SUMMARY_TABLES))
+    shared = tuple(versions[table] for table in SUMMARY_TABLES)
+    return {(year, month): (versions[month_key('payment', year, month)], shared) for month in months}
+
+def _latest_plan_per_user():
+    """Subquery mapping each user to the plan of their most recent location membership."""
+    latest = db.session.query(LocationUsers.user_id, func.max(LocationUsers.id).label('id')) \
+        .group_by(LocationUsers.user_id).subquery()
+    return db.session.query(latest.c.user_id, LocationUsers.plan_id) \
+        .join(LocationUsers, LocationUsers.id == latest.c.id).subquery()
+
+def _aggregate(filters):
+    """Run the three GROUP BY queries (month, month x method, month x plan) and assemble one summary per month."""
+    total = func.sum(Payment.amount).label('total')
+    count = func.count(Payment.id).label('count')
+    months = {}
+
+    for row in db.session.query(Payment.year, Payment.month, total, count).filter(*filters) \
+            .group_by(Payment.year, Payment.month):
+        months[(row.year, row.month)] = {
+            'year': row.year, 'month': row.month, 'total': round(row.total or 0, 2), 'count': row.count,
+            'by_method': [], 'by_plan': []
+        }
+
+    for row in db.session.query(Payment.year, Payment.month, PaymentMethods.id, PaymentMethods.method, total, count) \
+            .join(PaymentMethods, PaymentMethods.id == Payment.payment_method_id).filter(*filters) \
+            .group_by(Payment.year, Payment.month, PaymentMethods.id, PaymentMethods.method) \
+            .order_by(PaymentMethods.id):
+        months[(row.year, row.month)]['by_method'].append(
+            {'payment_method_id': row.id, 'method': row.method, 'total': round(row.total or 0, 2), 'count': row.count}
+        )
+
+    plans = _latest_plan_per_user()
+    for row in db.session.query(Payment.year, Payment.month, Plans.id, Plans.name, total, count) \
+            .outerjoin(plans, plans.c.user_id == Payment.user_id) \
+            .outerjoin(Plans, Plans.id == plans.c.plan_id).filter(*filters) \
+            .group_by(Payment.year, Payment.month, Plans.id, Plans.name) \
+            .order_by(Plans.id):
+        # Payments of users without a membership are grouped under plan_id None
+        months[(row.year, row.month)]['by_plan'].append(
+            {'plan_id': row.id, 'plan': row.name, 'total': round(row.total or 0, 2), 'count': row.count}
+        )
+    return months
+
+def get_payment_summary(year=None, month=None):
+    """
+    Total amount and number of payments per month, broken down by payment method and by plan.
+
+    The plan of a payment is the plan of the user's most recent location membership. Closed
+    months of the requested year are served from the cache once computed, as long as the
+    table_version counters of their month ('payment:YYYY-MM') and of SUMMARY_TABLES have not
+    moved, so every worker recomputes a month as soon as any of them writes to it.
+
+    :param year: Optional year to summarize.
+    :param month: Optional month (requires year).
+    :return: A list of month summaries ordered by year and month.
+    """
+    filters = []
+    cached = {}
+    versions = {}
+    if year is not None:
+        filters.append(Payment.year == year)
+        if month is not None:
+            filters.append(Payment.month == month)
+        if CACHE_ENABLED:
+            # Read before aggregating: a concurrent write can only make a summary newer than the
+            # versions it is cached under, which costs a recomputation, never a stale total
+            versions = _month_versions(year, [month] if month is not None else range(1, 13))
+            with _lock:
+                cached = {key: entry[1] for key, entry in _closed_months.items()
+                          if key in versions and entry[0] == versions[key]}
+            if cached:
+                filters.append(Payment.month.notin_([key[1] for key in cached]))
+
+    months = {}
+    if month is None or not cached:
+        months = _aggregate(filters)
+        with _lock:
+            _closed_months.update({key: (versions[key], summary) for key, summary in months.items()
+                                   if key in versions and is_closed_month(*key)})
+    months.update(cached)
+    return [months[key] for key in sorted(months)]
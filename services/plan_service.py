@@ -1,30 +1,42 @@
 # services/plan_service.py
 from models.plans import Plans
-from db import db  # Import db from db.py
+from db import db
+from services.cache import reference_cache
 
 def get_all_plans():
-    return Plans.query.all()
+    """Retrieve all plans (cached, see services/cache.py)."""
+    return reference_cache.get_or_load('plans', lambda session: session.query(Plans).order_by(Plans.id).all(),
+                                       tables=('plans',))
 
 def get_plan_by_id(plan_id):
+    """Retrieve a plan by its ID."""
     return Plans.query.get(plan_id)
 
 def create_plan(data):
-    new_plan = Plans(**data)
+    """Create a new plan."""
+    new_plan = Plans(name=data['name'], price=data['price'])
     db.session.add(new_plan)
     db.session.commit()
+    reference_cache.invalidate('plans')
     return new_plan
 
 def update_plan(plan_id, data):
+    """Update the name and price of a plan."""
     plan = Plans.query.get(plan_id)
     if plan:
-        for key, value in data.items():
-            setattr(plan, key, value)
+        plan.name = data['name']
+        plan.price = data['price']
         db.session.commit()
-    return plan
+        reference_cache.invalidate('plans')
+        return plan
+    return None
 
 def delete_plan(plan_id):
+    """Delete a plan."""
     plan = Plans.query.get(plan_id)
     if plan:
         db.session.delete(plan)
         db.session.commit()
-    return plan
\ No newline at end of file
+        reference_cache.invalidate('plans')
+        return plan
+    return None
@@ -0,0 +1,226 @@
+# services/proof_pipeline.py
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from PIL import Image, ImageOps
+from sqlalchemy import or_
+from models.payment import Payment
+from models.proof_rendition import ProofRendition
+from models.users import User
+from storage import get_storage, content_type_of
+from db import db  # Import db from db.py
+
+# Background workers per API process; 0 leaves proofs to `flask payments process-proofs`
+PIPELINE_WORKERS = int(os.getenv('PROOF_PIPELINE_WORKERS', 2))
+THUMBNAIL_SIZE = int(os.getenv('PROOF_THUMBNAIL_SIZE', 320))          # longest side, in pixels
+ARCHIVE_MAX_SIZE = int(os.getenv('PROOF_ARCHIVE_MAX_SIZE', 2048))     # longest side of the archived image
+ARCHIVE_QUALITY = int(os.getenv('PROOF_ARCHIVE_QUALITY', 80))         # JPEG quality of the archived image
+# Keep uploaded images as they are and only make their thumbnail; set to false to replace the
+# uploads by a lossy archive when it is smaller, and delete them
+KEEP_ORIGINALS = os.getenv('PROOF_KEEP_ORIGINALS', 'true').lower() in ('1', 'true', 'yes')
+# The archive replaces the upload only if it saves at least this fraction of its size
+MIN_SAVING = 0.1
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+def _encode_jpeg(image, max_size, quality):
+    """Downscale an image to fit in max_size x max_size and encode it as an optimized progressive JPEG."""
+    image = image.copy()
+    image.thumbnail((max_size, max_size))
+    if image.mode not in ('RGB', 'L'):
+        # Transparent PNG screenshots are flattened on white rather than black
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+        image = background
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    output.seek(0)
+    return output
+
+def _first_page(file):
+    """Render the first page of a PDF as an image (large enough for a thumbnail)."""
+    # pypdfium2 is only needed for PDF proofs
+    import pypdfium2
+    document = pypdfium2.PdfDocument(file.read())
+    try:
+        page = document[0]
+        width, height = page.get_size()
+        return page.render(scale=THUMBNAIL_SIZE / max(width, height)).to_pil()
+    finally:
+        document.close()
+
+def process_proof(proof_ref):
+    """
+    Produce the thumbnail of a stored proof and, when PROOF_KEEP_ORIGINALS is false, the
+    compressed archive of an image.
+
+    The archive is the image re-encoded as JPEG (EXIF rotation applied, metadata dropped).
+    When it is at least MIN_SAVING smaller than the upload, the payments linking the upload
+    are moved to the archive and the upload is deleted (see _replace_source); otherwise it is
+    discarded. PDFs only get a thumbnail of their first page. Proofs already processed are
+    skipped.
+
+    :return: The ProofRendition of the proof.
+    """
+    rendition = ProofRendition.query.filter(
+        or_(ProofRendition.source_ref == proof_ref, ProofRendition.archive_ref == proof_ref)
+    ).first()
+    if rendition and rendition.status == 'done':
+        return rendition
+    rendition = rendition or ProofRendition(source_ref=proof_ref)
+    storage = get_storage()
+
+    try:
+        with storage.open(proof_ref) as file:
+            if content_type_of(proof_ref) == 'application/pdf':
+                image = _first_page(file)
+            else:
+                image = ImageOps.exif_transpose(Image.open(file))
+                image.load()
+        rendition.thumbnail_ref = storage.save(_encode_jpeg(image, THUMBNAIL_SIZE, 70), 'image/jpeg')[0]
+        if not KEEP_ORIGINALS and content_type_of(proof_ref) != 'application/pdf':
+            archive = _encode_jpeg(image, ARCHIVE_MAX_SIZE, ARCHIVE_QUALITY)
+            rendition.archive_ref, rendition.archive_size, _ = storage.save(archive, 'image/jpeg')
+            rendition.source_size = storage.size(proof_ref)
+        rendition.status, rendition.error = 'done', None
+    except Exception as e:
+        # Corrupt or unreadable uploads are recorded and left as they are
+        rendition.status, rendition.error = 'failed', str(e)[:255]
+        db.session.add(rendition)
+        db.session.commit()
+        return rendition
+
+    db.session.add(rendition)
+    replace = False
+    unused_archive = None
+    if rendition.archive_ref and rendition.archive_ref != proof_ref:
+        if rendition.archive_size <= rendition.source_size * (1 - MIN_SAVING):
+            replace = True
+        elif not Payment.query.filter_by(proof_ref=rendition.archive_ref).count():
+            # Already well compressed (e.g. a PNG screenshot): the archive would only be an extra copy
+            unused_archive, rendition.archive_ref = rendition.archive_ref, None
+    db.session.commit()
+    if replace:
+        return _replace_source(proof_ref)
+    if unused_archive:
+        storage.delete(unused_archive)
+    return rendition
+
+def _replace_source(proof_ref):
+    """
+    Move the payments linking an upload to its archive, then delete the upload.
+
+    The rendition row is locked while the payments are moved, and payment writes resolve their
+    proof_ref with link_proof_ref() under a shared lock on the same row: a payment linked
+    concurrently is either moved too or linked to the archive. The upload is only deleted if
+    no payment links it after the commit.
+    """
+    rendition = ProofRendition.query.filter_by(source_ref=proof_ref).with_for_update().populate_existing().one()
+    # Through the ORM, so the flush bumps the versions of the payments' months
+    for payment in Payment.query.filter_by(proof_ref=proof_ref):
+        payment.proof_ref = rendition.archive_ref
+    rendition.replaced = True
+    db.session.commit()
+    if Payment.query.filter_by(proof_ref=proof_ref).count():
+        # Linked by a payment written before the rendition existed, so without the lock: kept
+        print(f"Proof {proof_ref} is still linked after its replacement; the upload is kept")
+    else:
+        get_storage().delete(proof_ref)
+    return rendition
+
+def _run(app, proof_ref):
+    with app.app_context():
+        try:
+            process_proof(proof_ref)
+        except Exception as e:
+            print(f"Proof pipeline failed for {proof_ref}: {e}")
+        finally:
+            db.session.remove()
+
+def enqueue_proof(proof_ref):
+    """
+    Process a proof on the background pool of this process, after the current request.
+
+    The pool is created on first use in each (forked) worker process. Does nothing when
+    PROOF_PIPELINE_WORKERS is 0.
+
+    :return: The Future of the job, or None.
+    """
+    global _executor, _executor_pid
+    if not PIPELINE_WORKERS or not proof_ref:
+        return None
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix='proof-pipeline')
+            _executor_pid = os.getpid()
+        return _executor.submit(_run, current_app._get_current_object(), proof_ref)
+
+def resolve_uploaded_proof(proof_ref):
+    """
+    Ref to link for a freshly uploaded proof: the archive that replaced the same content before, if any.
+
+    The upload itself is then redundant and removed from the storage, unless a payment still
+    links it.
+    """
+    rendition = db.session.get(ProofRendition, proof_ref)
+    if rendition and rendition.replaced:
+        if not Payment.query.filter_by(proof_ref=proof_ref).count():
+            get_storage().delete(proof_ref)
+        return rendition.archive_ref
+    return proof_ref
+
+def link_proof_ref(proof_ref):
+    """
+    Ref to store on a payment for `proof_ref`: the archive that replaced it, if any.
+
+    Holds a shared lock on the rendition until the caller commits, so the upload cannot be
+    replaced and deleted in between (see _replace_source).
+    """
+    rendition = ProofRendition.query.filter_by(source_ref=proof_ref) \
+        .with_for_update(read=True).populate_existing().first()
+    return rendition.archive_ref if rendition and rendition.replaced else proof_ref
+
+def process_pending_proofs(limit=None):
+    """
+    Process, in this process, the linked proofs that have no rendition yet or whose processing failed.
+
+    :return: A tuple (done, failed).
+    """
+    processed = db.session.query(ProofRendition.source_ref).filter(ProofRendition.status == 'done')
+    archived = db.session.query(ProofRendition.archive_ref).filter(ProofRendition.archive_ref.isnot(None))
+    query = db.session.query(Payment.proof_ref).filter(
+        Payment.proof_ref.isnot(None), Payment.proof_ref.notin_(processed), Payment.proof_ref.notin_(archived)
+    ).distinct()
+    refs = [row.proof_ref for row in (query.limit(limit) if limit else query)]
+    done = failed = 0
+    for proof_ref in refs:
+        if process_proof(proof_ref).status == 'done':
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+def get_month_thumbnails(year, month):
+    """
+    Thumbnails of the proofs of the payments of a month, for an album of the month.
+
+    :return: A list of dictionaries with payment_id, user, amount, proof_ref and thumbnail_ref
+             (None while the proof is not processed), ordered by payment date.
+    """
+    rows = db.session.query(
+        Payment.id, Payment.amount, Payment.date, Payment.proof_ref, User.name, User.lastname,
+        ProofRendition.thumbnail_ref
+    ).join(User, User.id == Payment.user_id) \
+        .outerjoin(ProofRendition, or_(ProofRendition.source_ref == Payment.proof_ref,
+                                       ProofRendition.archive_ref == Payment.proof_ref)) \
+        .filter(Payment.year == year, Payment.month == month, Payment.proof_ref.isnot(None)) \
+        .order_by(Payment.date, Payment.id)
+    return [
+        {'payment_id': row.id, 'user': f"{row.name} {row.lastname}", 'amount': row.amount,
+         'date': row.date.isoformat(), 'proof_ref': row.proof_ref, 'thumbnail_ref': row.thumbnail_ref}
+        for row in rows
+    ]
@@ -1,12 +1,21 @@
 from models.schedule import Schedule
 from db import db  # Import db from db.py
 from sqlalchemy.orm import joinedload
+from services.pagination import keyset_query
+from services.schedule_slot_service import sync_slots
+from services.cache import reference_cache
 
-def get_all_schedules():
+def get_all_schedules(limit=None, after=None, fields=None):
     """
-    Get all schedules from the database.
+    Get all schedules from the database, optionally paginated and projected to `fields`.
+    The full list is cached.
     """
-    return Schedule.query.all()
+    if limit is None and after is None and not fields:
+        return reference_cache.get_or_load('schedules', lambda session: session.query(Schedule)
+                                           .options(joinedload(Schedule.location)).order_by(Schedule.id).all(),
+                                           tables=('schedule', 'locations'))
+    query = Schedule.query.options(joinedload(Schedule.location))  # to_dict() reads the location name
+    return keyset_query(Schedule, query=query, limit=limit, after=after, fields=fields).all()
 
 def get_schedule_by_id(schedule_id):
     """
@@ -18,25 +27,37 @@ def create_schedule(data):
     """
     Create a new schedule in the database.
     The data should be a dictionary containing location_id, days, time_init, and creation_date.
+    Raises ValueError if the days or start times cannot be parsed into slots.
     """
     # Ensure that 'days' is passed as a string, as the model now expects a string for 'days'
     if isinstance(data.get('days'), list):
         data['days'] = ', '.join(data['days'])  # Convert list of days to a comma-separated string
 
     new_schedule = Schedule(**data)
+    sync_slots(new_schedule)
     db.session.add(new_schedule)
     db.session.commit()
+    reference_cache.invalidate('schedules')
     return new_schedule
 
 def update_schedule(schedule_id, data):
     """
     Update an existing schedule in the database based on its ID.
+    Raises ValueError if the new days or start times cannot be parsed into slots.
     """
     schedule = Schedule.query.get(schedule_id)
     if schedule:
+        if isinstance(data.get('days'), list):
+            data['days'] = ', '.join(data['days'])
         for key, value in data.items():
             setattr(schedule, key, value)
+        try:
+            sync_slots(schedule)
+        except ValueError:
+            db.session.rollback()
+            raise
         db.session.commit()
+        reference_cache.invalidate('schedules')
     return schedule
 
 def delete_schedule(schedule_id):
@@ -44,4 +65,5 @@ def delete_schedule(schedule_id):
     if schedule:
         db.session.delete(schedule)
         db.session.commit()
+        reference_cache.invalidate('schedules')
     return schedule
@@ -0,0 +1,149 @@
+# services/schedule_slot_service.py
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta
+import pytz
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+from models.schedule import Schedule
+from models.schedule_slot import ScheduleSlot
+from db import db  # Import db from db.py
+
+# Schedules are entered in the gym's local time
+SCHEDULE_TIMEZONE = pytz.timezone(os.getenv('SCHEDULE_TIMEZONE', 'America/Caracas'))
+
+DEFAULT_WITHIN_MINUTES = 120
+MAX_WITHIN_MINUTES = 7 * 24 * 60
+MINUTES_PER_DAY = 24 * 60
+
+WEEKDAYS = {
+    'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5, 'domingo': 6,
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+def parse_days(text):
+    """
+    Parse Schedule.days, e.g. "Lunes, Miércoles" or "Lunes a Viernes", into sorted weekdays (0 = Monday).
+
+    Day names may be Spanish or English, with or without accents, separated by commas, spaces or
+    "y"/"and"; "a", "al", "to" or "-" between two days is an inclusive range.
+
+    :raises ValueError: If a word is not a day name.
+    """
+    words = [word for word in re.split(r'[\s,;/]+|(-)', _normalize(text or '')) if word and word not in ('y', 'and', 'e')]
+    weekdays, previous, in_range = set(), None, False
+    for word in words:
+        if word in ('a', 'al', 'to', '-'):
+            if previous is None:
+                raise ValueError(f"Invalid days: '{text}'")
+            in_range = True
+            continue
+        if word not in WEEKDAYS:
+            raise ValueError(f"Unknown day '{word}' in '{text}'")
+        day = WEEKDAYS[word]
+        if in_range:
+            span = (day - previous) % 7
+            weekdays.update((previous + offset) % 7 for offset in range(span + 1))
+            in_range = False
+        weekdays.add(day)
+        previous = day
+    if in_range or not weekdays:
+        raise ValueError(f"Invalid days: '{text}'")
+    return sorted(weekdays)
+
+def parse_times(text):
+    """
+    Parse Schedule.time_init, e.g. "9:00,18:30", into sorted minutes of the day.
+
+    :raises ValueError: If a time is not H:MM or HH:MM within the day.
+    """
+    minutes = set()
+    for part in (text or '').split(','):
+        match = re.fullmatch(r'\s*(\d{1,2}):([0-5]\d)\s*', part)
+        if not match or int(match.group(1)) > 23:
+            raise ValueError(f"Invalid start time '{part.strip()}' in '{text}'")
+        minutes.add(int(match.group(1)) * 60 + int(match.group(2)))
+    return sorted(minutes)
+
+def sync_slots(schedule):
+    """
+    Replace the slots of a schedule with those parsed from its days and start times, in the current
+    transaction (the caller commits).
+
+    :raises ValueError: If the days or start times cannot be parsed.
+    """
+    weekdays = parse_days(schedule.days)
+    minutes = parse_times(schedule.time_init)
+    schedule.slots = [
+        ScheduleSlot(location_id=schedule.location_id, weekday=weekday, minute_of_day=minute)
+        for weekday in weekdays for minute in minutes
+    ]
+
+def rebuild_slots():
+    """
+    Parse every schedule into slots, e.g. after the slot table is created.
+
+    :return: (number of slots written, list of (schedule id, error) for schedules that could not be parsed).
+    """
+    written, errors = 0, []
+    for schedule in Schedule.query.options(joinedload(Schedule.slots)):
+        try:
+            sync_slots(schedule)
+            written += len(schedule.slots)
+        except ValueError as e:
+            schedule.slots = []
+            errors.append((schedule.id, str(e)))
+    db.session.commit()
+    return written, errors
+
+def _windows(start, within):
+    """Split the minutes of the week from `start` (weekday, minute) over `within` minutes into per-day ranges."""
+    weekday, minute = start
+    remaining = within
+    while remaining >= 0:
+        end = min(MINUTES_PER_DAY - 1, minute + remaining)
+        yield weekday, minute, end
+        remaining -= end - minute + 1
+        weekday, minute = (weekday + 1) % 7, 0
+
+def get_upcoming_classes(location_id=None, within=DEFAULT_WITHIN_MINUTES, now=None):
+    """
+    Classes starting in the next `within` minutes, read from the slot index.
+
+    :param location_id: Optional location to restrict to.
+    :param within: Minutes to look ahead (at most a week).
+    :param now: Optional aware datetime to count from (defaults to now in SCHEDULE_TIMEZONE).
+    :return: A list of dictionaries with the schedule, location, start time and minutes until it starts.
+    :raises ValueError: If within is negative or longer than a week.
+    """
+    if not 0 <= within <= MAX_WITHIN_MINUTES:
+        raise ValueError(f"'within' must be between 0 and {MAX_WITHIN_MINUTES} minutes")
+    now = (now or datetime.now(pytz.utc)).astimezone(SCHEDULE_TIMEZONE).replace(second=0, microsecond=0)
+    start = (now.weekday(), now.hour * 60 + now.minute)
+
+    query = ScheduleSlot.query.options(joinedload(ScheduleSlot.schedule).joinedload(Schedule.location)).filter(or_(*[
+        and_(ScheduleSlot.weekday == weekday, ScheduleSlot.minute_of_day.between(first, last))
+        for weekday, first, last in _windows(start, within)
+    ]))
+    if location_id is not None:
+        query = query.filter(ScheduleSlot.location_id == location_id)
+
+    classes = []
+    for slot in query:
+        minutes_until = ((slot.weekday - start[0]) % 7) * MINUTES_PER_DAY + slot.minute_of_day - start[1]
+        if minutes_until < 0:
+            # Only possible when the window wraps the whole week back to today
+            minutes_until += 7 * MINUTES_PER_DAY
+        classes.append({
+            'schedule_id': slot.schedule_id,
+            'location_id': slot.location_id,
+            'location_name': slot.schedule.location.location if slot.schedule.location else None,
+            'starts_at': (now + timedelta(minutes=minutes_until)).isoformat(),
+            'minutes_until': minutes_until
+        })
+    return sorted(classes, key=lambda item: (item['minutes_until'], item['location_id']))
@@ -0,0 +1,82 @@
+# services/table_version_service.py
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models.table_version import TableVersion
+from db import db  # Import db from db.py
+
+# Tables whose writes are counted: reference data the bot reads at almost every step, the
+# sources of the bot's reports (users, coaches) and the memberships the payment summary groups by
+VERSIONED_TABLES = frozenset(['plans', 'payment_methods', 'locations', 'schedule', 'user', 'coach', 'location_users'])
+# Tables counted per month instead, as "payment:2024-06", so writes to one month leave the
+# versions (and the cached reports) of the others untouched
+MONTHLY_TABLES = frozenset(['payment'])
+
+def month_key(table_name, year, month):
+    return f"{table_name}:{int(year)}-{int(month):02d}"
+
+def _version_keys(session, obj):
+    """Counters a pending write to `obj` bumps: its table, or its month (old and new) for monthly tables."""
+    table = getattr(obj, '__table__', None)
+    if table is None or (obj in session.dirty and not session.is_modified(obj)):
+        return set()
+    if table.name in VERSIONED_TABLES:
+        return {table.name}
+    if table.name in MONTHLY_TABLES:
+        state = inspect(obj)
+        keys = {month_key(table.name, obj.year, obj.month)}
+        year, month = state.attrs.year.history, state.attrs.month.history
+        if year.deleted or month.deleted:
+            keys.add(month_key(table.name, (year.deleted or [obj.year])[0], (month.deleted or [obj.month])[0]))
+        return keys
+    return set()
+
+def _bump_versions(session, flush_context):
+    """Increment the version of every versioned table written by this flush, in the same transaction."""
+    keys = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        keys |= _version_keys(session, obj)
+    if keys:
+        bump_versions(session.connection(), keys)
+
+def bump_versions(connection, keys):
+    """
+    Increment version counters on `connection`, in its transaction.
+
+    Flushes of the session bump them automatically; bulk UPDATE/DELETE statements, which
+    bypass the flush, must call this for the tables they write.
+
+    :param keys: Table names of VERSIONED_TABLES, or month keys of MONTHLY_TABLES.
+    """
+    dialect = connection.dialect.name
+    for table_name in sorted(keys):  # a fixed order so concurrent writers lock rows in the same order
+        if dialect in ('postgresql', 'sqlite'):
+            insert = (postgresql if dialect == 'postgresql' else sqlite).insert(TableVersion).values(table_name=table_name, version=1)
+            connection.execute(insert.on_conflict_do_update(
+                index_elements=['table_name'],
+                set_={'version': TableVersion.version + 1}
+            ))
+        else:
+            updated = connection.execute(
+                TableVersion.__table__.update().where(TableVersion.table_name == table_name)
+                .values(version=TableVersion.version + 1)
+            ).rowcount
+            if not updated:
+                connection.execute(TableVersion.__table__.insert().values(table_name=table_name, version=1))
+
+def get_versions(tables):
+    """
+    Current version of each table, 0 for tables never written since versioning started.
+
+    :param tables: Names of versioned tables.
+    :return: A dictionary of table name to version.
+    """
+    rows = db.session.execute(
+        select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables))
+    )
+    versions = dict.fromkeys(tables, 0)
+    versions.update(dict(rows.all()))
+    return versions
+
+def init_table_versions(app):
+    """Count the writes to VERSIONED_TABLES made through the session."""
+    event.listen(db.session, 'after_flush', _bump_versions)
@@ -1,10 +1,46 @@
 # services/user_service.py
 from models.users import User
 from db import db  # Import db from db.py
+from sqlalchemy import or_
+from services.pagination import keyset_query, row_fields, fetch_rows
 
-def get_all_users():
-    return User.query.all()
-   
+def get_all_users(limit=None, after=None, fields=None, stream=False):
+    """
+    List users as result rows of `fields` (every column by default), without building User objects.
+    With `stream`, return an iterator over a server-side cursor instead of a list.
+    """
+    return fetch_rows(keyset_query(User, limit=limit, after=after, fields=fields or row_fields(User)), stream)
+
+# Results per page of a user search when no limit is given
+SEARCH_PAGE_SIZE = 20
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_users(q, limit=None, after=None, fields=None, stream=False):
+    """
+    Find users whose name, last name or cedula starts with each word of `q`.
+
+    Every word must be a prefix of one of the three columns, so "ana per" finds Ana Pérez and
+    "1234" finds cedula 12345678. The comparisons match the functional indexes on User.
+
+    :param q: The search text.
+    :param limit: Maximum number of users to return (SEARCH_PAGE_SIZE by default).
+    :param after: Only return users with an ID greater than this cursor.
+    :param fields: Optional list of columns to select (every column by default).
+    :param stream: Return an iterator over a server-side cursor instead of a list.
+    :return: A list of result rows ordered by ID.
+    """
+    conditions = []
+    for term in q.lower().split():
+        pattern = _escape_like(term) + '%'
+        conditions.append(or_(
+            db.func.lower(User.name).like(pattern, escape='\\'),
+            db.func.lower(User.lastname).like(pattern, escape='\\'),
+            db.cast(User.cedula, db.Text).like(pattern, escape='\\')
+        ))
+    query = keyset_query(User, limit=limit or SEARCH_PAGE_SIZE, after=after, fields=fields or row_fields(User), filters=conditions)
+    return fetch_rows(query, stream)
 
 def get_user_by_id(user_id):
     return User.query.get(user_id)
@@ -0,0 +1,41 @@
+# storage/__init__.py
+import os
+from storage.base import ProofTooLarge, CONTENT_TYPES, is_valid_ref, content_type_of
+from storage.local import LocalStorage
+from storage.s3 import S3Storage
+
+# Where payment proofs are stored: "local" (PROOF_STORAGE_DIR) or "s3" (S3_BUCKET)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local').lower()
+PROOF_STORAGE_DIR = os.getenv('PROOF_STORAGE_DIR', 'uploads/proofs')
+MAX_PROOF_SIZE = int(os.getenv('MAX_PROOF_SIZE', 20 * 1024 * 1024))
+
+# S3-compatible settings; credentials come from the usual AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY
+S3_BUCKET = os.getenv('S3_BUCKET')
+S3_PREFIX = os.getenv('S3_PREFIX', 'proofs/')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')                # e.g. http://minio:9000; AWS if unset
+S3_REGION = os.getenv('S3_REGION')
+S3_PRESIGNED_URLS = os.getenv('S3_PRESIGNED_URLS', 'true').lower() in ('1', 'true', 'yes')
+
+_storage = None
+
+def create_storage(backend=STORAGE_BACKEND):
+    """
+    Build the store configured in STORAGE_BACKEND.
+
+    :raises ValueError: If the backend is unknown or S3_BUCKET is missing for "s3".
+    """
+    if backend == 'local':
+        return LocalStorage(os.path.abspath(PROOF_STORAGE_DIR), max_size=MAX_PROOF_SIZE)
+    if backend == 's3':
+        if not S3_BUCKET:
+            raise ValueError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3Storage(S3_BUCKET, prefix=S3_PREFIX, max_size=MAX_PROOF_SIZE, endpoint_url=S3_ENDPOINT_URL,
+                         region=S3_REGION, presigned_urls=S3_PRESIGNED_URLS)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+def get_storage():
+    """Return the store of payment proofs shared by the process."""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
@@ -0,0 +1,83 @@
+# storage/base.py
+import hashlib
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+# Chunk size used to copy uploads, so a proof is never held in memory in one piece
+CHUNK_SIZE = 64 * 1024
+
+# Extension of each accepted content type; the ref keeps it so downloads know the type
+CONTENT_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'application/pdf': '.pdf',
+}
+EXTENSIONS = {extension: content_type for content_type, extension in CONTENT_TYPES.items()}
+
+# A ref is the SHA-256 of the content plus the extension, e.g. "9f86d0...0f00a08.jpg"
+REF_PATTERN = re.compile(r'^[0-9a-f]{64}\.(jpg|png|pdf)$')
+
+class ProofTooLarge(ValueError):
+    """Raised when an upload is larger than the configured maximum."""
+
+def is_valid_ref(ref):
+    return bool(ref and REF_PATTERN.match(ref))
+
+def content_type_of(ref):
+    return EXTENSIONS[os.path.splitext(ref)[1]]
+
+def shard(ref):
+    """
+    Relative location of a stored file, sharded in two levels (ab/cd/abcd....jpg) so no
+    directory or key prefix grows past a few thousand entries.
+
+    :raises ValueError: If `ref` is not a storage ref (never a path outside the store).
+    """
+    if not is_valid_ref(ref):
+        raise ValueError(f"Invalid proof reference: {ref}")
+    return f"{ref[0:2]}/{ref[2:4]}/{ref}"
+
+@contextmanager
+def spooled_upload(stream, content_type, max_size=None, temp_dir=None):
+    """
+    Copy a binary stream in chunks to a temporary file while hashing it.
+
+    Every backend stores uploads this way: the ref is only known once the whole content has
+    been read, and the temporary file is removed on exit unless the caller moved it.
+
+    :param stream: Object with a read(size) method, e.g. the request stream.
+    :param content_type: MIME type of the content, one of CONTENT_TYPES.
+    :param max_size: Largest accepted size in bytes, or None.
+    :param temp_dir: Directory of the temporary file (the system default if None).
+    :return: A context manager yielding (ref, size, temp_path).
+    :raises ValueError: If the content type is not accepted or the content is empty.
+    :raises ProofTooLarge: If the content is larger than max_size.
+    """
+    extension = CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+    if not extension:
+        raise ValueError(f"Unsupported content type: {content_type}")
+
+    if temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise ProofTooLarge(f"Proof larger than {max_size} bytes")
+                digest.update(chunk)
+                temp_file.write(chunk)
+        if not size:
+            raise ValueError("Empty proof")
+        yield digest.hexdigest() + extension, size, temp_path
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,65 @@
+# storage/local.py
+import os
+from storage.base import shard, spooled_upload
+
+class LocalStorage:
+    """
+    Content-addressed file store on the local disk.
+
+    Files are named by the SHA-256 of their content and sharded in two directory levels
+    (ab/cd/abcd....jpg). Uploads are copied in chunks to a temporary file while they are hashed
+    and then renamed into place; the same content uploaded twice is stored once.
+    """
+
+    def __init__(self, root, max_size=None):
+        self.root = root
+        self.max_size = max_size
+
+    def path(self, ref):
+        """
+        Path of a stored file.
+
+        :raises ValueError: If `ref` is not a storage ref (never a path outside the root).
+        """
+        return os.path.join(self.root, *shard(ref).split('/'))
+
+    def exists(self, ref):
+        try:
+            return os.path.exists(self.path(ref))
+        except ValueError:
+            return False
+
+    def save(self, stream, content_type):
+        """
+        Store the content of a binary stream.
+
+        :return: A tuple (ref, size, created); created is False when the content was already stored.
+        :raises ValueError: If the content type is not accepted or the content is empty.
+        :raises ProofTooLarge: If the content is larger than max_size.
+        """
+        # The temporary file is on the same filesystem, so moving it into place is a rename
+        with spooled_upload(stream, content_type, self.max_size, os.path.join(self.root, 'tmp')) as (ref, size, temp_path):
+            path = self.path(ref)
+            if os.path.exists(path):
+                return ref, size, False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            return ref, size, True
+
+    def size(self, ref):
+        return os.path.getsize(self.path(ref))
+
+    def delete(self, ref):
+        """Remove a stored file; missing files are ignored."""
+        try:
+            os.remove(self.path(ref))
+        except FileNotFoundError:
+            pass
+
+    def open(self, ref):
+        """Open a stored file for reading in binary mode."""
+        return open(self.path(ref), 'rb')
+
+    def url(self, ref, expires=None):
+        """Local files have no direct URL; the API streams them."""
+        return None
@@ -0,0 +1,87 @@
+# storage/s3.py
+import tempfile
+from storage.base import content_type_of, shard, spooled_upload
+
+# Uploads above the threshold are sent as a multipart upload in parts of this size
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+
+class S3Storage:
+    """
+    Content-addressed store in an S3-compatible bucket (AWS S3, MinIO...).
+
+    Uses the same refs and sharding as LocalStorage, under `prefix` in the bucket. Uploads are
+    spooled to a local temporary file while hashed, skipped if the object already exists, and
+    sent with boto3's managed transfer, which switches to a multipart upload for large files.
+    Downloads are handed out as presigned URLs, so file bytes never pass through the API.
+    """
+
+    def __init__(self, bucket, prefix='', max_size=None, endpoint_url=None, region=None, presigned_urls=True, client=None):
+        # boto3 is only needed when this backend is configured
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.exceptions import ClientError
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_size = max_size
+        self.presigned_urls = presigned_urls
+        self._client = client or boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        self._transfer_config = TransferConfig(multipart_threshold=MULTIPART_CHUNK_SIZE, multipart_chunksize=MULTIPART_CHUNK_SIZE)
+        self._client_error = ClientError
+
+    def key(self, ref):
+        """
+        Object key of a stored file.
+
+        :raises ValueError: If `ref` is not a storage ref.
+        """
+        return self.prefix + shard(ref)
+
+    def exists(self, ref):
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self.key(ref))
+        except ValueError:
+            return False
+        except self._client_error as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def save(self, stream, content_type):
+        """
+        Store the content of a binary stream.
+
+        :return: A tuple (ref, size, created); created is False when the content was already stored.
+        :raises ValueError: If the content type is not accepted or the content is empty.
+        :raises ProofTooLarge: If the content is larger than max_size.
+        """
+        with spooled_upload(stream, content_type, self.max_size, tempfile.gettempdir()) as (ref, size, temp_path):
+            if self.exists(ref):
+                return ref, size, False
+            self._client.upload_file(
+                temp_path, self.bucket, self.key(ref),
+                ExtraArgs={'ContentType': content_type_of(ref), 'CacheControl': 'max-age=31536000, immutable'},
+                Config=self._transfer_config
+            )
+            return ref, size, True
+
+    def size(self, ref):
+        return self._client.head_object(Bucket=self.bucket, Key=self.key(ref))['ContentLength']
+
+    def delete(self, ref):
+        """Remove a stored object; missing objects are ignored."""
+        self._client.delete_object(Bucket=self.bucket, Key=self.key(ref))
+
+    def open(self, ref):
+        """Return a stream of the object's content (botocore StreamingBody, read in chunks)."""
+        return self._client.get_object(Bucket=self.bucket, Key=self.key(ref))['Body']
+
+    def url(self, ref, expires=300):
+        """Presigned GET URL of a stored file, valid for `expires` seconds; None if presigned URLs are disabled."""
+        if not self.presigned_urls:
+            return None
+        return self._client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self.key(ref), 'ResponseContentType': content_type_of(ref)},
+            ExpiresIn=expires
+        )
@@ -1,20 +1,25 @@
+import mimetypes
 import os
+import re
+import requests
 from enum import Enum
 from dotenv import load_dotenv
 import telebot
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto
 from handlers.language_handler import edit_language
-from handlers.user_handler import get_user, create_user
-from handlers.payment_handler import start_payment
+from handlers.user_handler import create_user, resume_user_registration
+from handlers.payment_handler import start_payment, resume_payment
 from handlers.payment_methods_handler import show_payment_method_list, list_payment_methods_for_selection, add_payment_method_handler, delete_payment_method_handler, edit_payment_method_handler 
 from handlers.plans_handler import add_plan_handler, list_plans_for_selection, delete_plan_handler, edit_plan_handler, list_plans, list_plans_customer
 from handlers.locations_handler import list_locations, add_location_handler, handle_edit_location, handle_delete_location, list_locations_customer
 from handlers.schedule_handler import add_schedule_handler, delete_schedule_handler, edit_schedule_handler, list_schedules, list_schedules_customer
 from handlers.coaches_handler import add_coach_handler, delete_coach_handler, edit_coach_handler, list_coaches
-from handlers.attendance_handler import add_attendance_handler, list_coaches_for_attendance, handle_coach_selection, list_locations_for_attendance
-from deep_translator import GoogleTranslator
-import requests
-import pandas as pd
+from handlers.attendance_handler import add_attendance_handler, list_coaches_for_attendance, handle_coach_selection, list_locations_for_attendance, handle_attendance_callback, add_bulk_attendance_handler
+from utils.api_client import api
+from utils.report_jobs import ReportJobQueue
+from utils.reports import temporary_report
+from utils.translation import translate
+from utils.user_context import get_language_by_telegram_id, get_user
 #import redis
 # Load .env file
 load_dotenv()
@@ -29,29 +34,25 @@ load_dotenv()
 #     print(f"Redis connection error: {e}")
 #     redis_client = None
 
-# Ensure the reports directory exists
-if not os.path.exists('reports'):
-    os.makedirs('reports')
 
 
 
 # Telegram Bot setup
 API_TOKEN = os.getenv("API_TOKEN")
-bot = telebot.TeleBot(API_TOKEN)
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-user_data = {}
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # "polling" or "webhook"
+# In webhook mode the update dispatcher's workers run the handlers, so the bot runs them inline
+bot = telebot.TeleBot(API_TOKEN, threaded=(BOT_MODE != "webhook"))
+report_jobs = ReportJobQueue(bot)
 
 @bot.message_handler(commands=['mis_datos'])
 def list_user_data(message):
     """Fetch user data from the API and display it in a formatted message."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/users/telegram/{cid}")
+    user_status, user = get_user(cid)
 
-    if response.status_code == 200:
+    if user_status == 200:
         try:
-            user = response.json()  # The response is a single user dictionary
 
             if not isinstance(user, dict):  # Ensure the response is a dictionary
                 raise ValueError("Unexpected API response format")
@@ -76,38 +77,36 @@ def list_user_data(message):
         except Exception as e:
             bot.send_message(cid, translate("Error al procesar los datos de usuario.", target_lang))
             print(f"Unexpected error: {e}")
-    elif response.status_code == 404:
+    elif user_status == 404:
         bot.send_message(cid, translate("No se encontraron usuarios asociados a este Telegram ID.", target_lang))
     else:
         bot.send_message(cid, translate("Error al obtener los datos de usuario. Intenta nuevamente más tarde.", target_lang))
 
-##############################################REPORTS OPTIONS###################################################
+@bot.message_handler(commands=['api_stats'])
+def list_api_stats(message):
+    """Show the latency of the API calls made by the bot (administrators only)."""
+    cid = message.chat.id
+    if get_user_type(cid) not in (UserType.administrativo, UserType.owner):
+        return
 
-def generate_user_report():
-    """Fetch user data from the API and generate an Excel report."""
-    response = requests.get(f"{BASE_URL}/users")
-    if response.status_code == 200:
-        users = response.json()
-        df = pd.DataFrame(users)
-        file_path = os.path.join('reports', 'user_report.xlsx')
-        df.to_excel(file_path, index=False)
-        return file_path
-    else:
-        print("Failed to fetch user data")
-        return None  
-
-def generate_coaches_report():
-    """Fetch user data from the API and generate an Excel report."""
-    response = requests.get(f"{BASE_URL}/coaches")
-    if response.status_code == 200:
-        users = response.json()
-        df = pd.DataFrame(users)
-        file_path = os.path.join('reports', 'coaches_report.xlsx')
-        df.to_excel(file_path, index=False)
-        return file_path
-    else:
-        print("Failed to fetch user data")
-        return None  
+    metrics = api.metrics()
+    if not metrics:
+        bot.send_message(cid, "No API calls recorded yet.")
+        return
+
+    lines = [
+        f"{endpoint}: {stats['count']} calls, {stats['errors']} errors, {stats['not_modified']} not modified, "
+        f"avg {stats['avg_ms']} ms, max {stats['max_ms']} ms"
+        for endpoint, stats in sorted(metrics.items(), key=lambda item: item[1]['count'], reverse=True)
+    ]
+    reports = report_jobs.stats()
+    lines.append(
+        f"Reports: {reports['requested']} requested, {reports['built']} built, {reports['cached']} from cache, "
+        f"{reports['joined']} joined a running job, {reports['failed']} failed, {reports['running']} running"
+    )
+    bot.send_message(cid, "\n".join(lines))
+
+##############################################REPORTS OPTIONS###################################################
 
 # Function to handle the year input
 def process_year_report(m):
@@ -129,12 +128,6 @@ def process_month_report(m):
         bot.register_next_step_handler(m, lambda msg: process_month_report(msg))
         return
 
-    # Initialize user_data entry for the chat ID if it doesn't exist
-    if cid not in user_data:
-        user_data[cid] = {}    
-
-    # Save the year for later use
-    user_data[cid]['year'] = int(year)
     bot.send_message(cid, translate("Ahora, selecciona el mes para el reporte (1-12).", target_lang))
     bot.register_next_step_handler(m, lambda msg: fetch_report_data(msg, year))
 
@@ -150,28 +143,8 @@ def fetch_report_data(m, year):
         bot.register_next_step_handler(m, lambda msg: fetch_report_data(msg, year))
         return
 
-    # Save the month for later use
-    user_data[cid]['month'] = int(month)
-
-    # Call the API to fetch payment data
-    url = f"{BASE_URL}/payments/{year}/{month}"
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        # Process the response (assuming it's JSON)
-        payments_data = response.json()
-
-        # Create a DataFrame and save to an Excel file
-        df = pd.DataFrame(payments_data)
-        file_path = os.path.join('reports', 'payments_report.xlsx')
-        df.to_excel(file_path, index=False)
-
-        bot.send_message(cid, f"⏳ {translate('Generando reporte de Pagos...', target_lang)}")
-        if file_path:
-            with open(file_path, 'rb') as file:
-                bot.send_document(cid, file)
-    else:
-        bot.send_message(cid, "Error al generar el reporte. Inténtalo nuevamente más tarde.")
+    # The API builds the workbook; a report worker forwards the file
+    report_jobs.submit(cid, 'payments', target_lang, year=int(year), month=int(month))
 
 # Function to handle report generation
 def process_report(m):
@@ -192,24 +165,134 @@ def download_screen(m):
     cid = m.chat.id
     file_name = m.text.strip()
     target_lang = get_language_by_telegram_id(cid)
-    
-    # Define file paths
-    jpg_file_path = os.path.join('uploads', f"{file_name}.jpg")
-    pdf_file_path = os.path.join('uploads', f"{file_name}.pdf")
-    
-    # Check if the .jpg file exists
-    if os.path.exists(jpg_file_path):
-        with open(jpg_file_path, 'rb') as file:
-            bot.send_document(cid, file)
-    # If .jpg file does not exist, check for .pdf file
-    elif os.path.exists(pdf_file_path):
-        with open(pdf_file_path, 'rb') as file:
-            bot.send_document(cid, file)
-    else:
-        bot.send_message(cid, translate("Archivo no encontrado.", target_lang))            
+
+    # The name is the ImageRef column of the reports: a proof reference, or "<telegram id>_<YYYYMMDD>" for old proofs
+    if not re.fullmatch(r'[0-9a-f]{64}\.(jpg|png|pdf)|\d+_\d{8}', file_name):
+        bot.send_message(cid, translate("Archivo no encontrado.", target_lang))
+        return
+
+    # The API streams the file, or redirects to a presigned URL of the object storage that requests follows
+    with api.get(f"/payments/proof/{file_name}", stream=True) as response:
+        if response.status_code != 200:
+            bot.send_message(cid, translate("Archivo no encontrado.", target_lang))
+            return
+        if not os.path.splitext(file_name)[1]:
+            file_name += mimetypes.guess_extension(response.headers.get('Content-Type', '').split(';')[0]) or ''
+        response.raw.decode_content = True
+        bot.send_document(cid, response.raw, visible_file_name=file_name)
   
 
     
+# Telegram albums hold 2 to 10 photos
+ALBUM_SIZE = 10
+
+def ask_period(m, on_period):
+    """Ask for a month as YYYY-MM, then call on_period(message, year, month)."""
+    cid = m.chat.id
+    target_lang = get_language_by_telegram_id(cid)
+    bot.send_message(cid, translate("Ingresa el mes en formato AAAA-MM (por ejemplo 2024-06).", target_lang))
+    bot.register_next_step_handler(m, lambda msg: read_period(msg, on_period))
+
+def read_period(m, on_period):
+    cid = m.chat.id
+    match = re.fullmatch(r'(\d{4})-(\d{1,2})', (m.text or '').strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        target_lang = get_language_by_telegram_id(cid)
+        bot.send_message(cid, translate("Por favor, ingresa un mes válido (AAAA-MM).", target_lang))
+        bot.register_next_step_handler(m, lambda msg: read_period(msg, on_period))
+        return
+    on_period(m, int(match.group(1)), int(match.group(2)))
+
+def send_proof_album(m, year, month):
+    """Send the proof thumbnails of a month as albums, captioned with the payment and the proof reference."""
+    cid = m.chat.id
+    target_lang = get_language_by_telegram_id(cid)
+    response = api.get(f"/payments/{year}/{month}/thumbnails")
+    if response.status_code != 200:
+        bot.send_message(cid, "Error al obtener los comprobantes. Inténtalo nuevamente más tarde.")
+        return
+    payments = response.json()
+    ready = [payment for payment in payments if payment['thumbnail_ref']]
+    if not payments:
+        bot.send_message(cid, translate("No se encontraron pagos para el período seleccionado.", target_lang))
+        return
+
+    for start in range(0, len(ready), ALBUM_SIZE):
+        media = []
+        for payment in ready[start:start + ALBUM_SIZE]:
+            thumbnail = api.get(f"/payments/proof/{payment['proof_ref']}/thumbnail")
+            if thumbnail.status_code == 200:
+                caption = f"#{payment['payment_id']} {payment['user']} - {payment['amount']} ({payment['date']})\n{payment['proof_ref']}"
+                media.append(InputMediaPhoto(thumbnail.content, caption=caption))
+        if len(media) == 1:
+            bot.send_photo(cid, media[0].media, caption=media[0].caption)
+        elif media:
+            bot.send_media_group(cid, media)
+
+    pending = len(payments) - len(ready)
+    if pending:
+        bot.send_message(cid, f"{pending} {translate('comprobantes no tienen miniatura (en proceso o ilegibles).', target_lang)}")
+
+def proof_album(m):
+    ask_period(m, send_proof_album)
+
+# Largest file a bot can upload to Telegram
+TELEGRAM_MAX_UPLOAD = 50 * 1024 * 1024
+
+class ArchiveTooLarge(Exception):
+    """An archive part grew past TELEGRAM_MAX_UPLOAD while it was downloaded."""
+
+def download_archive_part(year, month, part, file_path):
+    """
+    Download one part of a month's proof archive, split by the API to fit TELEGRAM_MAX_UPLOAD.
+
+    :return: The response (for its X-Archive-Parts header), or None if the month has no proofs.
+    :raises ArchiveTooLarge: As soon as more than TELEGRAM_MAX_UPLOAD bytes were received.
+    """
+    params = {'max_size': TELEGRAM_MAX_UPLOAD, 'part': part}
+    with api.get(f"/payments/{year}/{month}/proofs.zip", params=params, stream=True) as response:
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        size = 0
+        with open(file_path, 'wb') as file:
+            for chunk in response.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > TELEGRAM_MAX_UPLOAD:
+                    raise ArchiveTooLarge()
+                file.write(chunk)
+        return response
+
+def send_proof_archive(m, year, month):
+    """Send the ZIP of a month's proofs to the chat, in as many parts as Telegram's upload limit requires."""
+    cid = m.chat.id
+    target_lang = get_language_by_telegram_id(cid)
+    bot.send_message(cid, f"⏳ {translate('Preparando los comprobantes del mes...', target_lang)}")
+
+    part = parts = 1
+    while part <= parts:
+        with temporary_report(suffix='.zip') as file_path:
+            try:
+                response = download_archive_part(year, month, part, file_path)
+            except ArchiveTooLarge:
+                bot.send_message(cid, f"{translate('El archivo supera el límite de 50 MB de Telegram.', target_lang)} ({part}/{parts})")
+                return
+            except requests.RequestException as e:
+                print(f"Failed to download the proofs archive: {e}")
+                bot.send_message(cid, translate("Error al generar el archivo. Inténtalo nuevamente más tarde.", target_lang))
+                return
+            if response is None:
+                bot.send_message(cid, translate("No se encontraron pagos para el período seleccionado.", target_lang))
+                return
+            parts = int(response.headers.get('X-Archive-Parts', 1))
+            suffix = f"_part{part}of{parts}" if parts > 1 else ''
+            with open(file_path, 'rb') as file:
+                bot.send_document(cid, file, visible_file_name=f"payment_proofs_{year}_{month:02d}{suffix}.zip")
+        part += 1
+
+def proof_archive(m):
+    ask_period(m, send_proof_archive)
+
 ###################################################END OF REPORTS OPTIONS###################################################    
 
 class UserType(Enum):
@@ -219,37 +302,12 @@ class UserType(Enum):
     owner = "owner"
 
 def get_user_type(cid):
-    """Fetch the user's type via an API request or database query."""
-    # This is a placeholder function. Replace it with the actual implementation.
-    response = requests.get(f"{BASE_URL}/users/telegram/{cid}")
-    if response.status_code == 200:
-        return UserType(response.json().get('type'))
+    """Fetch the user's type from the cached user context."""
+    user_status, user = get_user(cid)
+    if user_status == 200:
+        return UserType(user.get('type'))
     return UserType.cliente  # Default to 'cliente' if not found
 
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # # Check Redis for the language preference
-    # language = redis_client.get(f"language:{cid}")
-    # if language:
-    #     return language
-
-    # # If not found in Redis, fetch from API
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     language = response.json().get('Language', 'es')
-    #     # Store the language preference in Redis
-    #     redis_client.set(f"language:{cid}", language)
-    #     return language
-
-    return 'es'
-
 @bot.message_handler(commands=['start'])
 def command_start(message):
     cid = message.chat.id
@@ -275,6 +333,7 @@ def command_list(message):
             [InlineKeyboardButton(translate("📅 Ver Horarios", target_lang), callback_data="list_schedules_customer")],
             [InlineKeyboardButton(translate("💳 Reportar Pago", target_lang), callback_data="start_payment")],
             [InlineKeyboardButton(translate("🏅 Registro de Asistencia", target_lang), callback_data="add_attendance_handler")],
+            [InlineKeyboardButton(translate("✅ Asistencia grupal", target_lang), callback_data="add_bulk_attendance_handler")],
             # [InlineKeyboardButton(translate("🌐 Cambiar Idioma", target_lang), callback_data="edit_language")]
         ]
     elif user_type == UserType.administrativo:
@@ -304,6 +363,7 @@ def command_list(message):
             [InlineKeyboardButton(translate("📅 Ver Horarios", target_lang), callback_data="list_schedules_customer")],
             [InlineKeyboardButton(translate("💳 Reportar Pago", target_lang), callback_data="start_payment")],
             [InlineKeyboardButton(translate("🏅 Registro de Aistencia", target_lang), callback_data="add_attendance_handler")],
+            [InlineKeyboardButton(translate("✅ Asistencia grupal", target_lang), callback_data="add_bulk_attendance_handler")],
             [InlineKeyboardButton(translate("🛠️ Administrar", target_lang), callback_data="listAdmin")],
             # [InlineKeyboardButton(translate("🌐 Cambiar Idioma", target_lang), callback_data="edit_language")]
         ]
@@ -315,6 +375,10 @@ def command_list(message):
 @bot.callback_query_handler(func=lambda call: True)
 def callback_handler(call):
     cid = call.message.chat.id
+    # Buttons carrying a value ("prefix:value") are dispatched by prefix
+    if call.data.startswith('att_'):
+        handle_attendance_callback(bot, call)
+        return
     target_lang = get_language_by_telegram_id(cid)  # Get the user's language preference
     options = {
         'menu': command_list,
@@ -365,12 +429,15 @@ def callback_handler(call):
 
         # Attendance options
         'add_attendance_handler': lambda msg: add_attendance_handler(bot, msg),
+        'add_bulk_attendance_handler': lambda msg: add_bulk_attendance_handler(bot, msg),
 
         # Reports
         'reporte_clientes': reporte_clientes,
         'reporte_coachs': reporte_coachs,
         'process_year_report': process_year_report,
         'download_payment_screenshot': download_payment_screenshot,
+        'proof_album': proof_album,
+        'proof_archive': proof_archive,
     }
     func = options.get(call.data)
     if func:
@@ -393,9 +460,11 @@ def listAdmin(m):
     button7 = InlineKeyboardButton(translate("📊 Reporte Pagos", target_lang), callback_data="process_year_report")
     button8 = InlineKeyboardButton(translate("📊 Reporte Coachs", target_lang), callback_data="reporte_coachs")
     button9 = InlineKeyboardButton(translate("⬇️ Descargar print de pantalla de pago", target_lang), callback_data="download_payment_screenshot")
+    button10 = InlineKeyboardButton(translate("🖼️ Comprobantes del mes", target_lang), callback_data="proof_album")
+    button11 = InlineKeyboardButton(translate("📦 Descargar comprobantes del mes (ZIP)", target_lang), callback_data="proof_archive")
 
     # Create a nested list of buttons
-    buttons = [[button1], [button2], [button3], [button4], [button5], [button6], [button7], [button8], [button9]]
+    buttons = [[button1], [button2], [button3], [button4], [button5], [button6], [button7], [button8], [button9], [button10], [button11]]
     buttons[1].sort(key=lambda btn: btn.text)
 
     # Create the keyboard markup
@@ -407,28 +476,14 @@ def reporte_clientes(m):
     cid = m.chat.id
     """Handle the button click to generate and send the user report."""
     target_lang = get_language_by_telegram_id(cid)  # Get the user's language preference
-    bot.send_message(cid, f"⏳ {translate('Generando reporte de clientes...', target_lang)}")
-
-    file_path = generate_user_report()
-    if file_path:
-        with open(file_path, 'rb') as file:
-            bot.send_document(cid, file)
-    else:
-        bot.send_message(cid, "Error generating the report.")
+    report_jobs.submit(cid, 'users', target_lang)
 
 def reporte_coachs(m):
     cid = m.chat.id
     #print(call)
     """Handle the button click to generate and send the user report."""
     target_lang = get_language_by_telegram_id(cid)  # Get the user's language preference
-    bot.send_message(cid, f"⏳ {translate('Generando reporte de Coachs...', target_lang)}")
-    
-    file_path = generate_coaches_report()
-    if file_path:
-        with open(file_path, 'rb') as file:
-            bot.send_document(cid, file)
-    else:
-        bot.send_message(cid, "Error generating the report.")        
+    report_jobs.submit(cid, 'coaches', target_lang)
 
 
 def payment_method_menu(m):
@@ -539,4 +594,16 @@ def schedule_menu(m):
     reply_markup = InlineKeyboardMarkup(buttons)    
     bot.send_message(cid, help_text, reply_markup=reply_markup)                                    
 
-bot.polling()
+# Registered last: only messages no other handler (nor a pending next step) took reach it
+@bot.message_handler(func=lambda message: True, content_types=['text', 'photo', 'document'])
+def resume_flow(message):
+    """Resume a payment or registration flow left waiting by another (e.g. restarted) bot process."""
+    if not resume_payment(bot, message):
+        resume_user_registration(bot, message)
+
+if BOT_MODE == "webhook":
+    from webhook import run_webhook
+    run_webhook(bot)
+else:
+    bot.remove_webhook()
+    bot.polling()
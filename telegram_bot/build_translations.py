@@ -0,0 +1,100 @@
+"""
+Build the gettext catalogs used by utils/translation.py.
+
+    python telegram_bot/build_translations.py extract en   # collect strings and machine-translate new ones
+    python telegram_bot/build_translations.py compile      # compile every .po catalog into .mo
+
+`extract` scans the bot sources for translate("...") calls with a literal string and updates
+locale/<lang>/LC_MESSAGES/messages.po, keeping translations that already exist (so they can be
+reviewed and corrected by hand). `compile` runs msgfmt on each catalog; it needs no network
+access and runs in the Docker build.
+"""
+import ast
+import os
+import shutil
+import subprocess
+import sys
+from babel.messages.catalog import Catalog
+from babel.messages.mofile import write_mo
+from babel.messages.pofile import read_po, write_po
+from deep_translator import GoogleTranslator
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BOT_DIR)
+from utils.translation import DOMAIN, LOCALE_DIR, SOURCE_LANGUAGE
+
+def collect_messages():
+    """Return {text: [(file, line), ...]} for every translate() call with a literal string."""
+    messages = {}
+    for root, _, files in os.walk(BOT_DIR):
+        for file_name in sorted(files):
+            if not file_name.endswith('.py'):
+                continue
+            path = os.path.join(root, file_name)
+            with open(path, encoding='utf-8') as source:
+                tree = ast.parse(source.read(), filename=path)
+            for node in ast.walk(tree):
+                if (isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'translate'
+                        and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+                    messages.setdefault(node.args[0].value, []).append((os.path.relpath(path, BOT_DIR), node.lineno))
+    return messages
+
+def catalog_path(lang, extension):
+    return os.path.join(LOCALE_DIR, lang, 'LC_MESSAGES', f"{DOMAIN}.{extension}")
+
+def extract(lang):
+    messages = collect_messages()
+    po_path = catalog_path(lang, 'po')
+    existing = {}
+    if os.path.exists(po_path):
+        with open(po_path, 'rb') as po_file:
+            existing = {message.id: message.string for message in read_po(po_file) if message.id and message.string}
+
+    translator = GoogleTranslator(source=SOURCE_LANGUAGE, target=lang)
+    catalog = Catalog(locale=lang, domain=DOMAIN)
+    new_count = 0
+    for text, locations in sorted(messages.items()):
+        translated = existing.get(text)
+        if not translated:
+            try:
+                translated = translator.translate(text)
+                new_count += 1
+            except Exception as e:
+                print(f"Could not translate {text!r}: {e}")
+                translated = ''
+        catalog.add(text, translated or '', locations=locations)
+
+    os.makedirs(os.path.dirname(po_path), exist_ok=True)
+    with open(po_path, 'wb') as po_file:
+        write_po(po_file, catalog, width=None)
+    print(f"{po_path}: {len(messages)} strings, {new_count} newly translated")
+
+def compile_catalogs():
+    if not os.path.isdir(LOCALE_DIR):
+        print("No translation catalogs to compile.")
+        return
+    msgfmt = shutil.which('msgfmt')
+    for lang in sorted(os.listdir(LOCALE_DIR)):
+        po_path = catalog_path(lang, 'po')
+        if not os.path.exists(po_path):
+            continue
+        mo_path = catalog_path(lang, 'mo')
+        if msgfmt:
+            subprocess.run([msgfmt, '-o', mo_path, po_path], check=True)
+        else:
+            with open(po_path, 'rb') as po_file, open(mo_path, 'wb') as mo_file:
+                write_mo(mo_file, read_po(po_file))
+        print(f"Compiled {mo_path}")
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'compile'
+    if command == 'extract':
+        languages = sys.argv[2:] or os.getenv("TRANSLATION_LANGUAGES", "en").split(',')
+        for language in languages:
+            extract(language.strip())
+        compile_catalogs()
+    elif command == 'compile':
+        compile_catalogs()
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -1,10 +1,12 @@
 import os
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.state_store import create_state_store
+from utils.user_context import get_language_by_telegram_id
 import telebot
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 from telebot import types
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
 from datetime import datetime
 
 # Load environment variables
@@ -14,20 +16,9 @@ load_dotenv()
 API_TOKEN = os.getenv("API_TOKEN")
 bot = telebot.TeleBot(API_TOKEN)
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
 
-# Temporary session storage
-user_session_data = {}
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-def get_language_by_telegram_id(cid):
-    return 'es'
+# Attendance session data (coach, user, location), per chat
+user_session_data = create_state_store('attendance')
 
 def cancel_process(bot, message):
     """Handle the cancellation of the process."""
@@ -42,14 +33,23 @@ def add_attendance_handler(bot, message):
     """Start the process of adding an attendance record."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
+    user_session_data.set(cid, {})
     bot.send_message(cid, translate("Registro diario de asistencia:", target_lang))
     list_coaches_for_attendance(bot, message)
 
+def add_bulk_attendance_handler(bot, message):
+    """Start a group check-in: pick the coach and location once, then tick several members on a checklist."""
+    cid = message.chat.id
+    target_lang = get_language_by_telegram_id(cid)
+    user_session_data.set(cid, {'bulk': True, 'selected': []})
+    bot.send_message(cid, translate("Registro de asistencia grupal:", target_lang))
+    list_coaches_for_attendance(bot, message)
+
 def list_coaches_for_attendance(bot, message):
     """List all available coaches for attendance."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/coaches")
+    response = api.get("/coaches")
 
     if response.status_code == 200:
         coaches = response.json()
@@ -85,66 +85,188 @@ def handle_coach_selection(bot, message, coaches):
         return
 
     # Store coach in session data
-    user_session_data[cid] = {'coach_id': selected_coach['id']}
+    session = user_session_data.update(cid, coach_id=selected_coach['id'])
+    if session.get('bulk'):
+        # A group check-in shares one location, so it is chosen before the members
+        bot.send_message(cid, translate("Por favor, seleccione una ubicación:", target_lang))
+        list_locations_for_attendance(bot, message)
+        return
     bot.send_message(cid, translate("Por favor, seleccione un usuario (cliente):", target_lang))
     list_users_for_attendance(bot, message)
 
+# Users shown per page of search results
+USER_PAGE_SIZE = 8
+
 def list_users_for_attendance(bot, message):
-    """List all available users for attendance."""
+    """Ask for part of the user's name, last name or cedula to search for."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/users")
+    markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
+    markup.add(types.KeyboardButton(translate("Cancelar", target_lang)))
+    bot.send_message(cid, translate("Escriba el nombre, apellido o cédula del usuario:", target_lang), reply_markup=markup)
+    bot.register_next_step_handler(message, lambda msg: handle_user_search(bot, msg))
 
-    if response.status_code == 200:
-        users = response.json()
+def handle_user_search(bot, message):
+    """Search users matching the text and show the first page of results."""
+    cid = message.chat.id
+    target_lang = get_language_by_telegram_id(cid)
 
-        if users:
-            users_text = translate("Elija un usuario:\n", target_lang)
-            markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
-            for user in users:
-                markup.add(types.KeyboardButton(f"{user['cedula']}: {user['name']} {user['lastname']}"))
-            markup.add(types.KeyboardButton(translate("Cancelar", target_lang)))
-            bot.send_message(cid, users_text, reply_markup=markup)
-            bot.register_next_step_handler(message, lambda msg: handle_user_selection(bot, msg, users))
+    if not message.text or message.text.strip().lower() == translate("Cancelar", target_lang).lower():
+        cancel_process(bot, message)
+        return
+
+    query = message.text.strip()
+    user_session_data.update(cid, search=query)
+    show_user_search_results(bot, cid, query)
+
+def show_user_search_results(bot, cid, query, after=None, message_id=None):
+    """
+    Show one page of users matching `query` as inline buttons.
+
+    :param after: Cursor of the page to show (None for the first page).
+    :param message_id: Message to edit in place when paging, instead of sending a new one.
+    """
+    target_lang = get_language_by_telegram_id(cid)
+    params = {'q': query, 'limit': USER_PAGE_SIZE}
+    if after:
+        params['after'] = after
+    response = api.get("/users/search", params=params)
+    if response.status_code != 200:
+        bot.send_message(cid, translate("Error al obtener los usuarios.", target_lang))
+        return
+
+    users = response.json()
+    if not users and message_id is None:
+        bot.send_message(cid, translate("No se encontraron usuarios. Intente con otro nombre o cédula:", target_lang))
+        bot.register_next_step_handler_by_chat_id(cid, lambda msg: handle_user_search(bot, msg))
+        return
+
+    # The page is kept in the session so checklist toggles re-render without calling the API
+    user_session_data.update(
+        cid,
+        page=[[user['id'], f"{user['name']} {user['lastname']} ({user['cedula']})"] for user in users],
+        next_cursor=response.headers.get('X-Next-Cursor')
+    )
+    render_user_picker(bot, cid, message_id)
+    if message_id is None:
+        # Typing again refines the search
+        bot.register_next_step_handler_by_chat_id(cid, lambda msg: handle_user_search(bot, msg))
+
+def render_user_picker(bot, cid, message_id=None):
+    """Send (or edit) the user picker for the stored page; in group mode it is a checklist with a submit button."""
+    target_lang = get_language_by_telegram_id(cid)
+    session = user_session_data.get(cid, {})
+    bulk = session.get('bulk', False)
+    selected = {user_id for user_id, _ in session.get('selected', [])}
+
+    markup = InlineKeyboardMarkup()
+    for user_id, label in session.get('page', []):
+        if bulk:
+            mark = "✅" if user_id in selected else "⬜"
+            markup.add(InlineKeyboardButton(f"{mark} {label}", callback_data=f"att_toggle:{user_id}"))
         else:
-            bot.send_message(cid, translate("No hay usuarios disponibles.", target_lang))
+            markup.add(InlineKeyboardButton(label, callback_data=f"att_user:{user_id}"))
+    navigation = [InlineKeyboardButton(translate("🔎 Buscar de nuevo", target_lang), callback_data="att_search")]
+    if session.get('next_cursor'):
+        navigation.append(InlineKeyboardButton(translate("Siguiente ▶️", target_lang), callback_data=f"att_more:{session['next_cursor']}"))
+    markup.row(*navigation)
+
+    if bulk:
+        markup.add(InlineKeyboardButton(f"{translate('✔️ Registrar asistencia', target_lang)} ({len(selected)})", callback_data="att_submit"))
+        text = translate("Marque los asistentes. Puede buscar otros nombres sin perder la selección.", target_lang)
     else:
-        bot.send_message(cid, translate("Error al obtener los usuarios.", target_lang))
+        text = translate("Elija un usuario:", target_lang)
+
+    if message_id is None:
+        bot.send_message(cid, text, reply_markup=markup)
+    else:
+        bot.edit_message_text(text, cid, message_id, reply_markup=markup)
+
+def handle_attendance_callback(bot, call):
+    """Handle the inline buttons of the user picker (callback data starting with 'att_')."""
+    cid = call.message.chat.id
+    bot.answer_callback_query(call.id)
+    action, _, value = call.data.partition(':')
+
+    if action == 'att_more':
+        query = user_session_data.get(cid, {}).get('search')
+        if query:
+            show_user_search_results(bot, cid, query, after=value, message_id=call.message.message_id)
+    elif action == 'att_search':
+        bot.clear_step_handler_by_chat_id(cid)
+        list_users_for_attendance(bot, call.message)
+    elif action == 'att_user':
+        # A pending "search again" step must not swallow the next answer
+        bot.clear_step_handler_by_chat_id(cid)
+        handle_user_selection(bot, call.message, int(value))
+    elif action == 'att_toggle':
+        toggle_checklist_user(bot, cid, int(value), call.message.message_id)
+    elif action == 'att_submit':
+        bot.clear_step_handler_by_chat_id(cid)
+        submit_bulk_attendance(bot, call.message)
+
+def toggle_checklist_user(bot, cid, user_id, message_id):
+    """Tick or untick a member on the group check-in checklist."""
+    session = user_session_data.get(cid)
+    if not session or not session.get('bulk'):
+        return
+    selected = session.get('selected', [])
+    if any(selected_id == user_id for selected_id, _ in selected):
+        selected = [entry for entry in selected if entry[0] != user_id]
+    else:
+        label = next((label for page_id, label in session.get('page', []) if page_id == user_id), str(user_id))
+        selected.append([user_id, label])
+    user_session_data.update(cid, selected=selected)
+    render_user_picker(bot, cid, message_id)
 
-def handle_user_selection(bot, message, users):
-    """Handle the selection of a user and proceed to location selection."""
+def submit_bulk_attendance(bot, message):
+    """Register every ticked member with one request."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-
-    if message.text.strip().lower() == translate("Cancelar", target_lang).lower():
+    session = user_session_data.get(cid, {})
+    selected = session.get('selected', [])
+    if not selected:
+        bot.send_message(cid, translate("No ha marcado ningún asistente.", target_lang))
+        return
+    if 'coach_id' not in session or 'location' not in session:
         cancel_process(bot, message)
         return
 
-    user_input = message.text.strip()
+    data = {
+        'coach_id': session['coach_id'],
+        'location_id': session['location']['id'],
+        'user_ids': [user_id for user_id, _ in selected],
+        'date': datetime.utcnow().strftime('%Y-%m-%d %H:%M')
+    }
+    response = api.post("/attendances/bulk", json=data)
+    if response.status_code == 201:
+        user_session_data.pop(cid, None)
+        names = "\n".join(f"• {label}" for _, label in selected)
+        bot.edit_message_reply_markup(cid, message.message_id, reply_markup=None)
+        bot.send_message(
+            cid,
+            translate("Asistencias registradas:", target_lang) + f" {response.json()['created']}\n{names}",
+            reply_markup=types.ReplyKeyboardRemove()
+        )
+    else:
+        bot.send_message(cid, translate("Error al registrar la asistencia. Por favor, inténtelo de nuevo.", target_lang))
 
-    # Try to find the user based on input
-    selected_user = None
-    if ":" in user_input:  # Input matches button format "<cedula>: <name> <lastname>"
-        input_cedula = user_input.split(":")[0].strip()
-        selected_user = next((user for user in users if str(user['cedula']) == input_cedula and f"{user['cedula']}: {user['name']} {user['lastname']}" == user_input), None)
-    else:  # Input is just the cedula
-        input_cedula = user_input.strip()
-        selected_user = next((user for user in users if str(user['cedula']) == input_cedula), None)
-
-    if not selected_user:
-        bot.send_message(cid, translate("Usuario inválido. Por favor, seleccione un usuario válido o ingrese el número de cédula.", target_lang))
-        bot.register_next_step_handler(message, lambda msg: handle_user_selection(bot, msg, users))
+def handle_user_selection(bot, message, user_id):
+    """Store the selected user and proceed to location selection."""
+    cid = message.chat.id
+    target_lang = get_language_by_telegram_id(cid)
+
+    if 'coach_id' not in user_session_data.get(cid, {}):
+        cancel_process(bot, message)
         return
 
     # Store user in session data
-    if cid not in user_session_data:
-        user_session_data[cid] = {}
-    user_session_data[cid]['user_id'] = selected_user['id']
+    session = user_session_data.update(cid, user_id=user_id)
 
     # Check if location is already stored
-    if 'location' in user_session_data[cid]:
+    if 'location' in session:
         # If location is stored, skip location selection
-        submit_attendance(bot, message, user_session_data[cid]['location'])
+        submit_attendance(bot, message, session['location'])
     else:
         # If location is not stored, proceed to location selection
         bot.send_message(cid, translate("Por favor, seleccione una ubicación:", target_lang))
@@ -155,7 +277,7 @@ def list_locations_for_attendance(bot, message):
     """List all available locations for attendance."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/locations")
+    response = api.get("/locations")
 
     if response.status_code == 200:
         locations = response.json()
@@ -198,15 +320,17 @@ def handle_location_selection(bot, message, locations):
         return
 
     # Store location in session data
-    if cid not in user_session_data:
-        user_session_data[cid] = {}
-    user_session_data[cid]['location'] = {
+    session = user_session_data.update(cid, location={
         'id': selected_location['id'],
         'name': selected_location['location']
-    }
+    })
+
+    if session.get('bulk'):
+        list_users_for_attendance(bot, message)
+        return
 
     # Submit attendance data
-    submit_attendance(bot, message, user_session_data[cid]['location'])
+    submit_attendance(bot, message, session['location'])
 
 def submit_attendance(bot, message, location):
     """Submit the attendance data to the backend."""
@@ -217,13 +341,17 @@ def submit_attendance(bot, message, location):
     date = datetime.utcnow().strftime('%Y-%m-%d %H:%M')
 
     # Data to be sent
+    session = user_session_data.get(cid, {})
+    if 'coach_id' not in session or 'user_id' not in session:
+        bot.send_message(cid, translate("Proceso cancelado.", target_lang))
+        return
     data = {
-        'coach_id': user_session_data[cid]['coach_id'],
-        'user_id': user_session_data[cid]['user_id'],
+        'coach_id': session['coach_id'],
+        'user_id': session['user_id'],
         'location_id': location['id'],
         'date': date
     }
-    response = requests.post(f"{BASE_URL}/attendances", json=data)
+    response = api.post("/attendances", json=data)
 
     if response.status_code == 201:
         offer_add_or_finish(bot, message, target_lang)
@@ -249,8 +377,8 @@ def process_add_or_finish(bot, message):
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
 
-    user_input = message.text.strip().lower()
-    add_another_option = translate("Agregar Persona", target_lang).lower()
+    user_input = (message.text or '').strip().lower()
+    add_another_option = translate("Agregar Otro", target_lang).lower()
     finish_option = translate("Terminar", target_lang).lower()
 
     if user_input == add_another_option:
@@ -258,7 +386,7 @@ def process_add_or_finish(bot, message):
         list_users_for_attendance(bot, message)
     elif user_input == finish_option:
         user_session_data.pop(cid, None)  # Clear session data
-        bot.send_message(cid, translate("Proceso finalizado. Gracias.", target_lang), reply_markup=ReplyKeyboardRemove())
+        bot.send_message(cid, translate("Proceso finalizado. Gracias.", target_lang), reply_markup=types.ReplyKeyboardRemove())
     else:
         bot.send_message(cid, translate("Opción inválida. Por favor, seleccione una opción válida.", target_lang))
-        offer_add_or_finish(bot, message)
+        offer_add_or_finish(bot, message, target_lang)
@@ -1,9 +1,10 @@
 import os
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.user_context import get_language_by_telegram_id
 import telebot
 from telebot import types
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
 
 # Load environment variables
 load_dotenv()
@@ -12,23 +13,6 @@ load_dotenv()
 API_TOKEN = os.getenv("API_TOKEN")
 bot = telebot.TeleBot(API_TOKEN)
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-    
 def create_cancel_markup(target_lang='es'):
     """Create a reply markup with a 'Cancel' button."""
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -75,7 +59,7 @@ def handle_names_input(bot, message, cedula):
 
     names = message.text.strip()
 
-    response = requests.get(f"{BASE_URL}/locations")
+    response = api.get("/locations")
     if response.status_code == 200:
         locations = response.json()    
 
@@ -107,7 +91,7 @@ def submit_new_coach(bot, message, cedula, names, locations):
    
     location_id = selected_location['id']
     data = {"cedula": cedula, "names": names, "location_id": int(location_id)}
-    response = requests.post(f"{BASE_URL}/coaches", json=data)
+    response = api.post("/coaches", json=data)
     bot.send_message(cid, translate("Procesando...", target_lang))
     if response.status_code == 201:
         bot.send_message(message.chat.id, translate("¡Entrenador creado con éxito!", target_lang))
@@ -119,7 +103,7 @@ def list_coaches(bot, message):
     """Fetch and display the list of all available coaches."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/coaches")
+    response = api.get("/coaches")
 
     if response.status_code == 200:
         coaches = response.json()
@@ -143,7 +127,7 @@ def list_coaches_for_selection(bot, message, action):
     """Fetch and display the list of available coaches for selection."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/coaches")
+    response = api.get("/coaches")
 
     if response.status_code == 200:
         coaches = response.json()
@@ -246,7 +230,7 @@ def handle_location_edit(bot, message, coach):
     coach['location_id'] = int(new_location_id)
 
     # Submit the updated coach to the backend
-    response = requests.put(f"{BASE_URL}/coaches/{coach['id']}", json=coach)
+    response = api.put(f"/coaches/{coach['id']}", json=coach)
     bot.send_message(cid, translate("Procesando...", target_lang))
 
     if response.status_code == 200:
@@ -293,7 +277,7 @@ def execute_delete_coach(bot, message, coach_id):
     target_lang = get_language_by_telegram_id(cid)
 
     if message.text.strip().lower() == translate("Sí", target_lang).lower():
-        response = requests.delete(f"{BASE_URL}/coaches/{coach_id}")
+        response = api.delete(f"/coaches/{coach_id}")
         bot.send_message(cid, translate("Procesando...", target_lang))
         if response.status_code == 200:
             bot.send_message(cid, translate("¡Entrenador eliminado con éxito!", target_lang))
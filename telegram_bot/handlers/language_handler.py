@@ -1,13 +1,13 @@
 import os
 import sys
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.user_context import get_language_by_telegram_id, invalidate_user_context
 import gettext
 from dotenv import load_dotenv
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from deep_translator import GoogleTranslator
 from telebot import types
 from telebot.types import Message
-import requests
 # import redis
 
 # Load environment variables
@@ -24,31 +24,10 @@ load_dotenv()
 #     print(f"Redis connection error: {e}")
 #     redis_client = None
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-    
 # Fetch language preference from API
 def fetch_language_from_db(telegram_id):
-    # """Fetch language preference from API by Telegram ID."""
-    # response = requests.get(f"{BASE_URL}/languages/{telegram_id}")
-    # if response.status_code == 200:
-    #     return response.json().get('Language', 'es')
-    return 'es'
+    """Fetch language preference from API by Telegram ID (cached, see utils/user_context.py)."""
+    return get_language_by_telegram_id(telegram_id)
 
 def edit_language(bot, message):
     """Handle the language editing process."""
@@ -59,27 +38,28 @@ def edit_language(bot, message):
     bot.register_next_step_handler(message, lambda msg: set_user_language(bot, msg))
 
 def change_language(cid, language_code):
-    """Update the user's language preference via an API request and delete the Redis cache."""
-    redis_client.delete(f"language:{cid}")
-    url = f"{BASE_URL}//languages/{cid}"
+    """Update the user's language preference via an API request and drop the cached one."""
     data = {'language': language_code}
-    response = requests.put(url, json=data)       
-    
+    response = api.put(f"/languages/{cid}", json=data)
+    if response.status_code == 404:
+        # First time the user picks a language
+        response = api.post("/languages", json={'id_telegram': cid, 'Language': language_code})
+    invalidate_user_context(cid)
     return response
 
 def set_user_language(bot, message):
     """Set the user's language preference."""
     cid = message.chat.id
     language = message.text.strip().lower()
-    if language == "english":
-        change_language(cid, 'en')
+    if language in ("english", "español") and not change_language(cid, 'en' if language == "english" else 'es').ok:
+        bot.send_message(cid, translate("Error al guardar el idioma. Inténtalo nuevamente más tarde."))
+    elif language == "english":
         markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
         item1 = types.KeyboardButton("/menu")
         markup.row(item1)
         bot.send_message(cid, translate("Idioma cambiado a Inglés.", 'en'), reply_markup=markup)
 
     elif language == "español":
-        change_language(cid, 'es')
         markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
         item1 = types.KeyboardButton("/menu")
         markup.row(item1)
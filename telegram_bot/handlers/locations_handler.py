@@ -1,10 +1,11 @@
 import os
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.user_context import get_language_by_telegram_id
 import telebot
 from telebot import types
 from dotenv import load_dotenv
 import re
-from deep_translator import GoogleTranslator
 
 # Load environment variables
 load_dotenv()
@@ -13,23 +14,6 @@ load_dotenv()
 API_TOKEN = os.getenv("API_TOKEN")
 bot = telebot.TeleBot(API_TOKEN)
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-    
 def create_cancel_markup(target_lang='es'):
     """Create a reply markup with a 'Cancel' button."""
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -68,7 +52,7 @@ def list_locations(bot, message):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/locations")
+    response = api.get("/locations")
 
     if response.status_code == 200:
         locations = response.json()
@@ -98,7 +82,7 @@ def list_locations_customer(bot, message):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/locations")
+    response = api.get("/locations")
 
     if response.status_code == 200:
         locations = response.json()
@@ -170,7 +154,7 @@ def submit_new_location(bot, message, location_name):
         return
 
     data = {"location": location_name, "address": location_address}
-    response = requests.post(f"{BASE_URL}/locations", json=data)
+    response = api.post("/locations", json=data)
     bot.send_message(cid, translate("Procesando...", target_lang))
     if response.status_code == 201:
         bot.send_message(message.chat.id, translate("Ubicación creada con éxito.", target_lang))
@@ -185,7 +169,7 @@ def list_locations_for_selection(bot, message, action):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/locations")
+    response = api.get("/locations")
 
     if response.status_code == 200:
         locations = response.json()
@@ -286,7 +270,7 @@ def submit_edited_location(bot, message, location_id, new_location_name):
 
     if new_address.lower() == translate("Omitir", target_lang).lower():
         # Keep the address unchanged
-        response = requests.get(f"{BASE_URL}/locations/{location_id}")
+        response = api.get(f"/locations/{location_id}")
         if response.status_code == 200:
             location = response.json()
             new_address = location['address']
@@ -295,7 +279,7 @@ def submit_edited_location(bot, message, location_id, new_location_name):
             return
 
     data = {"location": new_location_name, "address": new_address}
-    response = requests.put(f"{BASE_URL}/locations/{location_id}", json=data)
+    response = api.put(f"/locations/{location_id}", json=data)
     bot.send_message(cid, translate("Procesando...", target_lang))
 
     if response.status_code == 200:
@@ -350,7 +334,7 @@ def execute_delete_location(bot, message, location_id):
     target_lang = get_language_by_telegram_id(cid)
 
     if message.text == translate("Sí", target_lang):
-        response = requests.delete(f"{BASE_URL}/locations/{location_id}")
+        response = api.delete(f"/locations/{location_id}")
         bot.send_message(cid, translate("Procesando...", target_lang))
         markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
         markup.add(types.KeyboardButton("/menu"))
@@ -1,11 +1,14 @@
 import os
 import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.state_store import PROCESS_ID, create_state_store
+from utils.user_context import get_language_by_telegram_id, get_user
 import telebot
-from telebot import types
+from telebot import apihelper, types
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 from datetime import datetime
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
 
 # Telegram Bot setup
 API_TOKEN = os.getenv("API_TOKEN")
@@ -14,12 +17,11 @@ bot = telebot.TeleBot(API_TOKEN)
 # Load environment variables
 load_dotenv()
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-UPLOAD_DIR = "uploads"  # Directory for uploaded payment proofs
+# Chunk size used to relay payment proofs from Telegram to the API
+PROOF_CHUNK_SIZE = 64 * 1024
 
-# Dictionary to temporarily store payment data
-payment_data = {}
+# Payment data collected so far, per chat; it includes the step the flow is waiting on
+payment_data = create_state_store('payment')
 
 # Define the is_float function
 def is_float(value):
@@ -29,20 +31,6 @@ def is_float(value):
     except ValueError:
         return False
 
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-    
 def create_cancel_markup(target_lang='es'):
     """Create a reply markup with a 'Cancel' button."""
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -60,22 +48,43 @@ def cancel_process(bot, message):
     bot.send_message(cid, translate("Proceso cancelado.", target_lang), reply_markup=markup)
     payment_data.pop(cid, None)  # Clear payment data after cancellation
 
+def wait_for_step(bot, message, step, callback):
+    """Wait for the user's next message, remembering the step so the flow can be resumed after a restart."""
+    payment_data.update(message.chat.id, step=step, process=PROCESS_ID)
+    bot.register_next_step_handler(message, callback)
+
+def resume_payment(bot, message):
+    """
+    Continue a payment flow whose next-step handler was lost (e.g. the bot restarted).
+
+    Steps stored by this process are not resumed: their handler is still registered, or the
+    flow ended without one and the message is unrelated to it.
+
+    :return: True if the message was handled as the next step of a stored payment flow.
+    """
+    data = payment_data.get(message.chat.id)
+    if not data or data.get("step") not in PAYMENT_STEPS or data.get("process") == PROCESS_ID:
+        return False
+    PAYMENT_STEPS[data["step"]](bot, message, data)
+    return True
+
 # Step 1: Fetch payment methods and display them as buttons
 def start_payment(bot, message):
     """Start the payment process after validating user existence."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
 
-    # Validate if the user exists
-    user_validation_response = requests.get(f"{BASE_URL}/users/telegram/{cid}")
-    if user_validation_response.status_code == 404:
+    # Validate if the user exists ("No" on the confirmation restarts here, so drop that flow first)
+    payment_data.pop(cid, None)
+    user_status, _ = get_user(cid)
+    if user_status == 404:
         # User does not exist
         bot.send_message(
             cid,
             translate("Para ingresar pago debe registrarse en la plataforma.", target_lang),
         )
         return
-    elif user_validation_response.status_code != 200:
+    elif user_status != 200:
         # Handle unexpected errors from the server
         bot.send_message(
             cid,
@@ -84,7 +93,7 @@ def start_payment(bot, message):
         return
 
     # Fetch payment methods from the API
-    response = requests.get(f"{BASE_URL}/payment_methods")
+    response = api.get("/payment_methods")
     if response.status_code != 200:
         bot.send_message(cid, translate("Error al obtener los métodos de pago.", target_lang))
         return
@@ -102,7 +111,8 @@ def start_payment(bot, message):
     markup.row(item1)
 
     bot.send_message(cid, translate("Seleccione un método de pago:", target_lang), reply_markup=markup)
-    bot.register_next_step_handler(message, lambda msg: handle_payment_method_selection(bot, msg, payment_methods))
+    payment_data.set(cid, {"payment_methods": payment_methods})
+    wait_for_step(bot, message, "method", lambda msg: handle_payment_method_selection(bot, msg, payment_methods))
 
 
 # Step 1b: Handle selected payment method from user’s message text
@@ -121,16 +131,13 @@ def handle_payment_method_selection(bot, message, payment_methods):
     selected_method = next((method for method in payment_methods if method["method"] == selected_method_name), None)
     
     if selected_method:
-        if cid not in payment_data:
-            payment_data[cid] = {}
-        payment_data[cid]["payment_method_id"] = selected_method["id"]
-        payment_data[cid]["payment_method_name"] = selected_method_name  # Store the method name
+        payment_data.update(cid, payment_method_id=selected_method["id"], payment_method_name=selected_method_name)  # Store the method name
         markup = create_cancel_markup(target_lang)
         bot.send_message(cid, translate("Por favor, ingrese el monto del pago:", target_lang), reply_markup=markup)
-        bot.register_next_step_handler(message, lambda msg: handle_payment_amount(bot, msg))
+        wait_for_step(bot, message, "amount", lambda msg: handle_payment_amount(bot, msg))
     else:
         bot.send_message(cid, translate("Método de pago inválido.", target_lang))
-        bot.register_next_step_handler(message, lambda msg: handle_payment_method_selection(bot, msg, payment_methods))
+        wait_for_step(bot, message, "method", lambda msg: handle_payment_method_selection(bot, msg, payment_methods))
 
 def handle_payment_amount(bot, message):
     """Process the payment amount and confirm the payment."""
@@ -144,25 +151,25 @@ def handle_payment_amount(bot, message):
     amount = message.text.strip()
     if not is_float(amount):
         bot.send_message(cid, translate("Monto de pago inválido.", target_lang))
-        bot.register_next_step_handler(message, lambda msg: handle_payment_amount(bot, msg))
+        wait_for_step(bot, message, "amount", lambda msg: handle_payment_amount(bot, msg))
         return
 
-    payment_data[cid]["amount"] = float(amount)
+    payment_data.update(cid, amount=float(amount))
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
     markup.add(translate("Omitir", target_lang))
     bot.send_message(cid, translate("Por favor, ingrese la referencia del pago (o 'Omitir'):", target_lang), reply_markup=markup)
-    bot.register_next_step_handler(message, lambda msg: process_payment_reference(bot, msg))
+    wait_for_step(bot, message, "reference", lambda msg: process_payment_reference(bot, msg))
 
 # Step 3: Process payment reference
 def process_payment_reference(bot, message):
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    payment_data[cid]["reference"] = message.text if message.text.lower() != translate("Omitir", target_lang).lower() else None
+    payment_data.update(cid, reference=message.text if message.text.lower() != translate("Omitir", target_lang).lower() else None)
     
     # Ask for payment proof (image or PDF)
     markup = create_cancel_markup(target_lang)
     bot.send_message(cid, translate("Por favor, suba una imagen o PDF del comprobante de pago:", target_lang), reply_markup=markup)
-    bot.register_next_step_handler(message, lambda msg: process_payment_proof(bot, msg))
+    wait_for_step(bot, message, "proof", lambda msg: process_payment_proof(bot, msg))
 
 # Step 4: Process payment proof upload
 def process_payment_proof(bot, message):
@@ -171,34 +178,55 @@ def process_payment_proof(bot, message):
     
     # Handle photo or document upload
     if message.content_type == 'photo':
-        file_id = message.photo[-1].file_id
+        file_id, content_type = message.photo[-1].file_id, 'image/jpeg'
     elif message.content_type == 'document' and message.document.mime_type in ["application/pdf"]:
-        file_id = message.document.file_id
+        file_id, content_type = message.document.file_id, 'application/pdf'
     else:
         bot.send_message(cid, translate("Formato de archivo inválido. Por favor, suba una imagen o PDF.", target_lang))
-        bot.register_next_step_handler(message, lambda msg: process_payment_proof(bot, msg))
+        wait_for_step(bot, message, "proof", lambda msg: process_payment_proof(bot, msg))
         return
 
-    # Download and save the file
-    file_info = bot.get_file(file_id)
-    downloaded_file = bot.download_file(file_info.file_path)
-    file_name = f"{cid}_{datetime.now().strftime('%Y%m%d')}.jpg" if message.content_type == 'photo' else f"{cid}_{datetime.now().strftime('%Y%m%d')}.pdf"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    with open(file_path, 'wb') as new_file:
-        new_file.write(downloaded_file)
+    proof_ref = upload_payment_proof(bot, file_id, content_type)
+    if not proof_ref:
+        bot.send_message(cid, translate("No se pudo guardar el comprobante. Por favor, inténtelo de nuevo.", target_lang))
+        wait_for_step(bot, message, "proof", lambda msg: process_payment_proof(bot, msg))
+        return
 
-    # Store file path in payment data
-    payment_data[cid]["proof"] = file_path
+    # Store the proof reference in payment data
+    payment_data.update(cid, proof_ref=proof_ref)
 
     # Display payment summary for confirmation
     show_confirmation(cid, bot)
 
+def upload_payment_proof(bot, file_id, content_type):
+    """
+    Relay a Telegram file to the API's proof storage in chunks, without holding it in memory.
+
+    :return: The proof reference to send with the payment, or None if it could not be stored.
+    """
+    file_info = bot.get_file(file_id)
+    file_url = (apihelper.FILE_URL or "https://api.telegram.org/file/bot{0}/{1}").format(bot.token, file_info.file_path)
+    try:
+        with requests.get(file_url, stream=True, timeout=(10, 60)) as download:
+            download.raise_for_status()
+            response = api.post(
+                "/payments/proofs",
+                data=download.iter_content(PROOF_CHUNK_SIZE),
+                headers={'Content-Type': content_type}
+            )
+    except requests.RequestException as e:
+        print(f"Error downloading payment proof: {e}")
+        return None
+    if response.status_code != 201:
+        print(f"Error storing payment proof: {response.status_code} {response.text}")
+        return None
+    return response.json()['proof_ref']
+
 # Step 5: Show confirmation with collected data
 def show_confirmation(cid, bot):
     """Display payment confirmation with collected data."""
     target_lang = get_language_by_telegram_id(cid)
-    data = payment_data[cid]
+    data = payment_data.get(cid)
     confirmation_text = (
         translate("Por favor, confirme la información del pago:", target_lang) + "\n\n" +
         translate("Método de pago:", target_lang) + f" {data['payment_method_name']}\n" +  # Display name instead of ID
@@ -217,7 +245,7 @@ def show_confirmation(cid, bot):
 
     # Send message with confirmation options
     msg = bot.send_message(cid, confirmation_text, reply_markup=markup, parse_mode="Markdown")
-    bot.register_next_step_handler(msg, lambda msg: confirmation_handler(bot, msg))
+    wait_for_step(bot, msg, "confirm", lambda msg: confirmation_handler(bot, msg))
 
 
 # Step 6: Handle confirmation response
@@ -234,7 +262,7 @@ def confirmation_handler(bot, message):
 
     if user_input not in [yes_option, no_option, cancel_option]:
         bot.send_message(cid, translate("Opción inválida. Por favor, seleccione 'Sí', 'No' o 'Cancelar'.", target_lang))
-        bot.register_next_step_handler(message, lambda msg: confirmation_handler(bot, msg))
+        wait_for_step(bot, message, "confirm", lambda msg: confirmation_handler(bot, msg))
         return
 
     if user_input == yes_option:
@@ -255,15 +283,15 @@ def confirmation_handler(bot, message):
 def submit_payment(cid):
     target_lang = get_language_by_telegram_id(cid)
     # Step 1: Fetch user ID from the backend using the Telegram user ID (cid)
-    user_response = requests.get(f"{BASE_URL}/users/telegram/{cid}")
+    user_status, user_data = get_user(cid)
     
     # Handle cases where the user is not found or there is an error
-    if user_response.status_code != 200:
+    if user_status != 200:
         bot.send_message(cid, translate("Usuario no encontrado.", target_lang))
+        payment_data.pop(cid, None)
         return
 
     # Extract the user ID from the response
-    user_data = user_response.json()
     user_id = user_data.get('id')
     
     if not user_id:
@@ -271,10 +299,14 @@ def submit_payment(cid):
         item1 = types.KeyboardButton("/menu")
         markup.row(item1)
         bot.send_message(cid, translate("Usuario no encontrado.", target_lang), reply_markup=markup)
+        payment_data.pop(cid, None)
         return
     
     # Step 2: Prepare payment data with the retrieved user ID
-    data = payment_data[cid]
+    data = payment_data.get(cid)
+    if not data:
+        bot.send_message(cid, translate("Proceso cancelado.", target_lang))
+        return
     reference = data['reference'] if data['reference'] else "000000"  # Set reference to "000000" if None or empty
     payment_payload = {
         'user_id': user_id,  # Use the fetched user_id here
@@ -283,11 +315,12 @@ def submit_payment(cid):
         'reference': reference,
         'payment_method_id': data['payment_method_id'],
         'year': datetime.now().year,
-        'month': datetime.now().month
+        'month': datetime.now().month,
+        'proof_ref': data.get('proof_ref')
     }
 
     # Step 3: Make API call to submit the payment data
-    response = requests.post(f"{BASE_URL}/payments", json=payment_payload)
+    response = api.post("/payments", json=payment_payload)
     markup_remove = types.ReplyKeyboardRemove()
     
     # Step 4: Send confirmation to user based on API response
@@ -298,3 +331,12 @@ def submit_payment(cid):
 
     # Step 5: Clear stored data
     payment_data.pop(cid, None)
+
+# Steps of the payment flow that can be resumed from the stored state
+PAYMENT_STEPS = {
+    "method": lambda bot, msg, data: handle_payment_method_selection(bot, msg, data.get("payment_methods", [])),
+    "amount": lambda bot, msg, data: handle_payment_amount(bot, msg),
+    "reference": lambda bot, msg, data: process_payment_reference(bot, msg),
+    "proof": lambda bot, msg, data: process_payment_proof(bot, msg),
+    "confirm": lambda bot, msg, data: confirmation_handler(bot, msg),
+}
@@ -1,9 +1,10 @@
 import os
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.user_context import get_language_by_telegram_id
 import telebot
 from telebot import types
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
 
 # Load environment variables
 load_dotenv()
@@ -12,23 +13,6 @@ load_dotenv()
 API_TOKEN = os.getenv("API_TOKEN")
 bot = telebot.TeleBot(API_TOKEN)
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-    
 def create_cancel_markup(target_lang='es'):
     """Create a reply markup with a 'Cancel' button."""
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -52,7 +36,7 @@ def show_payment_method_list(bot, message):
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
     # Fetch payment methods from the API
-    response = requests.get(f"{BASE_URL}/payment_methods")
+    response = api.get("/payment_methods")
     
     if response.status_code != 200:
         bot.send_message(message.chat.id, translate("Error al obtener los métodos de pago.", target_lang))
@@ -103,7 +87,7 @@ def submit_new_payment_method(bot, message):
     
     if new_method_name:
         bot.send_message(cid, translate("Procesando...", target_lang))
-        response = requests.post(f"{BASE_URL}/payment_methods", json={"method": new_method_name})
+        response = api.post("/payment_methods", json={"method": new_method_name})
         
         if response.status_code == 201:
             bot.send_message(cid, translate("Método de pago creado con éxito.", target_lang))
@@ -120,7 +104,7 @@ def list_payment_methods_for_selection(bot, message, action):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/payment_methods")
+    response = api.get("/payment_methods")
     
     if response.status_code == 200:
         payment_methods = response.json()
@@ -204,7 +188,7 @@ def delete_payment_method(bot, message, payment_method_id):
     target_lang = get_language_by_telegram_id(cid)
     bot.send_message(cid, translate("Procesando...", target_lang))
     
-    response = requests.delete(f"{BASE_URL}/payment_methods/{payment_method_id}")
+    response = api.delete(f"/payment_methods/{payment_method_id}")
     
     if response.status_code == 204:
         markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -254,7 +238,7 @@ def edit_payment_method(bot, message, payment_method_id):
     
     if new_name:
         bot.send_message(cid, translate("Procesando...", target_lang))
-        response = requests.put(f"{BASE_URL}/payment_methods/{payment_method_id}", json={"method": new_name})
+        response = api.put(f"/payment_methods/{payment_method_id}", json={"method": new_name})
         if response.status_code == 200:
             markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
             item1 = types.KeyboardButton("/menu")
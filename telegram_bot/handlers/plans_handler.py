@@ -1,9 +1,10 @@
 import os
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.user_context import get_language_by_telegram_id
 import telebot
 from telebot import types
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
 
 # Load environment variables
 load_dotenv()
@@ -12,23 +13,6 @@ load_dotenv()
 API_TOKEN = os.getenv("API_TOKEN")
 bot = telebot.TeleBot(API_TOKEN)
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-    
 def create_cancel_markup(target_lang='es'):
     """Create a reply markup with a 'Cancel' button."""
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -51,7 +35,7 @@ def list_plans(bot, message):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/plans")
+    response = api.get("/plans")
 
     if response.status_code == 200:
         plans = response.json()
@@ -77,7 +61,7 @@ def list_plans_customer(bot, message):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/plans")
+    response = api.get("/plans")
 
     if response.status_code == 200:
         plans = response.json()
@@ -145,7 +129,7 @@ def submit_new_plan(bot, message, plan_name):
         return
 
     data = {"name": plan_name, "price": plan_price}
-    response = requests.post(f"{BASE_URL}/plans", json=data)
+    response = api.post("/plans", json=data)
 
     if response.status_code == 201:
         bot.send_message(message.chat.id, translate("Plan creado con éxito.", target_lang))
@@ -159,7 +143,7 @@ def list_plans_for_selection(bot, message, action):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/plans")
+    response = api.get("/plans")
 
     if response.status_code == 200:
         plans = response.json()
@@ -252,7 +236,7 @@ def submit_edit_plan(bot, message, plan, new_name):
         new_price = float(message.text.strip()) if message.text.strip().lower() != translate("Omitir", target_lang).lower() else plan['price']
         bot.send_message(cid, translate("Procesando...", target_lang))
         data = {"name": new_name, "price": new_price}
-        response = requests.put(f"{BASE_URL}/plans/{plan['id']}", json=data)
+        response = api.put(f"/plans/{plan['id']}", json=data)
 
         if response.status_code == 200:
             markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -327,7 +311,7 @@ def delete_plan(bot, message, plan_id):
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
     bot.send_message(cid, translate("Procesando...", target_lang))
-    response = requests.delete(f"{BASE_URL}/plans/{plan_id}")
+    response = api.delete(f"/plans/{plan_id}")
 
     if response.status_code == 200:
         markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
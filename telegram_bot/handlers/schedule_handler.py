@@ -1,10 +1,12 @@
 import os
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.user_context import get_language_by_telegram_id
 import telebot
 from telebot import types
 from dotenv import load_dotenv
 import re
-from deep_translator import GoogleTranslator
+import unicodedata
 
 # Load environment variables
 load_dotenv()
@@ -13,23 +15,6 @@ load_dotenv()
 API_TOKEN = os.getenv("API_TOKEN")
 bot = telebot.TeleBot(API_TOKEN)
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-    
 def is_valid_time_list(input_text):
     """
     Validate if the input follows the format '9:00,10:00,11:00'.
@@ -37,6 +22,45 @@ def is_valid_time_list(input_text):
     pattern = r'^([0-9]{1,2}:[0-5][0-9])(,[0-9]{1,2}:[0-5][0-9])*$'
     return bool(re.match(pattern, input_text))
 
+# Same rules as parse_days() in the API's services/schedule_slot_service.py
+WEEKDAYS = {
+    'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5, 'domingo': 6,
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+def days_error(input_text):
+    """
+    Validate the days of a schedule, e.g. "Lunes, Miércoles" or "Lunes a Viernes", as the API does.
+
+    Day names may be Spanish or English, with or without accents; "a", "al", "to" or "-" between
+    two days is a range.
+
+    :return: None if the days are valid, else the reason they are not.
+    """
+    text = unicodedata.normalize('NFKD', (input_text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    words = [word for word in re.split(r'[\s,;/]+|(-)', text) if word and word not in ('y', 'and', 'e')]
+    previous, in_range = None, False
+    for word in words:
+        if word in ('a', 'al', 'to', '-'):
+            if previous is None:
+                return f"'{input_text}'"
+            in_range = True
+            continue
+        if word not in WEEKDAYS:
+            return f"'{word}'"
+        previous, in_range = WEEKDAYS[word], False
+    if in_range or previous is None:
+        return f"'{input_text}'"
+    return None
+
+def api_error(response):
+    """The `error` message of a failed API response, or an empty string."""
+    try:
+        return response.json().get('error') or ''
+    except ValueError:
+        return ''
+
 def create_cancel_markup(target_lang='es'):
     """Create a reply markup with a 'Cancel' button."""
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -73,7 +97,7 @@ def list_schedules(bot, message):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/schedules")
+    response = api.get("/schedules")
 
     if response.status_code == 200:
         schedules = response.json()
@@ -99,7 +123,7 @@ def list_schedules_customer(bot, message):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/schedules")
+    response = api.get("/schedules")
 
     if response.status_code == 200:
         schedules = response.json()
@@ -125,7 +149,7 @@ def list_locations(bot, message):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/locations")  # Assuming the locations endpoint is /locations
+    response = api.get("/locations")  # Assuming the locations endpoint is /locations
 
     if response.status_code == 200:
         locations = response.json()
@@ -186,7 +210,13 @@ def add_schedule_days_handler(bot, message, location):
 
     if not schedule_days:
         bot.send_message(message.chat.id, translate("Los días del horario no pueden estar vacíos.", target_lang))
-        add_schedule_days_handler(bot, message, location)
+        bot.register_next_step_handler(message, lambda msg: add_schedule_days_handler(bot, msg, location))
+        return
+
+    error = days_error(schedule_days)
+    if error:
+        bot.send_message(cid, f"{translate('Día no reconocido:', target_lang)} {error}\n{translate('Ingrese los días separados por comas o como un rango, por ejemplo: Lunes, Miércoles o Lunes a Viernes.', target_lang)}")
+        bot.register_next_step_handler(message, lambda msg: add_schedule_days_handler(bot, msg, location))
         return
 
     # Now ask for the start time (time_init)
@@ -217,7 +247,7 @@ def submit_new_schedule(bot, message, location, schedule_days):
         "time_init": time_init
     }
     print(data)
-    response = requests.post(f"{BASE_URL}/schedules", json=data)
+    response = api.post("/schedules", json=data)
 
     bot.send_message(cid, translate("Procesando...", target_lang))
 
@@ -225,7 +255,7 @@ def submit_new_schedule(bot, message, location, schedule_days):
         bot.send_message(message.chat.id, translate("Horario creado con éxito.", target_lang))
         list_schedules(bot, message)  # Optionally, show the updated list of schedules
     else:
-        bot.send_message(message.chat.id, translate("Error al crear el horario.", target_lang))
+        bot.send_message(message.chat.id, f"{translate('Error al crear el horario.', target_lang)} {api_error(response)}".strip())
 
 def submit_new_schedule_end_time(bot, message, location, schedule_days, time_init):
     """
@@ -244,7 +274,7 @@ def submit_new_schedule_end_time(bot, message, location, schedule_days, time_ini
         "time_init": time_init
     }
     print(data)
-    response = requests.post(f"{BASE_URL}/schedules", json=data)
+    response = api.post("/schedules", json=data)
 
     bot.send_message(cid, translate("Procesando...", target_lang))
 
@@ -252,7 +282,7 @@ def submit_new_schedule_end_time(bot, message, location, schedule_days, time_ini
         bot.send_message(message.chat.id, translate("Horario creado con éxito.", target_lang))
         list_schedules(bot, message)  # Optionally, show the updated list of schedules
     else:
-        bot.send_message(message.chat.id, translate("Error al crear el horario.", target_lang))
+        bot.send_message(message.chat.id, f"{translate('Error al crear el horario.', target_lang)} {api_error(response)}".strip())
 
 def list_schedules_for_selection(bot, message, action):
     """
@@ -260,7 +290,7 @@ def list_schedules_for_selection(bot, message, action):
     """
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    response = requests.get(f"{BASE_URL}/schedules")
+    response = api.get("/schedules")
 
     if response.status_code == 200:
         schedules = response.json()
@@ -339,6 +369,13 @@ def handle_days_edit(bot, message, schedule):
     if new_days.lower() == translate("Omitir", target_lang).lower():
         new_days = schedule['days']
 
+    error = days_error(new_days)
+    if error:
+        # Also when skipping: days saved before they were validated may not be accepted any more
+        bot.send_message(cid, f"{translate('Día no reconocido:', target_lang)} {error}\n{translate('Ingrese los días separados por comas o como un rango, por ejemplo: Lunes, Miércoles o Lunes a Viernes.', target_lang)}")
+        bot.register_next_step_handler(message, lambda msg: handle_days_edit(bot, msg, schedule))
+        return
+
     schedule['days'] = new_days
 
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True, resize_keyboard=True)
@@ -364,17 +401,22 @@ def handle_time_edit(bot, message, schedule):
     if new_time.lower() == translate("Omitir", target_lang).lower():
         new_time = schedule['time_init']
 
+    if not is_valid_time_list(new_time):
+        bot.send_message(cid, translate("Formato de hora incorrecto. Por favor, ingrese la hora en el formato HH:MM.", target_lang))
+        bot.register_next_step_handler(message, lambda msg: handle_time_edit(bot, msg, schedule))
+        return
+
     schedule['time_init'] = new_time
 
     # Submit the updated schedule to the backend
-    response = requests.put(f"{BASE_URL}/schedules/{schedule['id']}", json=schedule)
+    response = api.put(f"/schedules/{schedule['id']}", json=schedule)
     bot.send_message(cid, translate("Procesando...", target_lang))
 
     if response.status_code == 200:
         bot.send_message(cid, translate("Horario actualizado con éxito.", target_lang))
         list_schedules(bot, message)  # Optionally, show the updated list of schedules
     else:
-        bot.send_message(cid, translate("Error al ✏️ Actualizar el horario.", target_lang))
+        bot.send_message(cid, f"{translate('Error al ✏️ Actualizar el horario.', target_lang)} {api_error(response)}".strip())
 
 def handle_delete_schedule_selection(bot, message, schedules):
     """
@@ -421,7 +463,7 @@ def execute_delete_schedule(bot, message, schedule_id):
     target_lang = get_language_by_telegram_id(cid)
 
     if message.text == translate("Sí", target_lang):
-        response = requests.delete(f"{BASE_URL}/schedules/{schedule_id}")
+        response = api.delete(f"/schedules/{schedule_id}")
         bot.send_message(cid, translate("Procesando...", target_lang))
         if response.status_code == 200:
             bot.send_message(cid, translate("Horario eliminado con éxito.", target_lang))
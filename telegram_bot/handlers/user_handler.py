@@ -1,9 +1,11 @@
 import os
-import requests
+from utils.api_client import api
+from utils.translation import translate
+from utils.state_store import PROCESS_ID, create_state_store
+from utils.user_context import get_language_by_telegram_id, invalidate_user_context
 import telebot
 from telebot import types
 from dotenv import load_dotenv
-from deep_translator import GoogleTranslator
 import re
 from datetime import datetime
 # Load environment variables
@@ -13,23 +15,6 @@ load_dotenv()
 API_TOKEN = os.getenv("API_TOKEN")
 bot = telebot.TeleBot(API_TOKEN)
 
-# Base API URL
-BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
-
-def translate(text, target_lang='es'):
-    """Translate text to the target language using GoogleTranslator."""
-    if target_lang == 'es':
-        return text
-    return GoogleTranslator(source='auto', target=target_lang).translate(text)
-
-
-def get_language_by_telegram_id(cid):
-    # """Fetch the user's language preference via an API request."""
-    # response = requests.get(f"{BASE_URL}/languages/{cid}")
-    # if response.status_code == 200:
-    #     return response.json().get('language', 'es')
-    return 'es'
-
 # Helper function to validate date format
 def validate_date(date_text):
     try:
@@ -55,7 +40,7 @@ def fetch_user_info(message, bot):
     target_lang = get_language_by_telegram_id(cid)
     user_id = message.text
     try:
-        response = requests.get(f"{BASE_URL}/users/cedula/{user_id}")
+        response = api.get(f"/users/cedula/{user_id}")
         if response.status_code == 200:
             user_data = response.json()
             user_info = "\n".join([f"{key}: {value}" for key, value in user_data.items()])
@@ -65,8 +50,35 @@ def fetch_user_info(message, bot):
     except Exception as e:
         bot.send_message(message.chat.id, translate(f"Ocurrió un error: {str(e)}", target_lang))
 
-# Dictionary to store user data temporarily
-user_data = {}
+# User data collected by the registration flow, per chat; it includes the step the flow is waiting on
+user_data = create_state_store('user')
+
+def wait_for_step(bot, msg, step, callback):
+    """Wait for the user's next message, remembering the step so the flow can be resumed after a restart."""
+    user_data.update(msg.chat.id, step=step, process=PROCESS_ID)
+    bot.register_next_step_handler(msg, callback, bot=bot)
+
+def collected_user_data(cid):
+    """Return the user fields collected so far, without the flow's bookkeeping."""
+    data = user_data.get(cid, {})
+    data.pop("step", None)
+    data.pop("process", None)
+    return data
+
+def resume_user_registration(bot, message):
+    """
+    Continue a registration flow whose next-step handler was lost (e.g. the bot restarted).
+
+    Steps stored by this process are not resumed: their handler is still registered, or the
+    flow ended without one and the message is unrelated to it.
+
+    :return: True if the message was handled as the next step of a stored registration flow.
+    """
+    data = user_data.get(message.chat.id)
+    if not data or data.get("step") not in USER_STEPS or data.get("process") == PROCESS_ID:
+        return False
+    USER_STEPS[data["step"]](message, bot)
+    return True
 
 def create_cancel_markup(target_lang='es'):
     """Create a reply markup with a 'Cancel' button."""
@@ -89,10 +101,10 @@ def create_user(bot, message):
     """Iniciar la creación de usuario solicitando el nombre del usuario."""
     cid = message.chat.id
     target_lang = get_language_by_telegram_id(cid)
-    user_data[cid] = {}
+    user_data.set(cid, {})
     markup = create_cancel_markup(target_lang)
     msg = bot.send_message(cid, translate("Por favor, ingrese su nombre:", target_lang), reply_markup=markup)
-    bot.register_next_step_handler(msg, process_name, bot=bot)
+    wait_for_step(bot, msg, "name", process_name)
 
 def process_name(message, bot):
     """Procesar el nombre del usuario y preguntar por la cancelación."""
@@ -107,12 +119,12 @@ def process_name(message, bot):
     if not message.text.strip():
         markup = create_cancel_markup(target_lang)
         msg = bot.send_message(message.chat.id, translate("El nombre es obligatorio. Por favor, ingrese su nombre:", target_lang), reply_markup=markup)
-        bot.register_next_step_handler(msg, process_name, bot=bot)
+        wait_for_step(bot, msg, "name", process_name)
         return
     
-    user_data[message.chat.id]["name"] = message.text.strip()
+    user_data.update(message.chat.id, name=message.text.strip())
     msg = bot.send_message(message.chat.id, translate("Por favor, ingrese su apellido:", target_lang))
-    bot.register_next_step_handler(msg, process_lastname, bot=bot)
+    wait_for_step(bot, msg, "lastname", process_lastname)
 
 def process_lastname(message, bot):
     """Procesar el apellido del usuario y preguntar por la cancelación."""
@@ -127,12 +139,12 @@ def process_lastname(message, bot):
     if not message.text.strip():
         markup = create_cancel_markup(target_lang)
         msg = bot.send_message(message.chat.id, translate("El apellido es obligatorio. Por favor, ingrese su apellido:", target_lang), reply_markup=markup)
-        bot.register_next_step_handler(msg, process_lastname, bot=bot)
+        wait_for_step(bot, msg, "lastname", process_lastname)
         return
     
-    user_data[message.chat.id]["lastname"] = message.text.strip()
+    user_data.update(message.chat.id, lastname=message.text.strip())
     msg = bot.send_message(message.chat.id, translate("Por favor, ingrese su cédula:", target_lang))
-    bot.register_next_step_handler(msg, process_cedula, bot=bot)
+    wait_for_step(bot, msg, "cedula", process_cedula)
 
 def process_cedula(message, bot):
     """Procesar la cédula del usuario y preguntar por la cancelación."""
@@ -150,13 +162,13 @@ def process_cedula(message, bot):
     if not cedula_input or not cedula_input.isdigit():
         markup = create_cancel_markup(target_lang)
         msg = bot.send_message(message.chat.id, translate("Formato de cédula incorrecto. Por favor, ingrese solo números.", target_lang), reply_markup=markup)
-        bot.register_next_step_handler(msg, process_cedula, bot=bot)
+        wait_for_step(bot, msg, "cedula", process_cedula)
         return
 
     # Store the valid cedula as an integer
-    user_data[message.chat.id]["cedula"] = int(cedula_input)
+    user_data.update(message.chat.id, cedula=int(cedula_input))
     msg = bot.send_message(message.chat.id, translate("Por favor, ingrese su correo electrónico:", target_lang))
-    bot.register_next_step_handler(msg, process_email, bot=bot)
+    wait_for_step(bot, msg, "email", process_email)
 
 def process_email(message, bot):
     """Procesar el correo electrónico del usuario y preguntar por la cancelación."""
@@ -172,12 +184,12 @@ def process_email(message, bot):
     if not validate_email(email_input):
         markup = create_cancel_markup(target_lang)
         msg = bot.send_message(message.chat.id, translate("Correo electrónico inválido. Por favor, ingrese un correo electrónico válido.", target_lang), reply_markup=markup)
-        bot.register_next_step_handler(msg, process_email, bot=bot)
+        wait_for_step(bot, msg, "email", process_email)
         return
     
-    user_data[message.chat.id]["email"] = email_input
+    user_data.update(message.chat.id, email=email_input)
     msg = bot.send_message(message.chat.id, translate("Por favor, ingrese su fecha de nacimiento (DD/MM/AAAA):", target_lang))
-    bot.register_next_step_handler(msg, process_date_of_birth, bot=bot)
+    wait_for_step(bot, msg, "date_of_birth", process_date_of_birth)
 
 def process_date_of_birth(message, bot):
     """Procesar la fecha de nacimiento del usuario y preguntar por la cancelación."""
@@ -199,14 +211,14 @@ def process_date_of_birth(message, bot):
         # If the date is invalid, ask again
         markup = create_cancel_markup(target_lang)
         msg = bot.send_message(message.chat.id, translate("Formato de fecha incorrecto. Por favor, ingrese la fecha en el formato DD/MM/AAAA.", target_lang), reply_markup=markup)
-        bot.register_next_step_handler(msg, process_date_of_birth, bot=bot)
+        wait_for_step(bot, msg, "date_of_birth", process_date_of_birth)
         return
     
     # Save the correctly formatted date to user_data
-    user_data[message.chat.id]["date_of_birth"] = formatted_date
+    user_data.update(message.chat.id, date_of_birth=formatted_date)
     markup = create_cancel_markup(target_lang)
     msg = bot.send_message(message.chat.id, translate("Por favor, ingrese su número de teléfono:", target_lang), reply_markup=markup)
-    bot.register_next_step_handler(msg, process_phone, bot=bot)
+    wait_for_step(bot, msg, "phone", process_phone)
 
 def process_phone(message, bot):
     """Procesar el número de teléfono del usuario y preguntar por la cancelación."""
@@ -224,11 +236,11 @@ def process_phone(message, bot):
     if not phone_input or not phone_input.isdigit():
         markup = create_cancel_markup(target_lang)
         msg = bot.send_message(message.chat.id, translate("Número de teléfono inválido. Por favor, ingrese solo números.", target_lang), reply_markup=markup)
-        bot.register_next_step_handler(msg, process_phone, bot=bot)
+        wait_for_step(bot, msg, "phone", process_phone)
         return
 
     # Store the valid phone number as an integer
-    user_data[message.chat.id]["phone"] = int(phone_input)
+    user_data.update(message.chat.id, phone=int(phone_input))
 
     # Create markup with a 'Skip' button for the next step
     markup = types.ReplyKeyboardMarkup(one_time_keyboard=True)
@@ -236,7 +248,7 @@ def process_phone(message, bot):
     markup.row(item1)
     markup.row(types.KeyboardButton(translate("Cancelar", target_lang)))
     msg = bot.send_message(message.chat.id, translate("Por favor, ingrese su handle de Instagram (o 'Omitir'):", target_lang), parse_mode='Markdown', reply_markup=markup)         
-    bot.register_next_step_handler(msg, process_instagram, bot=bot)
+    wait_for_step(bot, msg, "instagram", process_instagram)
 
 def process_instagram(message, bot):
     """Procesar el handle de Instagram del usuario y preguntar por la cancelación."""
@@ -248,12 +260,14 @@ def process_instagram(message, bot):
         return
 
     """Procesar el handle de Instagram y luego confirmar los detalles del usuario antes de la creación."""
-    user_data[message.chat.id]["instagram"] = message.text if message.text.lower() != translate("Omitir", target_lang).lower() else None
-
     # Set default values for type, status, and telegram_id
-    user_data[message.chat.id]["type"] = "cliente"
-    user_data[message.chat.id]["estatus"] = "activo"
-    user_data[message.chat.id]["telegram_id"] = message.chat.id
+    user_data.update(
+        message.chat.id,
+        instagram=message.text if message.text.lower() != translate("Omitir", target_lang).lower() else None,
+        type="cliente",
+        estatus="activo",
+        telegram_id=message.chat.id
+    )
 
     # Titles dictionary to map data keys to personalized titles
     titles = {
@@ -271,7 +285,7 @@ def process_instagram(message, bot):
 
     # Display collected data for confirmation with personalized titles, limited to 7 fields
     user_info = "\n".join([f"{titles.get(key, key)}: {value}" 
-                        for key, value in list(user_data[message.chat.id].items())[:7] if value])
+                        for key, value in list(collected_user_data(message.chat.id).items())[:7] if value])
     confirmation_text = translate("Por favor, confirme sus datos:", target_lang) + "\n" + user_info
 
     # Show confirmation options with Yes, No, and Cancel buttons
@@ -283,7 +297,7 @@ def process_instagram(message, bot):
     markup.row(item2)
     markup.row(item3)
     msg = bot.send_message(message.chat.id, confirmation_text, reply_markup=markup)
-    bot.register_next_step_handler(msg, lambda msg: confirmation_handler(msg, bot))
+    wait_for_step(bot, msg, "confirm", confirmation_handler)
 
 def confirmation_handler(message, bot):
     """Handle the user's confirmation choice."""
@@ -300,18 +314,25 @@ def confirmation_handler(message, bot):
     markup_remove = types.ReplyKeyboardRemove()
 
     if user_input == yes_option:
+        data = collected_user_data(cid)
+        if "cedula" not in data:
+            cancel_process(bot, message)
+            return
+
         # Validate if the user already exists
-        cedula = user_data[cid]["cedula"]
-        validation_response = requests.get(f"{BASE_URL}/users/cedula/{cedula}")
-        email = user_data[cid]["email"]
-        validation_response_email = requests.get(f"{BASE_URL}/users/email/{email}")
-        telegram_id = user_data[cid]["telegram_id"]
-        validation_response_telegram = requests.get(f"{BASE_URL}/users/telegram/{telegram_id}")
+        cedula = data["cedula"]
+        validation_response = api.get(f"/users/cedula/{cedula}")
+        email = data["email"]
+        validation_response_email = api.get(f"/users/email/{email}")
+        telegram_id = data["telegram_id"]
+        validation_response_telegram = api.get(f"/users/telegram/{telegram_id}")
         
         if validation_response.status_code == 200 or validation_response_email.status_code == 200 or validation_response_telegram.status_code == 200:
             # User already exists, proceed with update
             bot.send_message(cid, translate("El usuario ya existe. Actualizando información...", target_lang), reply_markup=markup_remove)
-            update_response = requests.put(f"{BASE_URL}/users/telegram/{cid}", json=user_data[cid])
+            update_response = api.put(f"/users/telegram/{cid}", json=data)
+            invalidate_user_context(cid)
+            user_data.pop(cid, None)
             if update_response.status_code == 200:
                 bot.send_message(cid, translate("Información del usuario actualizada con éxito.", target_lang), reply_markup=markup_remove)
             else:
@@ -321,11 +342,14 @@ def confirmation_handler(message, bot):
         elif validation_response.status_code != 404:
             # Handle unexpected errors from the server
             bot.send_message(cid, translate("Error al verificar el usuario. Por favor, inténtelo de nuevo más tarde.", target_lang), reply_markup=markup_remove)
+            user_data.pop(cid, None)
             return
         
         # Proceed with user creation if the user does not exist
         bot.send_message(cid, translate("Procesando...", target_lang), reply_markup=markup_remove)
-        response = requests.post(f"{BASE_URL}/users", json=user_data[cid])
+        response = api.post("/users", json=data)
+        invalidate_user_context(cid)
+        user_data.pop(cid, None)
         if response.status_code != 201:
             bot.send_message(cid, f"{translate('Error al crear el usuario.', target_lang)} Error: {response.status_code}", reply_markup=markup_remove)
             return
@@ -351,7 +375,7 @@ def process_payment(bot, message):
     target_lang = get_language_by_telegram_id(cid)
     payment_payload = payment_data.get(cid)
 
-    response = requests.post(f"{BASE_URL}/payments", json=payment_payload)
+    response = api.post("/payments", json=payment_payload)
     
     if response.status_code == 201:
         bot.send_message(cid, translate("Pago realizado con éxito.", target_lang), reply_markup=markup_remove)
@@ -361,3 +385,14 @@ def process_payment(bot, message):
     # Clear stored data
     payment_data.pop(cid, None)
 
+# Steps of the registration flow that can be resumed from the stored state
+USER_STEPS = {
+    "name": process_name,
+    "lastname": process_lastname,
+    "cedula": process_cedula,
+    "email": process_email,
+    "date_of_birth": process_date_of_birth,
+    "phone": process_phone,
+    "instagram": process_instagram,
+    "confirm": confirmation_handler,
+}
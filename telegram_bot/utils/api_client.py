@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Base API URL
+BASE_URL = os.getenv("API_BASE_URL", "http://web:5000")
+
+# Connection settings, overridable from the environment
+CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 3))   # seconds to open a connection
+READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", 20))        # seconds to wait for a response
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", 3))
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", 10))                # keep-alive connections to the API
+HTTP_CACHE_SIZE = int(os.getenv("API_HTTP_CACHE_SIZE", 256))    # GET responses kept for revalidation; 0 disables
+
+class ApiClient:
+    """
+    HTTP client for the Rhino API shared by every bot handler.
+
+    All calls go through one pooled `requests.Session`, so connections to the API are kept alive
+    and reused. Every call has a connect/read timeout, and idempotent calls (GET, PUT, DELETE) are
+    retried with exponential backoff on connection errors and 502/503/504 responses. A request
+    that still fails returns a synthetic 503 response instead of raising, so the handlers'
+    existing `status_code` checks report the error to the user. Latency is recorded per endpoint.
+
+    GET responses that carry an ETag are cached and revalidated with If-None-Match, so unchanged
+    reference data (plans, locations...) costs a 304 round trip instead of a full response.
+    """
+
+    def __init__(self, base_url=BASE_URL, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES, pool_size=POOL_SIZE,
+                 cache_size=HTTP_CACHE_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD', 'PUT', 'DELETE']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def request(self, method, path, **kwargs):
+        """
+        Send a request to the API.
+
+        :param method: HTTP method.
+        :param path: Path relative to the API base URL, e.g. "/users/telegram/123".
+        :param kwargs: Extra arguments for `requests.Session.request` (json, params, stream, timeout...).
+        :return: The `requests.Response`; a 503 response when the API could not be reached.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = f"{method} {_endpoint_name(path)}"
+        cache_key = self._cache_key(method, path, kwargs)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **{'If-None-Match': cached.headers['ETag']})
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException as e:
+            self._record(endpoint, time.perf_counter() - start, failed=True)
+            print(f"API request failed: {endpoint}: {e}")
+            return _error_response(e)
+        self._record(endpoint, time.perf_counter() - start, failed=response.status_code >= 500,
+                     revalidated=response.status_code == 304 and cached is not None)
+        if cached is not None and response.status_code == 304:
+            return cached
+        if cache_key is not None and response.status_code == 200 and response.headers.get('ETag'):
+            self._store(cache_key, response)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def metrics(self):
+        """
+        Return the latency metrics collected so far.
+
+        :return: A dictionary keyed by "<METHOD> <endpoint>" with count, errors, not_modified (GETs
+                 answered from the cache after a 304), avg_ms and max_ms.
+        """
+        with self._metrics_lock:
+            return {
+                endpoint: {
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'not_modified': stats['not_modified'],
+                    'avg_ms': round(stats['total'] / stats['count'] * 1000, 1),
+                    'max_ms': round(stats['max'] * 1000, 1)
+                }
+                for endpoint, stats in self._metrics.items()
+            }
+
+    def _cache_key(self, method, path, kwargs):
+        """Key of a cacheable request, or None: only plain GETs are cached."""
+        if not self.cache_size or method != 'GET' or kwargs.get('stream'):
+            return None
+        params = kwargs.get('params')
+        return (path, tuple(sorted(params.items())) if isinstance(params, dict) else params)
+
+    def _cached(self, key):
+        if key is None:
+            return None
+        with self._cache_lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+            return response
+
+    def _store(self, key, response):
+        response.content  # read the body now, so the cached response can be served any number of times
+        with self._cache_lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _record(self, endpoint, elapsed, failed, revalidated=False):
+        with self._metrics_lock:
+            stats = self._metrics.setdefault(endpoint, {'count': 0, 'errors': 0, 'not_modified': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['errors'] += int(failed)
+            stats['not_modified'] += int(revalidated)
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+
+def _endpoint_name(path):
+    """Group paths by route, e.g. "/users/telegram/123" -> "/users/telegram/{id}"."""
+    path = path.split('?', 1)[0]
+    path = re.sub(r'/[^/]+@[^/]+', '/{email}', path)
+    return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+def _error_response(error):
+    """Build the 503 response returned when the API cannot be reached."""
+    response = requests.Response()
+    response.status_code = 503
+    response.reason = 'Service Unavailable'
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps({'error': str(error)}).encode('utf-8')
+    return response
+
+# Client shared by all handlers
+api = ApiClient()
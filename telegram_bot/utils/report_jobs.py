@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from utils.reports import NoData, NotModified, download_to_file, export_to_xlsx, temporary_report
+from utils.state_store import create_state_store
+from utils.translation import translate
+
+# Load environment variables
+load_dotenv()
+
+# Report job settings
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))                         # reports built at the same time
+ARTIFACT_TTL = int(os.getenv("REPORT_ARTIFACT_TTL", 7 * 24 * 3600))          # seconds a sent report is reused
+PROGRESS_INTERVAL = float(os.getenv("REPORT_PROGRESS_INTERVAL", 2))          # seconds between progress edits
+
+class Report:
+    """
+    One type of report: how to build its file and how to name it.
+
+    `build(params, file_path, etag, progress)` writes the file and returns its ETag, raising
+    NotModified when `etag` is still current; `progress_text(n)` describes the progress
+    reported by `build`.
+    """
+
+    def __init__(self, title, file_name, build, progress_text):
+        self.title = title
+        self.file_name = file_name
+        self.build = build
+        self.progress_text = progress_text
+
+def _list_export(path, sheet_title):
+    return lambda params, file_path, etag, progress: export_to_xlsx(path, file_path, sheet_title, etag=etag, progress=progress)
+
+def _payments_export(params, file_path, etag, progress):
+    return download_to_file(f"/payments/{params['year']}/{params['month']}/export", file_path, {'format': 'xlsx'}, etag, progress)
+
+REPORTS = {
+    'users': Report('Generando reporte de clientes...', 'user_report.xlsx',
+                    _list_export("/users", 'Clientes'), lambda count: f"{count} filas"),
+    'coaches': Report('Generando reporte de Coachs...', 'coaches_report.xlsx',
+                      _list_export("/coaches", 'Coachs'), lambda count: f"{count} filas"),
+    'payments': Report('Generando reporte de Pagos...', 'payments_report_{year}_{month:02d}.xlsx',
+                       _payments_export, lambda size: f"{size // 1024} KB"),
+}
+
+class ReportJobQueue:
+    """
+    Builds reports on a pool of worker threads, so the Telegram handlers return at once.
+
+    Each request posts a progress message to the chat, edited while the report is built and
+    removed when the file is sent. Requests for a report that is already being built join
+    that job instead of starting another.
+
+    Sent reports are cached as the Telegram file_id of the document together with the ETag
+    (the data version) of the data they were built from, keyed by report type and parameters.
+    A repeat request sends that ETag as If-None-Match: if the API answers 304 the data did not
+    change and the cached file is resent without being rebuilt. The cache lives in the bot
+    state store (BOT_STATE_URL), so bot replicas share it.
+    """
+
+    def __init__(self, bot, workers=REPORT_WORKERS, artifacts=None):
+        self.bot = bot
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        self._artifacts = artifacts or create_state_store('report_artifacts', ttl=ARTIFACT_TTL)
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stats = {'requested': 0, 'joined': 0, 'built': 0, 'cached': 0, 'failed': 0}
+
+    def submit(self, cid, report, target_lang='es', **params):
+        """
+        Queue a report for a chat.
+
+        :param report: Name of a report in REPORTS.
+        :param params: Parameters of the report (e.g. year and month), part of its cache key.
+        """
+        spec = REPORTS[report]
+        key = f"{report}:{json.dumps(params, sort_keys=True)}"
+        message = self.bot.send_message(cid, f"⏳ {translate(spec.title, target_lang)}")
+        waiter = (cid, message.message_id, target_lang)
+        with self._lock:
+            self._stats['requested'] += 1
+            if key in self._running:
+                self._running[key].append(waiter)
+                self._stats['joined'] += 1
+                return
+            self._running[key] = [waiter]
+        self._executor.submit(self._run, key, spec, params)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, running=len(self._running))
+
+    def _run(self, key, spec, params):
+        file_name = spec.file_name.format(**params)
+        cached = self._artifacts.get(key)
+        last_progress = [time.monotonic()]
+
+        def progress(done):
+            if time.monotonic() - last_progress[0] < PROGRESS_INTERVAL:
+                return
+            last_progress[0] = time.monotonic()
+            self._edit_progress(key, spec, spec.progress_text(done))
+
+        try:
+            with temporary_report(suffix=os.path.splitext(file_name)[1]) as file_path:
+                try:
+                    etag = spec.build(params, file_path, cached['etag'] if cached else None, progress)
+                except NotModified:
+                    if not self._deliver(key, file_name, file_id=cached['file_id']):
+                        # The file_id could not be resent: rebuild the report on the next request
+                        self._artifacts.pop(key)
+                    self._count('cached')
+                    return
+                file_id = self._deliver(key, file_name, file_path=file_path)
+                if file_id and etag:
+                    self._artifacts.set(key, {'etag': etag, 'file_id': file_id})
+                self._count('built')
+        except NoData:
+            self._count('failed')
+            self._notify(key, "No se encontraron pagos para el período seleccionado.")
+        except Exception as e:
+            print(f"Report {key} failed: {e}")
+            self._count('failed')
+            self._notify(key, "Error al generar el reporte. Inténtalo nuevamente más tarde.")
+
+    def _take_waiters(self, key):
+        with self._lock:
+            return self._running.pop(key, [])
+
+    def _deliver(self, key, file_name, file_path=None, file_id=None):
+        """
+        Send the report to every chat waiting for it: uploaded once from `file_path`, then by file_id.
+
+        :return: The file_id of the sent document, or None if no chat received it.
+        """
+        delivered = None
+        for cid, message_id, target_lang in self._take_waiters(key):
+            self._remove_progress(cid, message_id)
+            try:
+                if file_id:
+                    self.bot.send_document(cid, file_id)
+                else:
+                    with open(file_path, 'rb') as file:
+                        file_id = self.bot.send_document(cid, file, visible_file_name=file_name).document.file_id
+                delivered = file_id
+            except Exception as e:
+                print(f"Could not send report {key} to {cid}: {e}")
+                self.bot.send_message(cid, translate("Error al generar el reporte. Inténtalo nuevamente más tarde.", target_lang))
+        return delivered
+
+    def _notify(self, key, text):
+        for cid, message_id, target_lang in self._take_waiters(key):
+            self._remove_progress(cid, message_id)
+            self.bot.send_message(cid, translate(text, target_lang))
+
+    def _edit_progress(self, key, spec, detail):
+        with self._lock:
+            waiters = list(self._running.get(key, []))
+        for cid, message_id, target_lang in waiters:
+            try:
+                self.bot.edit_message_text(f"⏳ {translate(spec.title, target_lang)} {detail}", cid, message_id)
+            except Exception as e:
+                print(f"Could not update the report progress: {e}")
+
+    def _remove_progress(self, cid, message_id):
+        try:
+            self.bot.delete_message(cid, message_id)
+        except Exception as e:
+            print(f"Could not remove the report progress message: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
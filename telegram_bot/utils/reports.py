@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+import requests
+from openpyxl import Workbook
+from utils.api_client import api, CONNECT_TIMEOUT
+
+NDJSON = 'application/x-ndjson'
+# Seconds to wait for report data; exports of whole tables take longer than regular calls
+REPORT_READ_TIMEOUT = float(os.getenv("REPORT_READ_TIMEOUT", 300))
+
+class NotModified(Exception):
+    """Raised when the API answers 304: the data did not change since the ETag sent."""
+
+class NoData(Exception):
+    """Raised when the API answers 404: there is nothing to report."""
+
+@contextmanager
+def _stream(path, params=None, etag=None, accept=None):
+    headers = {}
+    if accept:
+        headers['Accept'] = accept
+    if etag:
+        headers['If-None-Match'] = etag
+    with api.get(path, params=params, headers=headers, stream=True, timeout=(CONNECT_TIMEOUT, REPORT_READ_TIMEOUT)) as response:
+        if response.status_code == 304:
+            raise NotModified(etag)
+        if response.status_code == 404:
+            raise NoData(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path} failed with status {response.status_code}")
+        yield response
+
+def _records(response, path):
+    try:
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+    except requests.RequestException as e:
+        raise RuntimeError(f"GET {path} was interrupted: {e}") from e
+
+def iter_records(path, params=None):
+    """
+    Yield the records of an API list endpoint one at a time, streamed as newline-delimited JSON.
+
+    The response is read line by line as it arrives, so memory does not grow with the table.
+
+    :raises RuntimeError: If the API answers with an error or the stream is cut.
+    """
+    with _stream(path, params, accept=NDJSON) as response:
+        yield from _records(response, path)
+
+@contextmanager
+def temporary_report(suffix='.xlsx'):
+    """
+    Yield the path of a private temporary file for a report, removed on exit.
+
+    Reports are sent to the chat as soon as they are written, so nothing is kept on the bot's
+    disk and concurrent requests (or several bot replicas) never share a file.
+    """
+    fd, file_path = tempfile.mkstemp(prefix='report_', suffix=suffix)
+    os.close(fd)
+    try:
+        yield file_path
+    finally:
+        os.remove(file_path)
+
+def export_to_xlsx(path, file_path, sheet_title='Reporte', params=None, etag=None, progress=None):
+    """
+    Write every record of an API list endpoint to an XLSX file, one row per record.
+
+    Uses openpyxl's write-only mode, which flushes each row to disk as it is appended. The
+    columns are the fields of the first record.
+
+    :param etag: ETag of an earlier export of the same data, sent as If-None-Match.
+    :param progress: Optional callable receiving the number of records written so far.
+    :return: The ETag (data version) of the exported data, or None if the API sent none.
+    :raises NotModified: If the data did not change since `etag`.
+    :raises RuntimeError: If the API answers with an error.
+    """
+    with _stream(path, params, etag, accept=NDJSON) as response:
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(title=sheet_title)
+        header = None
+        count = 0
+        for record in _records(response, path):
+            if header is None:
+                header = list(record)
+                worksheet.append(header)
+            worksheet.append([record.get(column) for column in header])
+            count += 1
+            if progress and count % 500 == 0:
+                progress(count)
+        workbook.save(file_path)
+        return response.headers.get('ETag')
+
+def download_to_file(path, file_path, params=None, etag=None, progress=None):
+    """
+    Save a file built by the API (e.g. an XLSX export) in chunks.
+
+    :param progress: Optional callable receiving the number of bytes saved so far.
+    :return: The ETag of the file, or None.
+    :raises NotModified: If the file did not change since `etag`.
+    :raises NoData: If the API has nothing to export.
+    :raises RuntimeError: If the API answers with an error or the download is cut.
+    """
+    with _stream(path, params, etag) as response:
+        size = 0
+        try:
+            with open(file_path, 'wb') as file:
+                for chunk in response.iter_content(64 * 1024):
+                    file.write(chunk)
+                    size += len(chunk)
+                    if progress:
+                        progress(size)
+        except requests.RequestException as e:
+            raise RuntimeError(f"GET {path} was interrupted: {e}") from e
+        return response.headers.get('ETag')
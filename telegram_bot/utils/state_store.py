@@ -0,0 +1,156 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Conversation state settings
+STATE_URL = os.getenv("BOT_STATE_URL")                       # e.g. sqlite:///bot_state.db or redis://redis:6379/1; in memory if unset
+STATE_TTL = int(os.getenv("BOT_STATE_TTL", 3600))            # seconds an abandoned flow is kept
+STATE_MAX_ENTRIES = int(os.getenv("BOT_STATE_MAX_ENTRIES", 10000))
+
+# Identifies this bot process in the stored state of a flow: a step stored by this same process
+# still has its next-step handler, so only steps stored by another process need resuming
+PROCESS_ID = uuid.uuid4().hex
+
+class MemoryStateStore:
+    """
+    In-process store of the data collected by a multi-step flow, keyed by chat ID.
+
+    Entries expire `ttl` seconds after their last change and the least recently used ones are
+    evicted beyond `max_entries`, so abandoned flows do not accumulate. Values must be JSON
+    serializable so every backend behaves the same.
+    """
+
+    def __init__(self, namespace, ttl=STATE_TTL, max_entries=STATE_MAX_ENTRIES):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cid, default=None):
+        """Return a copy of the chat's state, or `default` if there is none."""
+        with self._lock:
+            entry = self._entries.get(cid)
+            if entry is None:
+                return default
+            expires_at, values = entry
+            if expires_at < time.monotonic():
+                del self._entries[cid]
+                return default
+            self._entries.move_to_end(cid)
+            return json.loads(values)
+
+    def set(self, cid, values):
+        """Replace the chat's state."""
+        with self._lock:
+            self._entries[cid] = (time.monotonic() + self.ttl, json.dumps(values))
+            self._entries.move_to_end(cid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def update(self, cid, **values):
+        """Merge `values` into the chat's state (creating it if needed) and return the new state."""
+        state = self.get(cid, {})
+        state.update(values)
+        self.set(cid, state)
+        return state
+
+    def pop(self, cid, default=None):
+        """Remove the chat's state and return it."""
+        state = self.get(cid, default)
+        with self._lock:
+            self._entries.pop(cid, None)
+        return state
+
+    def __contains__(self, cid):
+        return self.get(cid) is not None
+
+class SQLiteStateStore(MemoryStateStore):
+    """
+    State store kept in a SQLite file, so flows survive restarts and can be shared by several
+    bot processes on the same host.
+    """
+
+    def __init__(self, namespace, path, ttl=STATE_TTL):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_state ("
+            "namespace TEXT NOT NULL, cid INTEGER NOT NULL, data TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, cid))"
+        )
+        self._db.commit()
+
+    def get(self, cid, default=None):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM conversation_state WHERE namespace = ? AND cid = ? AND expires_at >= ?",
+                (self.namespace, cid, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, cid, values):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversation_state VALUES (?, ?, ?, ?)",
+                (self.namespace, cid, json.dumps(values), time.time() + self.ttl)
+            )
+            # Expired flows are purged as new state is written
+            self._db.execute("DELETE FROM conversation_state WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def pop(self, cid, default=None):
+        state = self.get(cid, default)
+        with self._lock:
+            self._db.execute("DELETE FROM conversation_state WHERE namespace = ? AND cid = ?", (self.namespace, cid))
+            self._db.commit()
+        return state
+
+class RedisStateStore(MemoryStateStore):
+    """State store kept in Redis, shared by bot processes on any host; Redis expires the keys."""
+
+    def __init__(self, namespace, url, ttl=STATE_TTL):
+        import redis
+        self.namespace = namespace
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, cid):
+        return f"state:{self.namespace}:{cid}"
+
+    def get(self, cid, default=None):
+        data = self._redis.get(self._key(cid))
+        return json.loads(data) if data else default
+
+    def set(self, cid, values):
+        self._redis.set(self._key(cid), json.dumps(values), ex=self.ttl)
+
+    def pop(self, cid, default=None):
+        state = self.get(cid, default)
+        self._redis.delete(self._key(cid))
+        return state
+
+def create_state_store(namespace, url=STATE_URL, ttl=STATE_TTL):
+    """
+    Return the state store of one flow (e.g. 'payment'), using the backend configured in BOT_STATE_URL.
+
+    :param namespace: Name of the flow; flows sharing a backend never see each other's state.
+    :param url: None for memory, `sqlite:///path` or `redis://...`.
+    :param ttl: Seconds an entry is kept after its last change.
+    """
+    if url and url.startswith('sqlite:///'):
+        return SQLiteStateStore(namespace, url[len('sqlite:///'):], ttl=ttl)
+    if url and url.startswith('redis://'):
+        return RedisStateStore(namespace, url, ttl=ttl)
+    return MemoryStateStore(namespace, ttl=ttl)
@@ -0,0 +1,127 @@
+import gettext
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from deep_translator import GoogleTranslator
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Language the bot's strings are written in
+SOURCE_LANGUAGE = 'es'
+
+# gettext catalogs built by build_translations.py: locale/<lang>/LC_MESSAGES/messages.mo
+LOCALE_DIR = os.getenv("TRANSLATION_LOCALE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'locale'))
+DOMAIN = 'messages'
+
+# Cache for strings missing from the catalogs (dynamic text, new strings)
+CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 4096))
+CACHE_URL = os.getenv("TRANSLATION_CACHE_URL")  # e.g. sqlite:///translations.db or redis://redis:6379/0
+
+class TranslationCache:
+    """
+    Cache of machine translations keyed by (text, language).
+
+    Lookups hit an in-process LRU first and then, when `url` is configured, a persistent
+    store shared across restarts: a SQLite file (`sqlite:///path`) or Redis (`redis://...`).
+    """
+
+    def __init__(self, max_size=CACHE_SIZE, url=CACHE_URL):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._sqlite = None
+        self._redis = None
+        if url and url.startswith('sqlite:///'):
+            self._sqlite = sqlite3.connect(url[len('sqlite:///'):], check_same_thread=False)
+            self._sqlite.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "text TEXT NOT NULL, lang TEXT NOT NULL, translated TEXT NOT NULL, PRIMARY KEY (text, lang))"
+            )
+            self._sqlite.commit()
+        elif url and url.startswith('redis://'):
+            import redis
+            self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, text, lang):
+        key = (text, lang)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        translated = self._load(text, lang)
+        if translated is not None:
+            self._remember(key, translated)
+        return translated
+
+    def set(self, text, lang, translated):
+        self._remember((text, lang), translated)
+        try:
+            if self._sqlite is not None:
+                with self._lock:
+                    self._sqlite.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?)", (text, lang, translated))
+                    self._sqlite.commit()
+            elif self._redis is not None:
+                self._redis.hset(f"translation:{lang}", text, translated)
+        except Exception as e:
+            print(f"Error storing translation: {e}")
+
+    def _load(self, text, lang):
+        try:
+            if self._sqlite is not None:
+                with self._lock:
+                    row = self._sqlite.execute(
+                        "SELECT translated FROM translations WHERE text = ? AND lang = ?", (text, lang)
+                    ).fetchone()
+                return row[0] if row else None
+            if self._redis is not None:
+                return self._redis.hget(f"translation:{lang}", text)
+        except Exception as e:
+            print(f"Error reading translation cache: {e}")
+        return None
+
+    def _remember(self, key, translated):
+        with self._lock:
+            self._entries[key] = translated
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+_cache = TranslationCache()
+_catalogs = {}
+
+def _catalog(lang):
+    """Return the compiled gettext catalog for `lang` (a no-op catalog if none was built)."""
+    if lang not in _catalogs:
+        _catalogs[lang] = gettext.translation(DOMAIN, LOCALE_DIR, languages=[lang], fallback=True)
+    return _catalogs[lang]
+
+def translate(text, target_lang='es'):
+    """
+    Translate text to the target language.
+
+    Static UI strings come from the precompiled gettext catalogs, so rendering a menu makes no
+    network calls. Anything else is translated with GoogleTranslator once and then served from
+    the cache. If the translation service fails the original text is returned.
+    """
+    if target_lang == SOURCE_LANGUAGE or not text:
+        return text
+
+    translated = _catalog(target_lang).gettext(text)
+    if translated != text:
+        return translated
+
+    translated = _cache.get(text, target_lang)
+    if translated is not None:
+        return translated
+
+    try:
+        translated = GoogleTranslator(source='auto', target=target_lang).translate(text)
+    except Exception as e:
+        print(f"Error translating text: {e}")
+        return text
+    if translated:
+        _cache.set(text, target_lang, translated)
+    return translated or text
@@ -0,0 +1,101 @@
+import os
+import queue
+import threading
+import time
+
+# Worker pool settings, overridable from the environment
+WORKERS = int(os.getenv("BOT_WORKERS", 8))               # updates handled concurrently
+QUEUE_SIZE = int(os.getenv("BOT_QUEUE_SIZE", 100))        # pending updates per worker
+SUBMIT_TIMEOUT = float(os.getenv("BOT_SUBMIT_TIMEOUT", 5)) # seconds to wait for room in a full queue
+
+def update_chat_id(update):
+    """
+    Return the chat an update belongs to, or None when it has no chat.
+
+    :param update: A telebot.types.Update.
+    """
+    for message in (update.message, update.edited_message, update.channel_post, update.edited_channel_post):
+        if message is not None:
+            return message.chat.id
+    if update.callback_query is not None:
+        if update.callback_query.message is not None:
+            return update.callback_query.message.chat.id
+        return update.callback_query.from_user.id
+    for event in (update.inline_query, update.chosen_inline_result, update.shipping_query, update.pre_checkout_query):
+        if event is not None:
+            return event.from_user.id
+    return None
+
+class UpdateDispatcher:
+    """
+    Bounded pool of worker threads that runs the bot's handlers for incoming updates.
+
+    Each worker owns a bounded queue and every chat is always routed to the same worker, so the
+    updates of one chat are handled one at a time and in arrival order (next-step handlers keep
+    working), while different chats are handled concurrently. A slow report for one member only
+    delays the chats that share its worker. When a queue stays full `submit` returns False, so
+    the webhook can answer with an error and Telegram delivers the update again later.
+    """
+
+    def __init__(self, bot, workers=WORKERS, queue_size=QUEUE_SIZE):
+        self.bot = bot
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.threads = []
+        self.stats = {'submitted': 0, 'processed': 0, 'rejected': 0, 'failed': 0}
+        self.lock = threading.Lock()
+
+    def start(self):
+        for index, updates in enumerate(self.queues):
+            thread = threading.Thread(target=self._work, args=(updates,), name=f"bot-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=30):
+        """Let the workers finish their pending updates, then stop them."""
+        for updates in self.queues:
+            updates.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self.threads = []
+
+    def submit(self, update, timeout=SUBMIT_TIMEOUT):
+        """
+        Queue an update on the worker of its chat.
+
+        :param update: A telebot.types.Update.
+        :param timeout: Seconds to wait when the worker's queue is full.
+        :return: True if the update was queued, False if the queue stayed full.
+        """
+        chat_id = update_chat_id(update)
+        key = chat_id if chat_id is not None else update.update_id
+        try:
+            self.queues[hash(key) % len(self.queues)].put(update, timeout=timeout)
+        except queue.Full:
+            self._count('rejected')
+            return False
+        self._count('submitted')
+        return True
+
+    def pending(self):
+        return sum(updates.qsize() for updates in self.queues)
+
+    def metrics(self):
+        with self.lock:
+            return dict(self.stats, pending=self.pending(), workers=len(self.queues))
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _work(self, updates):
+        while True:
+            update = updates.get()
+            if update is None:
+                break
+            try:
+                self.bot.process_new_updates([update])
+                self._count('processed')
+            except Exception as e:
+                self._count('failed')
+                print(f"Error processing update {update.update_id}: {e}")
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.api_client import api
+
+# Seconds a cached user/language stays valid; explicit invalidation refreshes it sooner
+USER_CONTEXT_TTL = int(os.getenv("USER_CONTEXT_TTL", 300))
+USER_CONTEXT_MAX_ENTRIES = int(os.getenv("USER_CONTEXT_MAX_ENTRIES", 10000))
+
+DEFAULT_LANGUAGE = 'es'
+
+class UserContextCache:
+    """
+    Per-chat cache of the registered user and their language preference.
+
+    Entries expire after `ttl` seconds and are evicted least-recently-used beyond `max_entries`.
+    Only definitive answers (found / not found) are cached; API errors are not, so the next
+    interaction retries the lookup.
+    """
+
+    def __init__(self, ttl=USER_CONTEXT_TTL, max_entries=USER_CONTEXT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_user(self, cid):
+        """
+        Return the user registered with this Telegram chat ID.
+
+        :return: A tuple (status_code, user); user is None unless status_code is 200.
+        """
+        cached = self._get(cid, 'user')
+        if cached is not None:
+            return cached
+
+        response = api.get(f"/users/telegram/{cid}")
+        if response.status_code == 200:
+            result = (200, response.json())
+        else:
+            result = (response.status_code, None)
+        if response.status_code in (200, 404):
+            self._set(cid, 'user', result)
+        return result
+
+    def get_language(self, cid):
+        """Return the language code chosen by the user, 'es' by default."""
+        cached = self._get(cid, 'language')
+        if cached is not None:
+            return cached
+
+        response = api.get(f"/languages/{cid}")
+        if response.status_code == 200:
+            language = response.json().get('Language') or DEFAULT_LANGUAGE
+        elif response.status_code == 404:
+            language = DEFAULT_LANGUAGE
+        else:
+            return DEFAULT_LANGUAGE
+        self._set(cid, 'language', language)
+        return language
+
+    def invalidate(self, cid):
+        """Forget everything cached for this chat, e.g. after the user edits their profile or language."""
+        with self._lock:
+            self._entries.pop(cid, None)
+
+    def _get(self, cid, key):
+        with self._lock:
+            entry = self._entries.get(cid)
+            if not entry or key not in entry:
+                return None
+            value, expires_at = entry[key]
+            if expires_at < time.monotonic():
+                del entry[key]
+                return None
+            self._entries.move_to_end(cid)
+            return value
+
+    def _set(self, cid, key, value):
+        with self._lock:
+            self._entries.setdefault(cid, {})[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(cid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Cache shared by all handlers
+user_context = UserContextCache()
+
+def get_user(cid):
+    """Return (status_code, user) for the Telegram chat ID, cached."""
+    return user_context.get_user(cid)
+
+def get_language_by_telegram_id(cid):
+    """Return the user's language preference, cached."""
+    return user_context.get_language(cid)
+
+def invalidate_user_context(cid):
+    """Drop the cached user and language of a chat."""
+    user_context.invalidate(cid)
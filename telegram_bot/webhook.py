@@ -0,0 +1,69 @@
+import hmac
+import os
+from flask import Flask, request, jsonify
+from telebot.types import Update
+from werkzeug.serving import make_server
+from utils.update_dispatcher import UpdateDispatcher
+
+# Webhook settings
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")                            # public HTTPS base URL, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")                 # sent back by Telegram in X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40))
+
+def create_webhook_app(dispatcher, secret=WEBHOOK_SECRET, path=WEBHOOK_PATH):
+    """
+    Build the small Flask app that receives Telegram updates.
+
+    The endpoint only validates and queues the update, so Telegram gets its answer right away
+    and the handlers run on the dispatcher's workers.
+    """
+    app = Flask(__name__)
+
+    @app.route(path, methods=['POST'])
+    def receive_update():
+        if secret and not hmac.compare_digest(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), secret):
+            return jsonify({'error': 'Forbidden'}), 403
+        update = Update.de_json(request.get_data(as_text=True))
+        if update is None:
+            return jsonify({'error': 'Invalid update'}), 400
+        if not dispatcher.submit(update):
+            # Telegram retries updates that were not accepted
+            return jsonify({'error': 'Busy'}), 503
+        return '', 200
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        return jsonify(dispatcher.metrics()), 200
+
+    return app
+
+def run_webhook(bot):
+    """
+    Register the webhook with Telegram and serve updates until interrupted.
+
+    :param bot: A TeleBot created with threaded=False, so each worker runs its handlers inline.
+    """
+    if not WEBHOOK_URL:
+        raise RuntimeError("WEBHOOK_URL must be set when BOT_MODE=webhook")
+
+    dispatcher = UpdateDispatcher(bot)
+    dispatcher.start()
+    server = make_server(WEBHOOK_HOST, WEBHOOK_PORT, create_webhook_app(dispatcher), threaded=True)
+
+    bot.remove_webhook()
+    bot.set_webhook(
+        url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET or None,
+        max_connections=WEBHOOK_MAX_CONNECTIONS
+    )
+    print(f"Webhook listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH} with {len(dispatcher.queues)} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        dispatcher.stop()
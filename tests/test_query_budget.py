@@ -0,0 +1,77 @@
+# tests/test_query_budget.py
+import os
+import sys
+from datetime import date, datetime
+import pytest
+
+# The app is configured from the environment when it is imported
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['QUERY_BUDGET'] = '4'
+os.environ['REFERENCE_CACHE_TTL'] = '0'  # count the queries of every request, not cache hits
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from db import db
+from query_budget import count_queries
+from models import Attendance, Coach, Locations, Payment, PaymentMethods, Plans, Schedule, User
+from models.users import UserType
+
+N = 5
+LIST_ENDPOINTS = ['/attendances', '/coaches', '/schedules', '/schedules?limit=100', '/payments/2024/5']
+
+@pytest.fixture(scope='module')
+def client():
+    app.testing = True
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([PaymentMethods(method='Zelle'), Plans(name='Mensual', price=30)])
+        db.session.commit()
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+def seed(count):
+    """Add `count` locations, coaches, users, schedules, attendances and May 2024 payments."""
+    start = User.query.count()
+    for i in range(start, start + count):
+        location = Locations(location=f'Sede {i}', address='Av 1')
+        user = User(name=f'Cliente{i}', lastname='Perez', cedula=1000 + i, email=f'cliente{i}@example.com',
+                    date_of_birth=date(1990, 1, 1), phone=1, type=UserType.cliente, telegram_id=500 + i)
+        db.session.add_all([location, user])
+        db.session.flush()
+        coach = Coach(cedula=str(i), names=f'Coach {i}', location_id=location.id)
+        db.session.add(coach)
+        db.session.flush()
+        db.session.add_all([
+            Schedule(location_id=location.id, days='Lunes, Miércoles', time_init='9:00'),
+            Attendance(coach_id=coach.id, location_id=location.id, user_id=user.id, date=datetime(2024, 5, 1, 9)),
+            Payment(user_id=user.id, date=date(2024, 5, 2), amount=20, reference=f'ref{i}',
+                    payment_method_id=1, year=2024, month=5),
+        ])
+    db.session.commit()
+
+def statement_counts(client):
+    counts = {}
+    for path in LIST_ENDPOINTS:
+        # Requests share the fixture's app context: start each one without the seeded objects,
+        # which would otherwise answer lazy loads from the identity map
+        db.session.remove()
+        with count_queries() as counter:
+            response = client.get(path)  # raises QueryBudgetExceeded over QUERY_BUDGET
+        assert response.status_code == 200, path
+        counts[path] = counter['count']
+    return counts
+
+def test_list_endpoints_stay_within_budget_as_rows_grow(client):
+    seed(N)
+    small = statement_counts(client)
+    seed(9 * N)
+    large = statement_counts(client)
+
+    assert len(client.get('/attendances').get_json()) == 10 * N
+    # Related names are loaded with the rows, not left out
+    for path in ('/coaches', '/schedules', '/schedules?limit=100'):
+        assert all(row['location_name'] for row in client.get(path).get_json()), path
+    assert all(count <= app.config['QUERY_BUDGET'] for count in large.values()), large
+    # No statement per row: the count does not grow with the number of rows
+    assert small == large